@@ -1,9 +1,22 @@
 from django.contrib import admin
-from .models import note, note_image, Profile
+from .models import note, note_image, background_task, outbound_email, Profile
 
 # Register your models here.
 admin.site.register(note)
 admin.site.register(note_image)
+
+@admin.register(background_task)
+class BackgroundTaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'run_after', 'updated_at')
+    list_filter = ('status', 'name')
+
+@admin.register(outbound_email)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'run_after', 'sent_at')
+    list_filter = ('status',)
+    # Bodies carry password reset links; keep them out of the admin.
+    exclude = ('body', 'html_body')
+
 @admin.register(Profile)
 class ProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'pin')
\ No newline at end of file
@@ -0,0 +1,78 @@
+"""Small timing helpers shared by the benchmark management commands."""
+import resource
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.test.utils import override_settings
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    """Summary statistics (in milliseconds) for a list of durations in seconds."""
+    ms = [s * 1000 for s in samples]
+    return {
+        "runs": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 3) if ms else 0.0,
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+    }
+
+
+def time_calls(fn, repeat):
+    """Call `fn` `repeat` times and return the individual durations in seconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def run_concurrent(fn, requests, states):
+    """Run `fn(state)` `requests` times across one thread per entry of `states`.
+
+    Each thread keeps one state (a logged-in client, a session, ...) that was
+    set up beforehand, so setup is not timed. Returns (elapsed seconds, list
+    of (duration, fn result)).
+    """
+    local = threading.local()
+    available = list(states)
+    lock = threading.Lock()
+
+    def call(_):
+        if not hasattr(local, "state"):
+            with lock:
+                local.state = available.pop()
+        start = time.perf_counter()
+        result = fn(local.state)
+        return time.perf_counter() - start, result
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(states)) as pool:
+        results = list(pool.map(call, range(requests)))
+    return time.perf_counter() - start, results
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def allow_test_client():
+    """Let Django's test client (which sends Host: testserver) past ALLOWED_HOSTS while benchmarking in-process."""
+    return override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"])
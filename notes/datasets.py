@@ -0,0 +1,114 @@
+"""Synthetic note data for load testing (see generate_notes_dataset and bench_notes)."""
+import io
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageDraw
+
+from .importers import import_notes
+from .models import note
+
+WORDS = (
+    "meeting project idea budget travel recipe garden python django release invoice holiday fitness "
+    "reading music family design review backlog database kitchen deadline client roadmap sprint "
+    "grocery weekend journal lecture exam research paper draft feedback launch bug fix deploy"
+).split()
+TAGS = ["work", "personal", "ideas", "todo", "reading", "travel", "recipes", "study", ""]
+COLORS = ["#ffffff", "#fff3bf", "#d3f9d8", "#d0ebff", "#ffe3e3", "#e5dbff"]
+BENCH_PASSWORD = "bench-password"
+BENCH_PIN = "123456"
+
+
+def _sentence(rng, low=6, high=16):
+    words = rng.choices(WORDS, k=rng.randint(low, high))
+    return " ".join(words).capitalize() + "."
+
+
+def markdown_body(rng):
+    """A note body mixing paragraphs, lists, emphasis, links and the odd code block."""
+    parts = []
+    if rng.random() < 0.3:
+        parts.append("## " + " ".join(rng.choices(WORDS, k=3)).title())
+    for _ in range(rng.randint(1, 4)):
+        block = rng.random()
+        if block < 0.5:
+            text = " ".join(_sentence(rng) for _ in range(rng.randint(1, 4)))
+            parts.append(text.replace(rng.choice(WORDS), f"**{rng.choice(WORDS)}**", 1))
+        elif block < 0.8:
+            parts.append("\n".join(f"- {_sentence(rng, 2, 6)}" for _ in range(rng.randint(2, 6))))
+        elif block < 0.9:
+            parts.append(f"See [{rng.choice(WORDS)}](https://example.com/{rng.choice(WORDS)}).")
+        else:
+            parts.append(f"```\n{rng.choice(WORDS)} = {rng.randint(1, 999)}\n```")
+    return "\n\n".join(parts)
+
+
+def image_bytes(rng, width=None, height=None):
+    """A JPEG photo stand-in: random size and colour with some shapes, so it compresses like real content."""
+    width = width or rng.choice([640, 800, 1024, 1600])
+    height = height or int(width * rng.choice([0.5, 0.75, 1.0, 1.33]))
+    img = Image.new("RGB", (width, height), tuple(rng.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(img)
+    for _ in range(12):
+        x, y = rng.randrange(width), rng.randrange(height)
+        draw.ellipse(
+            (x, y, x + rng.randint(20, width // 2), y + rng.randint(20, height // 2)),
+            fill=tuple(rng.randrange(256) for _ in range(3)),
+        )
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def bench_users(prefix):
+    return User.objects.filter(username__startswith=f"{prefix}_").order_by("pk")
+
+
+def generate_user_notes(user, count, rng, images_per_note=0, image_share=0.25, hidden_share=0.1,
+                        deleted_share=0.05, days=365):
+    """Create `count` notes for `user` through the bulk importer. Returns the importer stats."""
+    now = timezone.now()
+    rows, files = [], {}
+    for i in range(count):
+        created = now - timedelta(seconds=rng.randint(0, days * 86400))
+        updated = min(now, created + timedelta(seconds=rng.randint(0, 30 * 86400)))
+        row = {
+            "title": " ".join(rng.choices(WORDS, k=rng.randint(2, 6))).capitalize()[:100],
+            "description": markdown_body(rng),
+            "tag": rng.choice(TAGS),
+            "color": rng.choice(COLORS),
+            "is_hidden": rng.random() < hidden_share,
+            "created_at": created.isoformat(),
+            "updated_at": updated.isoformat(),
+            "images": [],
+        }
+        if images_per_note and rng.random() < image_share:
+            for n in range(images_per_note):
+                name = f"bench-{user.pk}-{i}-{n}.jpg"
+                files[name] = image_bytes(rng)
+                row["images"].append({"file": name})
+        rows.append(row)
+
+    stats = import_notes(user, rows, open_image=lambda name: io.BytesIO(files[name]))
+
+    # The importer skips deleted rows, so soft-delete a share afterwards.
+    live = list(note.objects.filter(user=user, is_deleted=False).values_list("pk", flat=True))
+    doomed = rng.sample(live, int(len(live) * deleted_share))
+    for n in note.objects.filter(pk__in=doomed):
+        n.is_deleted, n.deleted_at = True, now - timedelta(days=rng.randint(0, 60))
+        n.save(update_fields=["is_deleted", "deleted_at"])
+    return stats
+
+
+def create_bench_user(username):
+    """A user with the well-known benchmark password and hidden-notes PIN."""
+    with transaction.atomic():
+        user = User.objects.create(username=username, email=f"{username}@example.com")
+        user.set_password(BENCH_PASSWORD)
+        user.save(update_fields=["password"])
+        user.profile.pin = make_password(BENCH_PIN)
+        user.profile.save(update_fields=["pin"])
+    return user
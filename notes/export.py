@@ -0,0 +1,106 @@
+"""Streaming export of a user's notes as JSONL, or a ZIP of JSONL plus image files.
+
+Everything here is a generator over querysets iterated in chunks, so memory
+use stays flat regardless of how many notes or image bytes an account has.
+"""
+import io
+import json
+import os
+import time
+import zipfile
+
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import note, note_image
+
+CHUNK_SIZE = 500
+FILE_CHUNK_SIZE = 64 * 1024
+NOTE_FIELDS = ("note_id", "title", "description", "tag", "color", "is_hidden", "is_deleted", "created_at", "updated_at")
+
+
+def export_queryset(user, include_hidden=True, include_deleted=False):
+    notes = note.objects.filter(user=user).order_by("note_id")
+    if not include_hidden:
+        notes = notes.filter(is_hidden=False)
+    if not include_deleted:
+        notes = notes.filter(is_deleted=False)
+    return notes
+
+
+def image_archive_name(img):
+    """Path of an image inside the export ZIP."""
+    return f"images/{img.image_id}/{os.path.basename(img.image.name)}"
+
+
+def note_record(n):
+    record = {field: getattr(n, field) for field in NOTE_FIELDS}
+    record["images"] = [
+        {
+            "image_id": img.image_id,
+            "file": image_archive_name(img),
+            "width": img.width,
+            "height": img.height,
+        }
+        for img in n.note_image_set.all()
+    ]
+    return record
+
+
+def iter_jsonl(notes):
+    """Yield one JSON line (bytes) per note."""
+    for n in notes.prefetch_related("note_image_set").iterator(chunk_size=CHUNK_SIZE):
+        yield (json.dumps(note_record(n), cls=DjangoJSONEncoder, ensure_ascii=False) + "\n").encode()
+
+
+class _StreamBuffer(io.RawIOBase):
+    """Write-only, non-seekable sink for ZipFile whose contents are drained as they are produced."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_zip(notes):
+    """Yield a ZIP archive holding notes.jsonl and every image file, chunk by chunk.
+
+    Images are stored uncompressed; they are already compressed formats.
+    """
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, mode="w") as archive:
+        listing = zipfile.ZipInfo("notes.jsonl", date_time=time.localtime()[:6])
+        listing.compress_type = zipfile.ZIP_DEFLATED
+        with archive.open(listing, mode="w", force_zip64=True) as entry:
+            for line in iter_jsonl(notes):
+                entry.write(line)
+                if data := buffer.drain():
+                    yield data
+
+        images = note_image.objects.filter(note__in=notes.values("note_id")).order_by("image_id")
+        for img in images.iterator(chunk_size=CHUNK_SIZE):
+            try:
+                source = default_storage.open(img.image.name)
+            except OSError:
+                continue  # file missing from storage; the JSONL still lists it
+            with source, archive.open(image_archive_name(img), mode="w", force_zip64=True) as entry:
+                while chunk := source.read(FILE_CHUNK_SIZE):
+                    entry.write(chunk)
+                    if data := buffer.drain():
+                        yield data
+    yield buffer.drain()
@@ -0,0 +1,98 @@
+"""Per-user tag/color facet counts backing the notes grid dropdowns."""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import note, note_facet
+
+FACET_FIELDS = ("user_id", "is_hidden", "tag", "color", "is_deleted")
+
+
+def _facet_key(values):
+    """(user_id, is_hidden, tag, color) for a live note, None for a deleted one."""
+    if values["is_deleted"]:
+        return None
+    return values["user_id"], values["is_hidden"], values["tag"] or "", values["color"] or ""
+
+
+def _adjust(key, delta):
+    user_id, is_hidden, tag, color = key
+    rows = note_facet.objects.filter(user_id=user_id, is_hidden=is_hidden, tag=tag, color=color)
+    if rows.update(count=F("count") + delta):
+        if delta < 0:
+            rows.filter(count__lte=0).delete()
+        return
+    if delta > 0:
+        try:
+            with transaction.atomic():
+                note_facet.objects.create(user_id=user_id, is_hidden=is_hidden, tag=tag, color=color, count=delta)
+        except IntegrityError:
+            # Created concurrently; fall back to incrementing it.
+            rows.update(count=F("count") + delta)
+
+
+def record_note_change(instance, created=False, deleted=False):
+    """Move one note's contribution between facet rows after a save or delete.
+
+    Returns False when the previous state is unknown (e.g. the note was loaded
+    with deferred fields); callers should then rebuild the user's facets.
+    """
+    current = {f: getattr(instance, f) for f in FACET_FIELDS}
+    if created:
+        old = None
+    else:
+        loaded = getattr(instance, "_loaded_values", {})
+        if not all(f in loaded for f in FACET_FIELDS):
+            return False
+        old = _facet_key(loaded)
+    new = None if deleted else _facet_key(current)
+
+    if old != new:
+        if old:
+            _adjust(old, -1)
+        if new:
+            _adjust(new, +1)
+    instance._loaded_values = {**getattr(instance, "_loaded_values", {}), **current}
+    return True
+
+
+def rebuild_user_facets(user_id, dry_run=False):
+    """Recompute a user's facet rows from the notes table. Returns the number of rows fixed."""
+    actual = {
+        (row["user_id"], row["is_hidden"], row["tag"] or "", row["color"] or ""): row["total"]
+        for row in note.objects.filter(user_id=user_id, is_deleted=False)
+        .values("user_id", "is_hidden", "tag", "color")
+        .annotate(total=Count("pk"))
+    }
+    stored = {
+        (f.user_id, f.is_hidden, f.tag, f.color): f
+        for f in note_facet.objects.filter(user_id=user_id)
+    }
+
+    stale = [f.pk for key, f in stored.items() if key not in actual]
+    wrong = [(stored[key], total) for key, total in actual.items() if key in stored and stored[key].count != total]
+    missing = [key for key in actual if key not in stored]
+    if not dry_run:
+        with transaction.atomic():
+            note_facet.objects.filter(pk__in=stale).delete()
+            for facet, total in wrong:
+                facet.count = total
+            note_facet.objects.bulk_update([facet for facet, _ in wrong], ["count"])
+            note_facet.objects.bulk_create(
+                note_facet(user_id=k[0], is_hidden=k[1], tag=k[2], color=k[3], count=actual[k]) for k in missing
+            )
+    return len(stale) + len(wrong) + len(missing)
+
+
+def facet_choices(user, hidden, tag=None, color=None):
+    """Tag and color dropdown values; each list is narrowed by the other's selection."""
+    facets = note_facet.objects.filter(user=user, is_hidden=hidden)
+    all_colors = facets.exclude(color="")
+    if tag and tag != "all":
+        all_colors = all_colors.filter(tag__iexact=tag)
+    all_tags = facets.exclude(tag="")
+    if color and color != "all":
+        all_tags = all_tags.filter(color__iexact=color)
+    return (
+        all_tags.order_by("tag").values_list("tag", flat=True).distinct(),
+        all_colors.order_by("color").values_list("color", flat=True).distinct(),
+    )
@@ -1,7 +1,7 @@
 from django import forms
 from django.contrib.auth.forms import PasswordResetForm
-from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
+from ..mail import queue_mail
 from .base import FormControlMixin
 
 
@@ -11,13 +11,11 @@ class CustomPasswordResetForm(FormControlMixin, PasswordResetForm):
     )
 
     def send_mail(self, subject_template_name, email_template_name, context, from_email, to_email, html_email_template_name=None):
+        """Render the reset email and queue it in the outbox; it is sent outside the request."""
         subject = render_to_string(subject_template_name, context).strip().replace('\n', '')
         body = render_to_string(email_template_name, context)
-        email_message = EmailMultiAlternatives(subject, body, from_email, [to_email])
-        if html_email_template_name:
-            html_email = render_to_string(html_email_template_name, context)
-            email_message.attach_alternative(html_email, 'text/html')
-        email_message.send()
+        html_body = render_to_string(html_email_template_name, context) if html_email_template_name else ""
+        queue_mail(subject, body, from_email, [to_email], html_body=html_body)
 
 
 class PasswordChangeForm(forms.Form):
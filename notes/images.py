@@ -0,0 +1,107 @@
+import io
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+DEFAULT_VARIANT_WIDTHS = [403, 806]
+DEFAULT_VARIANT_FORMATS = ['webp', 'jpeg']
+VARIANT_QUALITY = 80
+
+_EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+# EXIF orientations that rotate the picture by 90 degrees (width and height swap).
+_ROTATED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+def variant_widths():
+    return sorted(getattr(settings, 'NOTES_IMAGE_VARIANT_WIDTHS', DEFAULT_VARIANT_WIDTHS))
+
+
+def variant_formats():
+    formats = getattr(settings, 'NOTES_IMAGE_VARIANT_FORMATS', DEFAULT_VARIANT_FORMATS)
+    return [fmt for fmt in formats if fmt != 'webp' or features.check('webp')]
+
+
+def variant_name(image_id, width, fmt):
+    return f"notes/images/variants/{image_id}/{width}w.{_EXTENSIONS[fmt]}"
+
+
+def oriented_size(fileobj):
+    """(width, height) of an image file as displayed, i.e. after applying its EXIF orientation."""
+    fileobj.seek(0)
+    with Image.open(fileobj) as picture:
+        width, height = picture.size
+        if picture.getexif().get(ImageOps.ExifTags.Base.Orientation) in _ROTATED_ORIENTATIONS:
+            width, height = height, width
+    fileobj.seek(0)
+    return width, height
+
+
+def _encode(source, width, fmt):
+    height = max(1, round(source.height * width / source.width))
+    resized = source.resize((width, height), Image.Resampling.LANCZOS) if width != source.width else source
+    if fmt == 'jpeg' and resized.mode != 'RGB':
+        # JPEG has no alpha channel; flatten transparent images onto white.
+        background = Image.new('RGB', resized.size, (255, 255, 255))
+        rgba = resized.convert('RGBA')
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        resized = background
+    elif fmt == 'webp' and resized.mode not in ('RGB', 'RGBA'):
+        resized = resized.convert('RGBA' if 'A' in resized.getbands() else 'RGB')
+    buffer = io.BytesIO()
+    resized.save(buffer, format=fmt.upper(), quality=VARIANT_QUALITY, optimize=True)
+    return buffer.getvalue()
+
+
+def generate_variants(img):
+    """Write resized/re-encoded copies of a note_image and record them on the row.
+
+    Widths larger than the original are clamped to the original width, so small
+    images are re-encoded but never upscaled. Marks the image ready, or failed if
+    it cannot be read. Returns the list of variants.
+    """
+    try:
+        with default_storage.open(img.image.name) as f:
+            source = ImageOps.exif_transpose(Image.open(f))
+            source.load()
+    except (OSError, ValueError):
+        img.status = img.FAILED
+        img.save(update_fields=['status'])
+        return []
+
+    widths = sorted({min(w, source.width) for w in variant_widths()})
+    variants = []
+    for fmt in variant_formats():
+        for width in widths:
+            name = variant_name(img.image_id, width, fmt)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            default_storage.save(name, ContentFile(_encode(source, width, fmt)))
+            variants.append({'width': width, 'format': fmt, 'name': name})
+
+    # Record the displayed (transposed) size; save() derives aspect_ratio from it.
+    img.width, img.height = source.size
+    img.variants = variants
+    img.status = img.READY
+    img.save(update_fields=['width', 'height', 'aspect_ratio', 'variants', 'status'])
+    return variants
+
+
+def image_files(img):
+    """Storage names of a note_image's original upload and all of its variants."""
+    names = [img.image.name] if img.image else []
+    return names + [v['name'] for v in img.variants]
+
+
+def delete_files(names):
+    """Delete storage files, ignoring ones that are already gone. Returns how many were removed."""
+    removed = 0
+    for name in names:
+        try:
+            if default_storage.exists(name):
+                default_storage.delete(name)
+                removed += 1
+        except OSError:
+            pass
+    return removed
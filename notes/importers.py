@@ -0,0 +1,226 @@
+"""Bulk import of notes from Markdown files, JSONL, or a previous export ZIP.
+
+Rows are validated with NoteForm's field cleaning and written with batched
+bulk_create calls, one transaction per batch. Callers can resume an
+interrupted import by passing the `start` row reported through `on_progress`.
+"""
+import json
+import os
+import zipfile
+from pathlib import Path
+
+from django import forms
+from django.core.files.base import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from .forms.note_forms import NoteForm
+from .images import oriented_size
+from .models import note, note_image
+from .signals import notes_bulk_updated
+from .tasks import enqueue_many
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+NOTE_FIELDS = ("title", "description", "tag", "color", "is_hidden")
+
+
+# ======================================================
+# Readers: each yields one dict per note
+# ======================================================
+
+def _parse_line(line):
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return {"_invalid": f"Invalid JSON: {e}"}
+
+
+def read_jsonl(lines):
+    """Rows from JSON lines (our export format, or any objects with note fields)."""
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield _parse_line(line)
+
+
+def _split_front_matter(text):
+    """Parse a leading `---` block of `key: value` lines."""
+    if not text.startswith("---\n"):
+        return {}, text
+    end = text.find("\n---", 4)
+    if end == -1:
+        return {}, text
+    meta = {}
+    for line in text[4:end].splitlines():
+        key, sep, value = line.partition(":")
+        if sep:
+            meta[key.strip().lower()] = value.strip()
+    return meta, text[end + 4:].lstrip("\n")
+
+
+def read_markdown(path):
+    """Rows from a Markdown file or a directory of them (searched recursively).
+
+    The title comes from front matter, a leading `# ` heading, or the file name.
+    """
+    path = Path(path)
+    files = sorted(path.rglob("*.md")) if path.is_dir() else [path]
+    for md_file in files:
+        meta, body = _split_front_matter(md_file.read_text(encoding="utf-8"))
+        title = meta.get("title")
+        if not title:
+            first, _, rest = body.partition("\n")
+            if first.startswith("# "):
+                title, body = first[2:].strip(), rest.lstrip("\n")
+            else:
+                title = md_file.stem
+        yield {
+            "title": title[:100],
+            "description": body,
+            "tag": meta.get("tag", ""),
+            "color": meta.get("color", "#ffffff"),
+            "is_hidden": meta.get("hidden", "").lower() in ("1", "true", "yes"),
+        }
+
+
+def read_export_zip(archive):
+    """Rows from a ZIP produced by the exporter; image files are read from the archive."""
+    with archive.open("notes.jsonl") as listing:
+        yield from read_jsonl(listing)
+
+
+def detect_format(name):
+    if os.path.isdir(name) or name.endswith(".md"):
+        return "markdown"
+    if name.endswith(".zip"):
+        return "zip"
+    return "jsonl"
+
+
+# ======================================================
+# Validation and writing
+# ======================================================
+
+def validate_row(row):
+    """Clean a row with NoteForm's fields. Returns cleaned data or raises ValidationError."""
+    if not isinstance(row, dict):
+        raise forms.ValidationError("Not a JSON object.")
+    if "_invalid" in row:
+        raise forms.ValidationError(row["_invalid"])
+    cleaned, errors = {}, []
+    for name in NOTE_FIELDS:
+        field = NoteForm.base_fields[name]
+        value = row.get(name, note._meta.get_field(name).get_default())
+        try:
+            cleaned[name] = field.clean(value)
+        except forms.ValidationError as e:
+            errors.extend(f"{name}: {message}" for message in e.messages)
+    if errors:
+        raise forms.ValidationError(errors)
+    return cleaned
+
+
+def _store_image(name, fileobj):
+    """Save an imported image into media storage; returns (storage name, width, height)."""
+    stored = default_storage.save(f"notes/images/{os.path.basename(name)}", File(fileobj, name=os.path.basename(name)))
+    try:
+        with default_storage.open(stored) as f:
+            width, height = oriented_size(f)
+    except (OSError, ValueError):
+        width = height = None
+    return stored, width, height
+
+
+def _write_batch(user, rows, open_image):
+    notes = []
+    for row in rows:
+        n = note(user=user, **row["cleaned"])
+        n.render_description()
+        notes.append(n)
+
+    with transaction.atomic():
+        note.objects.bulk_create(notes)
+
+        # Keep the original timestamps of exported notes. bulk_update skips
+        # auto_now/auto_now_add, unlike bulk_create.
+        dated = []
+        for n, row in zip(notes, rows):
+            created, updated = parse_datetime(row.get("created_at") or ""), parse_datetime(row.get("updated_at") or "")
+            if created or updated:
+                n.created_at, n.updated_at = created or n.created_at, updated or n.updated_at
+                dated.append(n)
+        note.objects.bulk_update(dated, ["created_at", "updated_at"])
+
+        images = []
+        if open_image:
+            for n, row in zip(notes, rows):
+                for image in row.get("images") or []:
+                    try:
+                        with open_image(image["file"]) as f:
+                            stored, width, height = _store_image(image["file"], f)
+                    except (KeyError, OSError):
+                        continue
+                    images.append(note_image(
+                        note=n, image=stored, width=width, height=height,
+                        aspect_ratio=height / width if width and height else None,
+                    ))
+            note_image.objects.bulk_create(images)
+            enqueue_many("process_note_image", [{"image_id": img.image_id} for img in images])
+
+        notes_bulk_updated.send(
+            sender=note, user_id=user.pk, note_ids=[n.note_id for n in notes], fields=[*NOTE_FIELDS, "updated_at"]
+        )
+    return len(notes), len(images)
+
+
+def import_notes(user, rows, open_image=None, start=0, batch_size=DEFAULT_BATCH_SIZE, on_progress=None):
+    """Validate and insert `rows` for `user`, skipping the first `start` rows.
+
+    Invalid rows are skipped and reported. After each committed batch,
+    `on_progress(next_row, stats)` is called; `next_row` is the `start` to pass
+    when resuming. Returns the stats dict.
+    """
+    stats = {"next_row": start, "imported": 0, "images": 0, "skipped": 0, "errors": []}
+    batch = []
+
+    def flush():
+        if batch:
+            imported, images = _write_batch(user, batch, open_image)
+            stats["imported"] += imported
+            stats["images"] += images
+            batch.clear()
+        if on_progress:
+            on_progress(stats["next_row"], stats)
+
+    for number, row in enumerate(rows):
+        if number < start:
+            continue
+        stats["next_row"] = number + 1
+        if isinstance(row, dict) and row.get("is_deleted"):
+            stats["skipped"] += 1
+            continue
+        try:
+            batch.append({**row, "cleaned": validate_row(row)})
+        except forms.ValidationError as e:
+            stats["skipped"] += 1
+            if len(stats["errors"]) < MAX_REPORTED_ERRORS:
+                stats["errors"].append({"row": number, "errors": e.messages})
+            continue
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    return stats
+
+
+def import_source(user, source, source_format=None, **kwargs):
+    """Import from a path (Markdown file/directory, .jsonl or export .zip)."""
+    source_format = source_format or detect_format(source)
+    if source_format == "markdown":
+        return import_notes(user, read_markdown(source), **kwargs)
+    if source_format == "zip":
+        with zipfile.ZipFile(source) as archive:
+            return import_notes(user, read_export_zip(archive), open_image=archive.open, **kwargs)
+    with open(source, encoding="utf-8") as lines:
+        return import_notes(user, read_jsonl(lines), **kwargs)
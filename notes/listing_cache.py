@@ -0,0 +1,98 @@
+"""Cached ordered note IDs for the filtered notes listings.
+
+For each (user, hidden, tag, color, search) the listing's (updated_at,
+note_id) keys are cached in the "note_lists" cache, newest first, so paging
+and flipping between filters only hydrate the notes of one page. Every key
+includes a per-user version number; note and image signals bump it after the
+change commits, which retires all of the user's lists at once.
+
+The cache is only used with NOTES_LIST_CACHE on (a shared backend configured);
+otherwise every listing is paged with keyset queries.
+"""
+import hashlib
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+def _cache():
+    return caches["note_lists"]
+
+
+def _version_key(user_id):
+    return f"notes:list-version:{user_id}"
+
+
+def list_version(user_id):
+    """The user's current list version, starting one if there is none."""
+    key = _version_key(user_id)
+    version = _cache().get(key)
+    if version is None:
+        # A fresh, time-based start, so an evicted counter never reuses an old version.
+        _cache().add(key, time.time_ns())
+        version = _cache().get(key)
+    return version
+
+
+def bump_version(user_id):
+    """Invalidate every cached list of the user."""
+    try:
+        _cache().incr(_version_key(user_id))
+    except ValueError:
+        _cache().set(_version_key(user_id), time.time_ns())
+
+
+def list_key(user_id, hidden, tag=None, color=None, search=None):
+    """Cache key parts for one filtered listing, normalised the way filter_notes applies the filters."""
+    tag = (tag or "").lower() if tag != "all" else ""
+    color = (color or "").lower() if color != "all" else ""
+    search = (search or "").strip()
+    digest = hashlib.md5(f"{int(hidden)}|{tag}|{color}|{search}".encode(), usedforsecurity=False).hexdigest()
+    return user_id, digest
+
+
+def listing_order(notes):
+    """Order of a listing: best match first for ranked searches (see filter_notes), otherwise newest first."""
+    if "search_rank" in notes.query.annotations:
+        return "search_rank", "-note_id"
+    return "-updated_at", "-note_id"
+
+
+def cached_entries(key, notes):
+    """(sort value, note_id) for every note in `notes`, in listing order, from the cache when possible.
+
+    The sort value is search_rank for ranked searches and updated_at otherwise.
+    Returns None when the list cache is off or the listing is longer than
+    NOTES_LIST_CACHE_MAX_IDS; such listings are paged with keyset queries instead.
+    """
+    if not settings.NOTES_LIST_CACHE:
+        return None
+    user_id, digest = key
+    cache_key = f"notes:list:{user_id}:{list_version(user_id)}:{digest}"
+    entries = _cache().get(cache_key)
+    if entries is None:
+        limit = settings.NOTES_LIST_CACHE_MAX_IDS
+        order = listing_order(notes)
+        entries = list(notes.order_by(*order).values_list(order[0].lstrip("-"), "note_id")[: limit + 1])
+        if len(entries) > limit:
+            entries = False  # cached too, so the next request skips straight to keyset paging
+        _cache().set(cache_key, entries)
+    return None if entries is False else entries
+
+
+def page_after(entries, position, page_size):
+    """The page of entries following the keyset `position` (None for the first page), plus one extra entry."""
+    start = 0
+    if position:
+        value, note_id = position
+        if isinstance(value, float):
+            # Ranked: ascending rank, then descending note_id.
+            after = lambda entry: entry[0] > value or (entry[0] == value and entry[1] < note_id)  # noqa: E731
+        else:
+            # Newest first: entries are in descending (updated_at, note_id) order.
+            after = lambda entry: entry < position  # noqa: E731
+        # "Comes after the cursor" is False, ..., False, True, ..., True along the list.
+        start = bisect_left(entries, True, key=after)
+    return entries[start: start + page_size + 1]
@@ -0,0 +1,129 @@
+"""Outbound email outbox.
+
+``queue_mail()`` stores a message in ``outbound_email`` instead of talking to
+the mail server inside the request. ``send_pending()`` delivers due messages
+in batches over a single backend connection, retrying failures with
+exponential backoff. It runs from a background task right after queueing;
+that task schedules itself again for the next retry while anything is still
+pending. ``manage.py send_outbox`` does the same from cron or a console.
+
+Bodies hold password reset links, so they are blanked as soon as a message is
+sent or given up on, and ``purge_finished()`` deletes finished rows after
+NOTES_OUTBOX_RETENTION_DAYS.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import F
+from django.utils import timezone
+
+from .models import outbound_email
+from .tasks import enqueue
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50
+RETRY_BASE_DELAY = 60  # seconds; doubles with every failed attempt
+STALE_AFTER = timedelta(minutes=15)  # messages left "sending" longer than this are retried
+
+
+def queue_mail(subject, body, from_email, to, html_body=""):
+    """Queue one email and schedule delivery. Returns the outbox row."""
+    email = outbound_email.objects.create(
+        subject=subject, body=body, html_body=html_body or "", from_email=from_email or "", to=list(to)
+    )
+    enqueue("send_outbox")
+    return email
+
+
+def build_message(email, connection=None):
+    message = EmailMultiAlternatives(
+        email.subject, email.body, email.from_email or None, email.to, connection=connection
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, "text/html")
+    return message
+
+
+def _claim_batch(limit):
+    """Mark up to `limit` due messages as sending and return the ones this caller claimed."""
+    now = timezone.now()
+    outbound_email.objects.filter(status=outbound_email.SENDING, locked_at__lt=now - STALE_AFTER).update(
+        status=outbound_email.PENDING, locked_at=None
+    )
+    due = list(
+        outbound_email.objects.filter(status=outbound_email.PENDING, run_after__lte=now)
+        .order_by("run_after", "pk")
+        .values_list("pk", flat=True)[:limit]
+    )
+    # A concurrent sender may grab some of these first; locked_at tells ours apart.
+    outbound_email.objects.filter(pk__in=due, status=outbound_email.PENDING).update(
+        status=outbound_email.SENDING, locked_at=now, attempts=F("attempts") + 1
+    )
+    return list(outbound_email.objects.filter(pk__in=due, status=outbound_email.SENDING, locked_at=now).order_by("pk"))
+
+
+def _failed(email, error):
+    email.last_error = f"{type(error).__name__}: {error}"
+    email.locked_at = None
+    if email.attempts >= email.max_attempts:
+        email.status = outbound_email.FAILED
+        email.body = email.html_body = ""
+        logger.error("Giving up on email %s: %s", email.pk, email.last_error)
+    else:
+        email.status = outbound_email.PENDING
+        email.run_after = timezone.now() + timedelta(seconds=RETRY_BASE_DELAY * 2 ** (email.attempts - 1))
+    email.save(update_fields=["status", "run_after", "last_error", "locked_at", "body", "html_body"])
+
+
+def send_pending(limit=BATCH_SIZE):
+    """Send up to `limit` due messages over one connection. Returns (sent, failed)."""
+    batch = _claim_batch(limit)
+    if not batch:
+        return 0, 0
+
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        for email in batch:
+            _failed(email, e)
+        return 0, len(batch)
+
+    sent = []
+    try:
+        for email in batch:
+            try:
+                # The connection is already open, so the backend keeps it for the next message.
+                connection.send_messages([build_message(email, connection)])
+            except Exception as e:
+                _failed(email, e)
+            else:
+                sent.append(email.pk)
+    finally:
+        connection.close()
+
+    outbound_email.objects.filter(pk__in=sent).update(
+        status=outbound_email.SENT, sent_at=timezone.now(), locked_at=None, last_error="", body="", html_body=""
+    )
+    return len(sent), len(batch) - len(sent)
+
+
+def next_attempt_at():
+    """When the earliest pending message is due, or None if nothing is waiting."""
+    return (
+        outbound_email.objects.filter(status=outbound_email.PENDING)
+        .order_by("run_after").values_list("run_after", flat=True).first()
+    )
+
+
+def purge_finished(days=None):
+    """Delete sent and failed messages older than `days` (NOTES_OUTBOX_RETENTION_DAYS). Returns how many."""
+    days = settings.NOTES_OUTBOX_RETENTION_DAYS if days is None else days
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = outbound_email.objects.filter(
+        status__in=[outbound_email.SENT, outbound_email.FAILED], created_at__lt=cutoff
+    ).delete()
+    return deleted
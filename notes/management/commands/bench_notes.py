@@ -0,0 +1,230 @@
+import json
+import platform
+import random
+import subprocess
+from datetime import datetime, timezone
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError
+from urllib.parse import quote, urlencode
+from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, Request, build_opener
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from notes.benchmarks import allow_test_client, peak_rss_mb, run_concurrent, summarize
+from notes.datasets import BENCH_PASSWORD, BENCH_PIN, COLORS, TAGS, WORDS, bench_users, markdown_body
+from notes.models import note, note_image
+
+CREATED_TITLE = "bench run"
+
+
+# Each scenario builds (method, path, POST data, expected status) from a random generator.
+SCENARIOS = {
+    "index": lambda rng: ("GET", reverse("index"), None, 200),
+    "tag": lambda rng: ("GET", f"{reverse('index')}?tag={rng.choice(TAGS[:-1])}", None, 200),
+    "search": lambda rng: ("GET", f"{reverse('index')}?search={quote(' '.join(rng.sample(WORDS, 2)))}", None, 200),
+    "hidden": lambda rng: ("GET", reverse("hidden_notes"), None, 200),
+    "api": lambda rng: ("GET", reverse("api_notes"), None, 200),
+    "create": lambda rng: ("POST", reverse("create_note"), {
+        "title": f"{CREATED_TITLE} {rng.randrange(10**6)}",
+        "description": markdown_body(rng),
+        "tag": rng.choice(TAGS),
+        "color": rng.choice(COLORS),
+    }, 302),
+}
+
+
+class _TestClient:
+    """In-process Django test client; also counts the queries each request runs."""
+
+    def __init__(self, user):
+        self.client = Client()
+        self.client.force_login(user)
+
+    def request(self, method, path, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            if method == "POST":
+                response = self.client.post(path, data)
+            else:
+                response = self.client.get(path)
+        return response.status_code, len(queries)
+
+
+class _NoRedirect(HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class _HttpClient:
+    """Session against a running server, logged in through the login form."""
+
+    def __init__(self, base_url, user):
+        self.base_url = base_url.rstrip("/")
+        self.cookies = CookieJar()
+        self.opener = build_opener(HTTPCookieProcessor(self.cookies), _NoRedirect)
+        self.request("GET", reverse("login"))
+        status, _ = self.request("POST", reverse("login"), {"username": user.username, "password": BENCH_PASSWORD})
+        if status != 302:
+            raise CommandError(f"Logging in as {user.username} at {self.base_url} returned {status}.")
+
+    def request(self, method, path, data=None):
+        url = self.base_url + path
+        body = None
+        if method == "POST":
+            token = next((c.value for c in self.cookies if c.name == settings.CSRF_COOKIE_NAME), "")
+            body = urlencode({**(data or {}), "csrfmiddlewaretoken": token}).encode()
+        request = Request(url, data=body, method=method, headers={"Referer": url})
+        try:
+            with self.opener.open(request) as response:
+                response.read()
+                return response.status, None
+        except HTTPError as e:
+            return e.code, None
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=settings.BASE_DIR, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the notes views against a generated dataset (see generate_notes_dataset) and report latency, "
+        "throughput, query counts and peak RSS as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--prefix", default="bench", help="Dataset user prefix.")
+        parser.add_argument(
+            "--scenario", action="append", dest="scenarios", choices=list(SCENARIOS),
+            help="Scenario to run (repeatable; default: all).",
+        )
+        parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels.")
+        parser.add_argument("--requests", type=int, default=200, help="Requests per scenario and concurrency level.")
+        parser.add_argument(
+            "--base-url", help="Drive a running server (e.g. http://127.0.0.1:8000) instead of the test client.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Write the results to this JSON file.")
+        parser.add_argument("--compare", help="Print the change against an earlier results file.")
+
+    def handle(self, *args, **options):
+        users = list(bench_users(options["prefix"]))
+        if not users:
+            raise CommandError(f"No {options['prefix']} users; run generate_notes_dataset first.")
+        try:
+            levels = [int(level) for level in options["concurrency"].split(",")]
+        except ValueError:
+            raise CommandError("--concurrency takes comma-separated integers.")
+        scenarios = options["scenarios"] or list(SCENARIOS)
+        base_url = options["base_url"]
+
+        report = {
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "commit": _git_commit(),
+                "target": base_url or "test client",
+                # With --base-url, peak RSS is this load generator's, not the server's.
+                "rss_process": "client" if base_url else "server",
+                "database": connection.vendor,
+                "python": platform.python_version(),
+                "dataset": {
+                    "prefix": options["prefix"],
+                    "users": len(users),
+                    "notes": note.objects.filter(user__in=users).count(),
+                    "images": note_image.objects.filter(note__user__in=users).count(),
+                },
+                "requests": options["requests"],
+            },
+            "results": [],
+        }
+        self.stdout.write(
+            f"{report['meta']['dataset']['notes']} notes for {len(users)} users, "
+            f"{options['requests']} requests per run against {report['meta']['target']}"
+        )
+
+        try:
+            # The in-process test client sends Host: testserver.
+            with allow_test_client():
+                for concurrency in levels:
+                    clients = [self.make_client(users[i % len(users)], base_url) for i in range(concurrency)]
+                    for name in scenarios:
+                        result = self.run_scenario(name, clients, options["requests"], options["seed"])
+                        report["results"].append(result)
+                        self.stdout.write(
+                            f"{name:8} c={concurrency:<3} {result['throughput_rps']:8.1f} req/s "
+                            f"p50={result['p50_ms']}ms p95={result['p95_ms']}ms p99={result['p99_ms']}ms "
+                            f"queries={result['queries_mean']} errors={result['errors']} "
+                            f"rss={result['peak_rss_mb']}MiB"
+                        )
+        finally:
+            # Only reaches the server's notes when it shares this database.
+            note.objects.filter(user__in=users, title__startswith=CREATED_TITLE).delete()
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+        if options["compare"]:
+            self.compare(options["compare"], report)
+
+    def make_client(self, user, base_url):
+        client = _HttpClient(base_url, user) if base_url else _TestClient(user)
+        # Unlock hidden notes once per session, as a user would.
+        status, _ = client.request("POST", reverse("index"), {"verify_pin": "1", "pin": BENCH_PIN})
+        if status != 302:
+            raise CommandError(f"Unlocking hidden notes for {user.username} returned {status}.")
+        return client
+
+    def run_scenario(self, name, clients, requests, seed):
+        build = SCENARIOS[name]
+        states = [{"client": client, "rng": random.Random(seed + i)} for i, client in enumerate(clients)]
+
+        def fetch(state):
+            method, path, data, expected = build(state["rng"])
+            status, queries = state["client"].request(method, path, data)
+            return status == expected, queries
+
+        elapsed, results = run_concurrent(fetch, requests, states)
+        queries = [q for _, (_, q) in results if q is not None]
+        return {
+            "scenario": name,
+            "concurrency": len(clients),
+            **summarize([duration for duration, _ in results]),
+            "throughput_rps": round(requests / elapsed, 1),
+            "errors": sum(1 for _, (ok, _) in results if not ok),
+            "queries_mean": round(sum(queries) / len(queries), 1) if queries else None,
+            "queries_max": max(queries) if queries else None,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+    def compare(self, path, report):
+        try:
+            with open(path, encoding="utf-8") as f:
+                previous = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Cannot read {path}: {e}")
+        before = {(r["scenario"], r["concurrency"]): r for r in previous.get("results", [])}
+        self.stdout.write(f"Compared with {path} ({previous['meta'].get('commit')}, {previous['meta'].get('timestamp')}):")
+        for result in report["results"]:
+            old = before.get((result["scenario"], result["concurrency"]))
+            if not old:
+                continue
+            self.stdout.write(
+                f"{result['scenario']:8} c={result['concurrency']:<3} "
+                f"p95 {old['p95_ms']} -> {result['p95_ms']}ms ({_change(old['p95_ms'], result['p95_ms'])}), "
+                f"throughput {old['throughput_rps']} -> {result['throughput_rps']} req/s "
+                f"({_change(old['throughput_rps'], result['throughput_rps'])})"
+            )
+
+
+def _change(old, new):
+    return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
@@ -0,0 +1,70 @@
+import random
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from notes.benchmarks import summarize, time_calls
+from notes.datasets import WORDS
+from notes.models import note
+from notes.search import IContainsSearchBackend, get_search_backend
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Compare search latency of the full-text index against the icontains scan."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--username", help="Search this user's notes (default: generate a throwaway user).")
+        parser.add_argument("--generate", type=int, default=5000, help="Notes to generate when no username is given.")
+        parser.add_argument("--queries", default="project,data,\"release invoice\",kitchen garden,filler123")
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        queries = [q.strip() for q in options["queries"].split(",") if q.strip()]
+        if options["username"]:
+            try:
+                user = User.objects.get(username=options["username"])
+            except User.DoesNotExist:
+                raise CommandError(f"No user named {options['username']!r}.")
+            self.run(user, queries, options["repeat"])
+            return
+
+        # Generated data lives only inside this transaction.
+        try:
+            with transaction.atomic():
+                user = User.objects.create(username="__bench_search__")
+                rng = random.Random(0)
+                # A long tail of filler words keeps the common words selective.
+                vocabulary = WORDS + [f"filler{i}" for i in range(20000)]
+                notes = note.objects.bulk_create(
+                    note(
+                        user=user,
+                        title=" ".join(rng.choices(WORDS, k=3)),
+                        description=" ".join(rng.choices(vocabulary, k=120)),
+                        tag=rng.choice(WORDS),
+                    )
+                    for _ in range(options["generate"])
+                )
+                get_search_backend().index_notes(notes)
+                self.run(user, queries, options["repeat"])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def run(self, user, queries, repeat):
+        base = note.objects.filter(user=user, is_deleted=False)
+        backends = {"icontains": IContainsSearchBackend(), "fulltext": get_search_backend()}
+        self.stdout.write(f"Full-text backend: {type(backends['fulltext']).__name__}; notes: {base.count()}")
+        for query in queries:
+            for label, backend in backends.items():
+                ids = backend.filter(base, user, query).values_list("note_id", flat=True)
+                count = len(list(ids))
+                stats = summarize(time_calls(lambda: list(ids.all()), repeat))
+                self.stdout.write(
+                    f"{query!r:28} {label:10} matches={count:<6} "
+                    f"p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms mean={stats['mean_ms']}ms"
+                )
@@ -0,0 +1,130 @@
+import asyncio
+import importlib
+import random
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import clear_url_caches
+
+from notes.benchmarks import allow_test_client, run_concurrent, summarize
+from notes.datasets import WORDS
+from notes.models import note
+
+DEFAULT_PATHS = ["/notes/", "/notes/feed/", "/notes/api/notes/?fields=note_id,title,updated_at"]
+
+# (label, handler, NOTES_ASYNC_VIEWS)
+MODES = [
+    ("wsgi", "wsgi", False),
+    ("asgi, sync views", "asgi", False),
+    ("asgi, async views", "asgi", True),
+]
+
+
+def _reload_urls():
+    importlib.reload(importlib.import_module("notes.urls"))
+    importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+    clear_url_caches()
+
+
+@contextmanager
+def _views(async_views):
+    """Route the notes URLs to the sync or async views (the choice is normally made at import)."""
+    try:
+        with override_settings(NOTES_ASYNC_VIEWS=async_views):
+            _reload_urls()
+            yield
+    finally:
+        _reload_urls()
+
+
+class Command(BaseCommand):
+    help = "Compare notes view throughput under WSGI and ASGI (sync and async views) with concurrent clients."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--username", help="Request pages as this user (default: generate a throwaway user).")
+        parser.add_argument("--generate", type=int, default=500, help="Notes to generate when no username is given.")
+        parser.add_argument("--path", action="append", dest="paths", help="URL to request (repeatable).")
+        parser.add_argument("--requests", type=int, default=200, help="Requests per path and mode.")
+        parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients.")
+
+    def handle(self, *args, **options):
+        paths = options["paths"] or DEFAULT_PATHS
+        if options["username"]:
+            try:
+                user = User.objects.get(username=options["username"])
+            except User.DoesNotExist:
+                raise CommandError(f"No user named {options['username']!r}.")
+            self.run(user, paths, options["requests"], options["concurrency"])
+            return
+
+        # Concurrent clients use their own connections, so the data has to be
+        # committed; it is deleted again afterwards.
+        user = User.objects.create(username="__bench_views__")
+        try:
+            rng = random.Random(0)
+            note.objects.bulk_create(
+                note(
+                    user=user,
+                    title=" ".join(rng.choices(WORDS, k=3)),
+                    description=" ".join(rng.choices(WORDS, k=60)),
+                    tag=rng.choice(WORDS),
+                )
+                for _ in range(options["generate"])
+            )
+            self.run(user, paths, options["requests"], options["concurrency"])
+        finally:
+            user.delete()
+
+    def run(self, user, paths, requests, concurrency):
+        self.stdout.write(f"{requests} requests per path, {concurrency} concurrent clients")
+        for label, handler, async_views in MODES:
+            with _views(async_views), allow_test_client():
+                for path in paths:
+                    run = self.run_wsgi if handler == "wsgi" else self.run_asgi
+                    elapsed, samples = run(user, path, requests, concurrency)
+                    stats = summarize(samples)
+                    self.stdout.write(
+                        f"{label:18} {path:55} {requests / elapsed:8.1f} req/s "
+                        f"p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms p99={stats['p99_ms']}ms"
+                    )
+
+    def check_response(self, path, response):
+        if response.status_code != 200:
+            raise CommandError(f"GET {path} returned {response.status_code}.")
+
+    def run_wsgi(self, user, path, requests, concurrency):
+        """Threads sharing the work, each with its own logged-in client (as WSGI worker threads would)."""
+        clients = []
+        for _ in range(concurrency):
+            client = Client()
+            client.force_login(user)
+            clients.append(client)
+        elapsed, results = run_concurrent(
+            lambda client: self.check_response(path, client.get(path)), requests, clients
+        )
+        return elapsed, [duration for duration, _ in results]
+
+    def run_asgi(self, user, path, requests, concurrency):
+        """Coroutines on one event loop, each with its own logged-in client."""
+        async def client_loop(client, count, samples):
+            for _ in range(count):
+                start = time.perf_counter()
+                self.check_response(path, await client.get(path))
+                samples.append(time.perf_counter() - start)
+
+        async def main():
+            clients = [AsyncClient() for _ in range(concurrency)]
+            for client in clients:
+                await client.aforce_login(user)
+            counts = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+            samples = []
+            start = time.perf_counter()
+            await asyncio.gather(*(client_loop(c, n, samples) for c, n in zip(clients, counts)))
+            return time.perf_counter() - start, samples
+
+        return asyncio.run(main())
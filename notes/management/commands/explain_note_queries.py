@@ -0,0 +1,86 @@
+import re
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import QuerySet
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from notes.models import note_image
+from notes.views.utils import _page_queryset, encode_cursor, filter_notes, listing_queryset, listing_state_queries
+
+# SQLite: "SCAN notes_note" without "USING [COVERING] INDEX" is a full table scan.
+# Virtual tables (the FTS5 index) always report SCAN and are skipped.
+SQLITE_FULL_SCAN = re.compile(r"\bSCAN (\w+)\b(?! USING (?:COVERING )?INDEX)(?! VIRTUAL TABLE)")
+POSTGRES_FULL_SCAN = re.compile(r"Seq Scan on (\w+)")
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the queries behind the notes grid and fail if any of them does a full table scan."
+
+    # The querysets are built with the same helpers the views use, so the plans match what they run.
+
+    def add_arguments(self, parser):
+        parser.add_argument("--username", help="Plan the queries for this user (default: a placeholder id).")
+
+    def handle(self, *args, **options):
+        user = User.objects.get(username=options["username"]) if options["username"] else User(pk=0)
+        if connection.vendor == "postgresql":
+            # On small tables Postgres prefers seq scans; only flag scans it cannot avoid.
+            with connection.cursor() as cursor:
+                cursor.execute("SET enable_seqscan = off")
+
+        failures = []
+        for label, query in self.queries(user):
+            plan = query.explain() if isinstance(query, QuerySet) else self.explain_aggregate(*query)
+            scans = self.full_scans(plan)
+            status = self.style.ERROR("FULL SCAN") if scans else self.style.SUCCESS("ok")
+            self.stdout.write(f"{label:45} {status}")
+            if options["verbosity"] > 1 or scans:
+                self.stdout.write("    " + plan.replace("\n", "\n    "))
+            if scans:
+                failures.append(f"{label} ({', '.join(scans)})")
+
+        if failures:
+            raise CommandError("Full table scans in: " + "; ".join(failures))
+
+    def queries(self, user):
+        """(label, queryset) pairs, or (label, (queryset, aggregates)) for aggregates."""
+        page_size = settings.NOTES_PAGE_SIZE
+        filters = {
+            "no filters": (None, None, None),
+            "tag": ("work", None, None),
+            "color": (None, "#ffffff", None),
+            "tag + color": ("work", "#ffffff", None),
+            "search": (None, None, "meeting"),
+        }
+        for hidden in (False, True):
+            prefix = "hidden" if hidden else "visible"
+            for label, (tag, color, search) in filters.items():
+                notes, all_tags, all_colors = filter_notes(tag, color, user, listing_queryset(user, hidden), hidden, search)
+                # Ranked searches page by search_rank, everything else by updated_at.
+                if "search_rank" in notes.query.annotations:
+                    cursor = encode_cursor({"search_rank": -1.0, "note_id": 1})
+                else:
+                    cursor = encode_cursor({"updated_at": timezone.now(), "note_id": 1})
+                yield f"{prefix} / {label} / notes", _page_queryset(notes, None, page_size)
+                yield f"{prefix} / {label} / next page", _page_queryset(notes, cursor, page_size)
+                yield f"{prefix} / {label} / tag dropdown", all_tags
+                yield f"{prefix} / {label} / color dropdown", all_colors
+        yield "note images prefetch", note_image.objects.filter(note__in=[1, 2, 3])
+        for name, query in zip(("notes", "images"), listing_state_queries(user)):
+            yield f"conditional GET / {name} state", query
+
+    def explain_aggregate(self, queryset, aggregates):
+        """EXPLAIN the SQL of queryset.aggregate(), which runs at once instead of returning a queryset."""
+        with CaptureQueriesContext(connection) as captured:
+            queryset.aggregate(**aggregates)
+        with connection.cursor() as cursor:
+            cursor.execute(f"{connection.ops.explain_query_prefix()} {captured.captured_queries[-1]['sql']}")
+            return "\n".join(" ".join(str(column) for column in row) for row in cursor.fetchall())
+
+    def full_scans(self, plan):
+        pattern = POSTGRES_FULL_SCAN if connection.vendor == "postgresql" else SQLITE_FULL_SCAN
+        return sorted(set(pattern.findall(plan)))
@@ -0,0 +1,38 @@
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from notes.export import export_queryset, iter_jsonl, iter_zip
+
+
+class Command(BaseCommand):
+    help = "Export a user's notes as JSONL, or as a ZIP of JSONL plus image files."
+
+    def add_arguments(self, parser):
+        parser.add_argument("username")
+        parser.add_argument("--format", choices=["jsonl", "zip"], default="jsonl")
+        parser.add_argument("--output", help="File to write (default: stdout).")
+        parser.add_argument("--exclude-hidden", action="store_true")
+        parser.add_argument("--include-deleted", action="store_true", help="Also export soft-deleted notes.")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['username']!r}.")
+
+        notes = export_queryset(
+            user, include_hidden=not options["exclude_hidden"], include_deleted=options["include_deleted"]
+        )
+        chunks = iter_zip(notes) if options["format"] == "zip" else iter_jsonl(notes)
+
+        out = open(options["output"], "wb") if options["output"] else sys.stdout.buffer
+        try:
+            for chunk in chunks:
+                out.write(chunk)
+        finally:
+            if options["output"]:
+                out.close()
+        if options["output"]:
+            self.stderr.write(self.style.SUCCESS(f"Wrote {options['output']}"))
@@ -0,0 +1,56 @@
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from notes.datasets import BENCH_PASSWORD, BENCH_PIN, bench_users, create_bench_user, generate_user_notes
+
+
+class Command(BaseCommand):
+    help = "Generate benchmark users with Markdown notes, tags, colours and real image files."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10)
+        parser.add_argument("--notes", type=int, default=1000, help="Notes per user.")
+        parser.add_argument("--images", type=int, default=2, help="Images attached to each note that gets images.")
+        parser.add_argument("--image-share", type=float, default=0.25, help="Fraction of notes with images.")
+        parser.add_argument("--hidden-share", type=float, default=0.1)
+        parser.add_argument("--deleted-share", type=float, default=0.05)
+        parser.add_argument("--prefix", default="bench", help="Usernames are <prefix>_user_<n>.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--clear", action="store_true", help="Delete existing users with this prefix first.")
+        parser.add_argument(
+            "--defer-images", action="store_true",
+            help="Leave image variants to the task workers instead of generating them now.",
+        )
+
+    def handle(self, *args, **options):
+        prefix = options["prefix"]
+        existing = bench_users(prefix)
+        if existing.exists():
+            if not options["clear"]:
+                raise CommandError(f"Users with prefix {prefix!r} already exist; pass --clear to replace them.")
+            # Deleting users removes their notes; image files go with the note_image rows.
+            count = existing.count()
+            existing.delete()
+            self.stdout.write(f"Deleted {count} existing {prefix} users.")
+
+        rng = random.Random(options["seed"])
+        mode = {} if options["defer_images"] else {"NOTES_TASKS_MODE": "eager"}
+        totals = {"imported": 0, "images": 0}
+        with override_settings(**mode):
+            for i in range(options["users"]):
+                user = create_bench_user(f"{prefix}_user_{i}")
+                stats = generate_user_notes(
+                    user, options["notes"], rng,
+                    images_per_note=options["images"], image_share=options["image_share"],
+                    hidden_share=options["hidden_share"], deleted_share=options["deleted_share"],
+                )
+                totals["imported"] += stats["imported"]
+                totals["images"] += stats["images"]
+                self.stdout.write(f"{user.username}: {stats['imported']} notes, {stats['images']} images")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {options['users']} users, {totals['imported']} notes and {totals['images']} images. "
+            f"Password {BENCH_PASSWORD!r}, PIN {BENCH_PIN!r}."
+        ))
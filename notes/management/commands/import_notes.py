@@ -0,0 +1,53 @@
+import json
+import time
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from notes.importers import DEFAULT_BATCH_SIZE, import_source
+
+
+class Command(BaseCommand):
+    help = "Bulk import notes for a user from Markdown files, JSONL, or an export ZIP."
+
+    def add_arguments(self, parser):
+        parser.add_argument("username")
+        parser.add_argument("source", help="Markdown file or directory, .jsonl file, or export .zip")
+        parser.add_argument("--format", choices=["markdown", "jsonl", "zip"], help="Default: detected from the path.")
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument("--resume", action="store_true", help="Continue from the row recorded in the state file.")
+        parser.add_argument("--state-file", help="Progress file (default: <source>.import-state.json).")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['username']!r}.")
+
+        source = options["source"]
+        state_file = Path(options["state_file"] or f"{source.rstrip('/')}.import-state.json")
+        start = 0
+        if options["resume"] and state_file.exists():
+            start = json.loads(state_file.read_text())["next_row"]
+            self.stdout.write(f"Resuming at row {start}.")
+
+        began = time.perf_counter()
+
+        def progress(next_row, stats):
+            state_file.write_text(json.dumps({"source": source, "next_row": next_row}))
+            elapsed = time.perf_counter() - began
+            rate = stats["imported"] / elapsed if elapsed else 0
+            self.stdout.write(
+                f"row {next_row}: {stats['imported']} imported, {stats['skipped']} skipped ({rate:,.0f} notes/s)"
+            )
+
+        stats = import_source(
+            user, source, options["format"], start=start, batch_size=options["batch_size"], on_progress=progress
+        )
+        for error in stats["errors"]:
+            self.stderr.write(f"row {error['row']}: {'; '.join(error['errors'])}")
+        state_file.unlink(missing_ok=True)
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats['imported']} notes and {stats['images']} images; skipped {stats['skipped']} rows."
+        ))
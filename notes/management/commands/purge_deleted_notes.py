@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from notes.models import note, note_image
+
+
+class Command(BaseCommand):
+    help = "Permanently delete soft-deleted notes past the retention period, with their images and files."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=settings.NOTES_PURGE_AFTER_DAYS,
+            help="Keep soft-deleted notes this many days (default: NOTES_PURGE_AFTER_DAYS).",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--dry-run", action="store_true", help="Report what would be purged without deleting.")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        expired = note.objects.filter(is_deleted=True, deleted_at__lt=cutoff)
+
+        if options["dry_run"]:
+            images = note_image.objects.filter(note__in=expired)
+            self.stdout.write(self.style.SUCCESS(
+                f"Would purge {expired.count()} notes and {images.count()} images deleted before {cutoff:%Y-%m-%d %H:%M}."
+            ))
+            return
+
+        purged_notes, purged_images = 0, 0
+        while True:
+            ids = list(expired.order_by("deleted_at").values_list("note_id", flat=True)[: options["batch_size"]])
+            if not ids:
+                break
+            # One transaction per batch; image files are removed when it commits.
+            with transaction.atomic():
+                _, deleted = note.objects.filter(note_id__in=ids).delete()
+            purged_notes += deleted.get(note._meta.label, 0)
+            purged_images += deleted.get(note_image._meta.label, 0)
+            self.stdout.write(f"Purged {purged_notes} notes so far...")
+
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged_notes} notes and {purged_images} images."))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from notes.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for all notes."
+
+    def handle(self, *args, **options):
+        get_search_backend.cache_clear()
+        backend = get_search_backend()
+        backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt search index ({type(backend).__name__})."))
@@ -0,0 +1,92 @@
+import posixpath
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from notes.images import delete_files
+from notes.models import Profile, note_image
+from notes.tasks import enqueue
+
+# Media folders owned by note images and profile pictures. In-progress
+# uploads (imports/) are left alone.
+MEDIA_DIRS = ["notes/images", "profiles"]
+
+
+def walk(directory):
+    """Yield every file name under a storage directory, recursively."""
+    try:
+        dirs, files = default_storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for name in files:
+        yield posixpath.join(directory, name)
+    for sub in dirs:
+        yield from walk(posixpath.join(directory, sub))
+
+
+class Command(BaseCommand):
+    help = "Find media files with no database row and image rows whose files are missing, and clean both up."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would change.")
+        parser.add_argument(
+            "--min-age", type=int, default=60,
+            help="Minutes a file must exist before it counts as orphaned (skips uploads still in flight).",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        referenced = set()
+        missing_images, missing_variants, missing_pictures = [], [], []
+
+        # width/height too: the ImageField reads them on load, and deferring them costs a query per row.
+        images = note_image.objects.only("image_id", "image", "width", "height", "variants")
+        for img in images.iterator(chunk_size=500):
+            names = [v["name"] for v in img.variants]
+            referenced.update(names)
+            if img.image:
+                referenced.add(img.image.name)
+                if not default_storage.exists(img.image.name):
+                    # Deleting the row later also removes its variants.
+                    missing_images.append(img.image_id)
+                    continue
+            if any(not default_storage.exists(name) for name in names):
+                missing_variants.append(img.image_id)
+
+        for pk, name in Profile.objects.exclude(profile_picture="").exclude(profile_picture__isnull=True).values_list(
+            "pk", "profile_picture"
+        ):
+            referenced.add(name)
+            if not default_storage.exists(name):
+                missing_pictures.append(pk)
+
+        cutoff = timezone.now() - timedelta(minutes=options["min_age"])
+        orphans = [
+            name for directory in MEDIA_DIRS for name in walk(directory)
+            if name not in referenced and default_storage.get_modified_time(name) < cutoff
+        ]
+
+        for name in orphans:
+            self.stdout.write(f"orphaned file: {name}")
+        for image_id in missing_images:
+            self.stdout.write(f"image {image_id}: file missing")
+        for image_id in missing_variants:
+            self.stdout.write(f"image {image_id}: variants missing")
+        for pk in missing_pictures:
+            self.stdout.write(f"profile {pk}: picture missing")
+
+        if not dry_run:
+            delete_files(orphans)
+            # Rows without their original cannot be displayed or regenerated.
+            note_image.objects.filter(image_id__in=missing_images).delete()
+            for image_id in missing_variants:
+                enqueue("process_note_image", image_id=image_id)
+            Profile.objects.filter(pk__in=missing_pictures).update(profile_picture=None)
+
+        verb = "Found" if dry_run else "Fixed"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {len(orphans)} orphaned files, {len(missing_images)} images without a file, "
+            f"{len(missing_variants)} images with missing variants, {len(missing_pictures)} missing profile pictures."
+        ))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from notes.images import generate_variants
+from notes.models import note_image
+
+
+class Command(BaseCommand):
+    help = "Generate resized WebP/JPEG variants for existing note images."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--missing-only", action="store_true", help="Skip images that already have variants.")
+        parser.add_argument("--batch-size", type=int, default=100)
+
+    def handle(self, *args, **options):
+        images = note_image.objects.exclude(image="").order_by("image_id")
+        if options["missing_only"]:
+            images = images.filter(variants=[])
+
+        processed, failed = 0, 0
+        for img in images.iterator(chunk_size=options["batch_size"]):
+            if generate_variants(img):
+                processed += 1
+            else:
+                failed += 1
+                self.stderr.write(f"Could not read image {img.image_id} ({img.image.name})")
+
+        self.stdout.write(self.style.SUCCESS(f"Generated variants for {processed} images ({failed} unreadable)."))
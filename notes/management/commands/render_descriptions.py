@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from notes.models import note
+
+
+class Command(BaseCommand):
+    help = "Backfill or refresh the stored Markdown HTML of notes whose content or renderer version changed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Re-render every note, even if up to date.")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        notes = note.objects.only("note_id", "description", "description_html", "description_hash").order_by("note_id")
+
+        batch, checked, rendered = [], 0, 0
+        for n in notes.iterator(chunk_size=batch_size):
+            checked += 1
+            if n.render_description(force=options["force"]):
+                batch.append(n)
+            if len(batch) >= batch_size:
+                # bulk_update skips auto_now, so updated_at is left untouched.
+                note.objects.bulk_update(batch, ["description_html", "description_hash"])
+                rendered += len(batch)
+                batch = []
+        if batch:
+            note.objects.bulk_update(batch, ["description_html", "description_hash"])
+            rendered += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Rendered {rendered} of {checked} notes."))
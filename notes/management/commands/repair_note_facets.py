@@ -0,0 +1,28 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from notes.facets import rebuild_user_facets
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-user tag/color facet counts from the notes table, fixing any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--username", help="Only repair this user's facets.")
+        parser.add_argument("--dry-run", action="store_true", help="Report drift without fixing it.")
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by("pk")
+        if options["username"]:
+            users = users.filter(username=options["username"])
+
+        fixed_users, fixed_rows = 0, 0
+        for user_id, username in users.values_list("pk", "username").iterator():
+            drift = rebuild_user_facets(user_id, dry_run=options["dry_run"])
+            if drift:
+                fixed_users += 1
+                fixed_rows += drift
+                self.stdout.write(f"{username}: {drift} facet rows out of date")
+
+        verb = "Found" if options["dry_run"] else "Repaired"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {fixed_rows} facet rows across {fixed_users} users."))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notes.tasks import run_pending
+
+
+class Command(BaseCommand):
+    help = "Run queued background tasks (image processing, ...). Loops until interrupted unless --once is given."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Drain the due tasks once and exit.")
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument("--sleep", type=float, default=2.0, help="Seconds to wait when the queue is empty.")
+
+    def handle(self, *args, **options):
+        while True:
+            ran = run_pending(limit=options["batch_size"])
+            if ran:
+                self.stdout.write(f"Ran {ran} tasks.")
+            if options["once"]:
+                break
+            if not ran:
+                time.sleep(options["sleep"])
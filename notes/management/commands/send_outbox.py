@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notes.mail import BATCH_SIZE, purge_finished, send_pending
+
+
+class Command(BaseCommand):
+    help = "Deliver queued emails from the outbox, retrying failures. Loops until interrupted unless --once is given."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Send the due emails once and exit.")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Emails sent per connection.")
+        parser.add_argument("--sleep", type=float, default=10.0, help="Seconds to wait when nothing is due.")
+
+    def handle(self, *args, **options):
+        purged = purge_finished()
+        if purged:
+            self.stdout.write(f"Deleted {purged} finished emails past the retention period.")
+        while True:
+            sent, failed = send_pending(limit=options["batch_size"])
+            if sent or failed:
+                self.stdout.write(f"Sent {sent} emails, {failed} failed.")
+            if options["once"] and not (sent or failed):
+                break
+            if not (sent or failed):
+                time.sleep(options["sleep"])
@@ -0,0 +1,97 @@
+import random
+
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, transaction
+
+from notes.benchmarks import run_concurrent, summarize
+from notes.datasets import COLORS, TAGS, WORDS
+from notes.models import note
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer the database with concurrent note saves, session writes and listing reads, and report "
+        "throughput, latency and lock errors."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--operations", type=int, default=1000, help="Total operations across all threads.")
+        parser.add_argument("--read-share", type=float, default=0.3, help="Fraction of operations that only read.")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.describe_database()
+        # Worker threads use their own connections, so the data has to be
+        # committed; it is deleted again afterwards.
+        user = User.objects.create(username="__stress_db__")
+        existing = [n.note_id for n in note.objects.bulk_create(
+            note(user=user, title=f"stress {i}", description="seed") for i in range(50)
+        )]
+        sessions = []
+        try:
+            states = [{"rng": random.Random(options["seed"] + i)} for i in range(options["threads"])]
+
+            def operation(state):
+                rng = state["rng"]
+                kind = "read" if rng.random() < options["read_share"] else rng.choice(["create", "update", "session"])
+                try:
+                    if kind == "read":
+                        list(note.objects.filter(user=user, is_deleted=False).order_by("-updated_at")[:24])
+                    elif kind == "create":
+                        note.objects.create(
+                            user=user, title=" ".join(rng.choices(WORDS, k=3)),
+                            description=" ".join(rng.choices(WORDS, k=40)),
+                            tag=rng.choice(TAGS), color=rng.choice(COLORS),
+                        )
+                    elif kind == "update":
+                        # Read, then write in one transaction, as the edit view does.
+                        with transaction.atomic():
+                            n = note.objects.get(pk=rng.choice(existing))
+                            n.title = " ".join(rng.choices(WORDS, k=3))
+                            n.save(update_fields=["title", "updated_at"])
+                    else:
+                        session = SessionStore()
+                        session["stress"] = rng.random()
+                        session.save()
+                        sessions.append(session.session_key)
+                except OperationalError as e:
+                    return kind, str(e)
+                return kind, None
+
+            elapsed, results = run_concurrent(operation, options["operations"], states)
+        finally:
+            user.delete()
+            SessionStore.get_model_class().objects.filter(session_key__in=sessions).delete()
+
+        errors = {}
+        for _, (_, error) in results:
+            if error:
+                errors[error] = errors.get(error, 0) + 1
+        stats = summarize([duration for duration, _ in results])
+        self.stdout.write(
+            f"{options['operations']} operations on {options['threads']} threads: "
+            f"{options['operations'] / elapsed:.1f} ops/s, p50={stats['p50_ms']}ms "
+            f"p95={stats['p95_ms']}ms p99={stats['p99_ms']}ms"
+        )
+        for error, count in sorted(errors.items(), key=lambda item: -item[1]):
+            self.stdout.write(self.style.ERROR(f"{count} x {error}"))
+        if not errors:
+            self.stdout.write(self.style.SUCCESS("No database errors."))
+
+    def describe_database(self):
+        settings_dict = connection.settings_dict
+        line = f"{connection.vendor}, CONN_MAX_AGE={settings_dict['CONN_MAX_AGE']}"
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                pragmas = []
+                for pragma in ("journal_mode", "busy_timeout", "synchronous"):
+                    cursor.execute(f"PRAGMA {pragma}")
+                    pragmas.append(f"{pragma}={cursor.fetchone()[0]}")
+            line += ", " + ", ".join(pragmas)
+            line += f", transaction_mode={settings_dict['OPTIONS'].get('transaction_mode') or 'DEFERRED'}"
+        elif settings_dict["OPTIONS"].get("pool"):
+            line += f", pool={settings_dict['OPTIONS']['pool']}"
+        self.stdout.write(line)
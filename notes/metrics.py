@@ -0,0 +1,345 @@
+"""Per-view request metrics, exposed in Prometheus text format.
+
+MetricsMiddleware records, for each URL name: requests by status class, a
+latency histogram, and the number and total time of database queries (counted
+by a connection execute wrapper). Code wrapped in ``timed(section)`` adds its
+time to the request being served. Labels are URL names and fixed section
+names, so the registry stays small however long the process runs.
+
+Every process keeps its own registry. With NOTES_METRICS_DIR set, each one
+writes a snapshot file there at most every NOTES_METRICS_FLUSH_INTERVAL
+seconds, and ``collect()`` adds up all files. Files of processes that have
+exited are folded into a single archive file, so the directory holds one file
+per live process plus one.
+"""
+import atexit
+import contextvars
+import json
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+try:
+    import fcntl
+except ImportError:  # Windows: exited processes' files are left in place.
+    fcntl = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+ARCHIVE_FILE = "archive.json"
+
+# name: (type, help)
+METRICS = {
+    "notes_requests_total": ("counter", "Requests by view, method and status class."),
+    "notes_request_duration_seconds": ("histogram", "Request latency by view."),
+    "notes_db_queries_total": ("counter", "Database queries run while serving each view."),
+    "notes_db_query_seconds_total": ("counter", "Time spent in database queries by view."),
+    "notes_section_seconds_total": ("counter", "Time spent in instrumented code sections by view."),
+    "notes_section_calls_total": ("counter", "Calls of instrumented code sections by view."),
+}
+
+# Query and section totals of the request being served. A context variable,
+# so async views and their sync_to_async threads share it.
+_current = contextvars.ContextVar("notes_metrics_request", default=None)
+
+
+class Registry:
+    """Counters and histograms keyed by (metric name, label pairs)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def inc(self, name, labels, value=1):
+        key = (name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        key = (name, labels)
+        with self.lock:
+            counts = self.histograms.get(key)
+            if counts is None:
+                # One slot per bucket, one for +Inf, then the sum.
+                counts = self.histograms[key] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+            index = next((i for i, bound in enumerate(LATENCY_BUCKETS) if value <= bound), len(LATENCY_BUCKETS))
+            counts[index] += 1
+            counts[-1] += value
+
+    def snapshot(self):
+        """JSON-friendly copy of the current values."""
+        with self.lock:
+            return {
+                "counters": [[name, [list(p) for p in labels], value] for (name, labels), value in self.counters.items()],
+                "histograms": [[name, [list(p) for p in labels], list(c)] for (name, labels), c in self.histograms.items()],
+            }
+
+    def merge(self, snapshot):
+        """Add a snapshot (from another process) to this registry."""
+        with self.lock:
+            for name, labels, value in snapshot.get("counters", []):
+                key = (name, tuple(tuple(p) for p in labels))
+                self.counters[key] = self.counters.get(key, 0) + value
+            for name, labels, counts in snapshot.get("histograms", []):
+                key = (name, tuple(tuple(p) for p in labels))
+                current = self.histograms.get(key)
+                if current is None or len(current) != len(counts):
+                    self.histograms[key] = list(counts)
+                else:
+                    self.histograms[key] = [a + b for a, b in zip(current, counts)]
+
+
+registry = Registry()
+
+
+# ======================================================
+# Recording
+# ======================================================
+
+def _db_wrapper(execute, sql, params, many, context):
+    state = _current.get()
+    if state is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        state["queries"] += 1
+        state["db_seconds"] += time.perf_counter() - start
+
+
+@receiver(connection_created)
+def install_db_wrapper(sender, connection, **kwargs):
+    if _db_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_db_wrapper)
+
+
+@contextmanager
+def timed(section):
+    """Add the time spent in the block to `section` for the current request (no-op outside requests)."""
+    state = _current.get()
+    if state is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        totals = state["sections"].setdefault(section, [0, 0.0])
+        totals[0] += 1
+        totals[1] += time.perf_counter() - start
+
+
+def record_request(request, response, state, duration):
+    match = getattr(request, "resolver_match", None)
+    view = match.view_name if match else "<unmatched>"
+    method = request.method if request.method in METHODS else "OTHER"
+    status = f"{response.status_code // 100}xx" if response is not None else "5xx"
+
+    registry.inc("notes_requests_total", (("view", view), ("method", method), ("status", status)))
+    registry.observe("notes_request_duration_seconds", (("view", view),), duration)
+    if state["queries"]:
+        registry.inc("notes_db_queries_total", (("view", view),), state["queries"])
+        registry.inc("notes_db_query_seconds_total", (("view", view),), state["db_seconds"])
+    for section, (calls, seconds) in state["sections"].items():
+        labels = (("view", view), ("section", section))
+        registry.inc("notes_section_calls_total", labels, calls)
+        registry.inc("notes_section_seconds_total", labels, seconds)
+    _store.maybe_flush()
+
+
+class MetricsMiddleware:
+    """Time each request and count its queries; see the module docstring."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _start(self):
+        state = {"queries": 0, "db_seconds": 0.0, "sections": {}}
+        return state, _current.set(state), time.perf_counter()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state, token, start = self._start()
+        response = None
+        try:
+            response = self.get_response(request)
+            return response
+        finally:
+            _current.reset(token)
+            record_request(request, response, state, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        state, token, start = self._start()
+        response = None
+        try:
+            response = await self.get_response(request)
+            return response
+        finally:
+            _current.reset(token)
+            record_request(request, response, state, time.perf_counter() - start)
+
+
+# ======================================================
+# Multi-process storage
+# ======================================================
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+def _read(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write(path, snapshot):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f)
+    os.replace(tmp, path)
+
+
+class _FileStore:
+    """This process's snapshot file in NOTES_METRICS_DIR (see the module docstring)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pid = None
+        self.path = None
+        self.last_flush = 0.0
+
+    def directory(self):
+        return getattr(settings, "NOTES_METRICS_DIR", None)
+
+    def own_path(self, directory):
+        if self.pid != os.getpid():
+            # First flush in this process (or in a child forked after import).
+            self.pid = os.getpid()
+            self.path = os.path.join(directory, f"{socket.gethostname()}-{self.pid}-{time.time_ns():x}.json")
+        return self.path
+
+    def maybe_flush(self):
+        directory = self.directory()
+        interval = getattr(settings, "NOTES_METRICS_FLUSH_INTERVAL", 10)
+        if not directory or time.monotonic() - self.last_flush < interval:
+            return
+        self.flush()
+
+    def flush(self):
+        directory = self.directory()
+        if not directory:
+            return
+        with self.lock:
+            self.last_flush = time.monotonic()
+            os.makedirs(directory, exist_ok=True)
+            _write(self.own_path(directory), registry.snapshot())
+
+    def archive_exited(self, directory):
+        """Fold snapshot files of exited processes on this host into the archive file."""
+        if fcntl is None:
+            return
+        host = socket.gethostname()
+        with open(os.path.join(directory, ".lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                exited = []
+                for name in os.listdir(directory):
+                    file_host, _, rest = name.rpartition("-")[0].rpartition("-")
+                    if file_host == host and rest.isdigit() and name.endswith(".json") and not _pid_alive(int(rest)):
+                        exited.append(os.path.join(directory, name))
+                if not exited:
+                    return
+                archive = Registry()
+                archive.merge(_read(os.path.join(directory, ARCHIVE_FILE)) or {})
+                for path in exited:
+                    archive.merge(_read(path) or {})
+                _write(os.path.join(directory, ARCHIVE_FILE), archive.snapshot())
+                for path in exited:
+                    os.remove(path)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def collect(self):
+        """Registry with the totals of every process (just this one without NOTES_METRICS_DIR)."""
+        directory = self.directory()
+        if not directory:
+            return registry
+        self.flush()
+        self.archive_exited(directory)
+        total = Registry()
+        for name in os.listdir(directory):
+            if name.endswith(".json"):
+                total.merge(_read(os.path.join(directory, name)) or {})
+        return total
+
+
+_store = _FileStore()
+atexit.register(_store.flush)
+
+
+def collect():
+    return _store.collect()
+
+
+# ======================================================
+# Prometheus text format
+# ======================================================
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs):
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    return repr(round(value, 6)) if isinstance(value, float) else str(value)
+
+
+def render(reg):
+    """The registry in the Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    with reg.lock:
+        counters, histograms = dict(reg.counters), {k: list(v) for k, v in reg.histograms.items()}
+    for name, (kind, help_text) in METRICS.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        if kind == "counter":
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+            continue
+        for (metric, labels), counts in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip((*LATENCY_BUCKETS, "+Inf"), counts[:-1]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels((*labels, ('le', bound)))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(counts[-1])}")
+            lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,84 @@
+import mimetypes
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+# Preferred first; each maps to the suffix written by notes.staticfiles.
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "public, max-age=0, must-revalidate"
+
+
+def accepted_encodings(header):
+    """Encodings the client accepts (q > 0) from an Accept-Encoding header."""
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class PrecompressedStaticMiddleware:
+    """Serve collected static files from STATIC_ROOT with long-lived caching.
+
+    Content-hashed names (from the staticfiles manifest) are marked immutable
+    for a year; anything else must be revalidated. If the client accepts br
+    or gzip and a precompressed copy exists, that copy is sent instead.
+    Requests for files that are not in STATIC_ROOT pass through unchanged.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = "/" + settings.STATIC_URL.lstrip("/")
+        self.root = settings.STATIC_ROOT and str(settings.STATIC_ROOT)
+        self.hashed_names = set(getattr(staticfiles_storage, "hashed_files", {}).values())
+
+    def __call__(self, request):
+        if self.root and request.method in ("GET", "HEAD") and request.path.startswith(self.prefix):
+            response = self.serve(request, request.path[len(self.prefix):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def serve(self, request, name):
+        try:
+            path = safe_join(self.root, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            return None
+
+        stat = os.stat(path)
+        if not was_modified_since(request.META.get("HTTP_IF_MODIFIED_SINCE"), stat.st_mtime):
+            response = HttpResponseNotModified()
+        else:
+            content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            accepted = accepted_encodings(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+            encoding = next(
+                ((coding, suffix) for coding, suffix in ENCODINGS if coding in accepted and os.path.isfile(path + suffix)),
+                None,
+            )
+            if encoding:
+                response = FileResponse(open(path + encoding[1], "rb"), content_type=content_type)
+                response.headers["Content-Encoding"] = encoding[0]
+            else:
+                response = FileResponse(open(path, "rb"), content_type=content_type)
+            response.headers["Last-Modified"] = http_date(stat.st_mtime)
+
+        response.headers["Cache-Control"] = IMMUTABLE if name in self.hashed_names else REVALIDATE
+        patch_vary_headers(response, ["Accept-Encoding"])
+        return response
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0003_profile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='note',
+            name='description_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='description_html',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:59
+
+from django.core.files.images import get_image_dimensions
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+
+def backfill_dimensions(apps, schema_editor):
+    note_image = apps.get_model('notes', 'note_image')
+    # values_list avoids instantiating rows, which would make the ImageField
+    # open every file through its post_init dimension hook.
+    rows = note_image.objects.filter(width__isnull=True).exclude(image='').values_list('image_id', 'image')
+    for image_id, name in rows.iterator():
+        try:
+            with default_storage.open(name) as f:
+                width, height = get_image_dimensions(f)
+        except OSError:
+            continue
+        if width and height:
+            note_image.objects.filter(image_id=image_id).update(
+                width=width, height=height, aspect_ratio=height / width
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0004_note_description_html'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='note_image',
+            name='aspect_ratio',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='note_image',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='note_image',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='note_image',
+            name='image',
+            field=models.ImageField(height_field='height', upload_to='notes/images/', width_field='width'),
+        ),
+        migrations.RunPython(backfill_dimensions, migrations.RunPython.noop),
+    ]
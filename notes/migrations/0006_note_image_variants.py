@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0005_note_image_dimensions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='note_image',
+            name='variants',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+PG_VECTOR = "to_tsvector('simple', COALESCE(title, '') || ' ' || COALESCE(tag, '') || ' ' || description)"
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS notes_note_fts USING fts5("
+                "title, description, tag, user_id UNINDEXED, tokenize = 'unicode61 remove_diacritics 2')"
+            )
+        except OperationalError:
+            # SQLite built without FTS5: search falls back to icontains.
+            return
+        schema_editor.execute(
+            "INSERT INTO notes_note_fts (rowid, title, description, tag, user_id) "
+            "SELECT note_id, COALESCE(title, ''), description, tag, user_id FROM notes_note"
+        )
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS notes_note_search_idx ON notes_note USING GIN ({PG_VECTOR})"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS notes_note_fts")
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS notes_note_search_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0006_note_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
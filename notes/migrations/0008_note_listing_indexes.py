@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:03
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0007_note_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(condition=models.Q(('is_deleted', False), ('is_hidden', False)), fields=['user', '-updated_at', '-note_id'], name='note_user_visible_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(condition=models.Q(('is_deleted', False), ('is_hidden', True)), fields=['user', '-updated_at', '-note_id'], name='note_user_hidden_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(models.F('user'), django.db.models.functions.text.Lower('tag'), name='note_user_tag_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(models.F('user'), django.db.models.functions.text.Lower('color'), name='note_user_color_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_facets(apps, schema_editor):
+    note = apps.get_model('notes', 'note')
+    note_facet = apps.get_model('notes', 'note_facet')
+    rows = (
+        note.objects.filter(is_deleted=False)
+        .values('user_id', 'is_hidden', 'tag', 'color')
+        .annotate(total=Count('pk'))
+    )
+    note_facet.objects.bulk_create(
+        note_facet(
+            user_id=row['user_id'], is_hidden=row['is_hidden'],
+            tag=row['tag'] or '', color=row['color'] or '', count=row['total'],
+        )
+        for row in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0008_note_listing_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='note_facet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_hidden', models.BooleanField(default=False)),
+                ('tag', models.CharField(blank=True, max_length=50)),
+                ('color', models.CharField(blank=True, max_length=7)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'is_hidden', 'tag', 'color'), name='note_facet_unique')],
+            },
+        ),
+        migrations.RunPython(populate_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0010_background_tasks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='background_task',
+            name='result',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
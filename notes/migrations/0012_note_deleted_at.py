@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:17
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_deleted_at(apps, schema_editor):
+    # The last edit of an already soft-deleted note is the best guess at when it was deleted.
+    note = apps.get_model('notes', 'note')
+    note.objects.filter(is_deleted=True, deleted_at__isnull=True).update(deleted_at=F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0011_background_task_result'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='note',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_deleted_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['deleted_at'], name='note_deleted_at_idx'),
+        ),
+    ]
@@ -1,11 +1,16 @@
 from django.db import models
+from django.db.models.functions import Lower
+from django.core.files.storage import default_storage
 from django.contrib.auth.models import User
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-import bleach
-import markdown
+from django.utils import timezone
 from django.utils.safestring import mark_safe
 
+from .images import oriented_size
+from .metrics import timed
+from .rendering import description_hash, render_markdown
+
 # Create your models here.
 class note(models.Model):
     note_id = models.AutoField(primary_key=True)
@@ -16,25 +21,184 @@ class note(models.Model):
     color = models.CharField(max_length=7, default="#ffffff")
     is_hidden = models.BooleanField(default=False)
     is_deleted = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(blank=True, null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    description_html = models.TextField(blank=True, default="", editable=False)
+    description_hash = models.CharField(max_length=64, blank=True, default="", editable=False)
+
+    class Meta:
+        indexes = [
+            # Notes grid: a user's live notes, newest first (keyset order). Partial
+            # indexes because boolean filters compile to NOT col, not col = value.
+            models.Index(
+                fields=["user", "-updated_at", "-note_id"],
+                condition=models.Q(is_deleted=False, is_hidden=False),
+                name="note_user_visible_idx",
+            ),
+            models.Index(
+                fields=["user", "-updated_at", "-note_id"],
+                condition=models.Q(is_deleted=False, is_hidden=True),
+                name="note_user_hidden_idx",
+            ),
+            # Case-insensitive tag/colour filters (matched via Lower() in filter_notes).
+            models.Index(models.F("user"), Lower("tag"), name="note_user_tag_idx"),
+            models.Index(models.F("user"), Lower("color"), name="note_user_color_idx"),
+            # purge_deleted_notes: soft-deleted notes past the retention period.
+            models.Index(fields=["deleted_at"], condition=models.Q(is_deleted=True), name="note_deleted_at_idx"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Values as loaded, so signal handlers can see what a save changed.
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def render_description(self, force=False):
+        """Refresh the stored HTML if the description or renderer changed. Returns True if re-rendered."""
+        key = description_hash(self.description)
+        if not force and key == self.description_hash:
+            return False
+        self.description_html = render_markdown(self.description)
+        self.description_hash = key
+        return True
+
+    def save(self, *args, **kwargs):
+        if self.render_description() and kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "description_html", "description_hash"}
+        super().save(*args, **kwargs)
 
     def formatted_description(self):
-        html = markdown.markdown(self.description, extensions=['fenced_code', 'tables'])
-        clean_html = bleach.clean(html, tags=['p','pre','code','strong','em','ul','ol','li','a','h1','h2','h3','blockquote'])
-        return mark_safe(clean_html)
+        with timed("formatted_description"):
+            if self.description_hash != description_hash(self.description):
+                # Stale or not yet backfilled: render for this request only.
+                return mark_safe(render_markdown(self.description))
+            return mark_safe(self.description_html)
 
     def __str__(self):
         return f'{self.user.username} - {self.note_id}';
 
+class note_facet(models.Model):
+    """Per-user count of live notes for each (visibility, tag, color) combination.
+
+    Feeds the tag/color dropdowns; kept current by note signals (see facets.py).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    is_hidden = models.BooleanField(default=False)
+    tag = models.CharField(max_length=50, blank=True)
+    color = models.CharField(max_length=7, blank=True)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "is_hidden", "tag", "color"], name="note_facet_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.tag or '-'} {self.color} ({self.count})"
+
+
 class note_image(models.Model):
     image_id = models.AutoField(primary_key=True)
     note = models.ForeignKey(note, on_delete=models.CASCADE)
-    image = models.ImageField(upload_to="notes/images/", max_length=None)
+    image = models.ImageField(upload_to="notes/images/", max_length=None, width_field="width", height_field="height")
+    width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    height = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    aspect_ratio = models.FloatField(blank=True, null=True, editable=False)
+    variants = models.JSONField(default=list, blank=True, editable=False)
+
+    PENDING, READY, FAILED = "pending", "ready", "failed"
+    STATUS_CHOICES = [(PENDING, "Processing"), (READY, "Ready"), (FAILED, "Failed")]
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING, editable=False)
+
+    def save(self, *args, **kwargs):
+        # width/height are filled by the ImageField from the raw pixels when a new
+        # upload is stored; store it first, then correct them for EXIF rotation.
+        if self.image and not self.image._committed:
+            self.image.save(self.image.name, self.image.file, save=False)
+            try:
+                with self.image.open("rb") as f:
+                    self.width, self.height = oriented_size(f)
+            except (OSError, ValueError):
+                pass
+        self.aspect_ratio = self.height / self.width if self.width and self.height else None
+        super().save(*args, **kwargs)
+
+    def _srcset(self, fmt):
+        return ", ".join(
+            f"{default_storage.url(v['name'])} {v['width']}w" for v in self.variants if v["format"] == fmt
+        )
+
+    @property
+    def webp_srcset(self):
+        return self._srcset("webp")
+
+    @property
+    def jpeg_srcset(self):
+        return self._srcset("jpeg")
+
+    @property
+    def display_url(self):
+        """Smallest JPEG variant, falling back to the original upload."""
+        jpegs = [v for v in self.variants if v["format"] == "jpeg"]
+        if jpegs:
+            return default_storage.url(min(jpegs, key=lambda v: v["width"])["name"])
+        return self.image.url
 
     def __str__(self):
         return f"Image {self.image_id} for Note_ID: {self.note.note_id}"
     
+class background_task(models.Model):
+    """A unit of deferred work, drained by `manage.py run_tasks` (see tasks.py)."""
+    PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+    STATUS_CHOICES = [(PENDING, "Pending"), (RUNNING, "Running"), (DONE, "Done"), (FAILED, "Failed")]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    result = models.JSONField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "run_after"], name="task_queue_idx")]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
+class outbound_email(models.Model):
+    """A queued email, delivered in batches over one connection by notes/mail.py."""
+    PENDING, SENDING, SENT, FAILED = "pending", "sending", "sent", "failed"
+    STATUS_CHOICES = [(PENDING, "Pending"), (SENDING, "Sending"), (SENT, "Sent"), (FAILED, "Failed")]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=255, blank=True)
+    to = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "run_after"], name="outbox_queue_idx")]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)} ({self.status})"
+
+
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     profile_picture = models.ImageField(upload_to='profiles/', blank=True, null=True)
@@ -43,10 +207,9 @@ class Profile(models.Model):
     def __str__(self):
         return f"{self.user.username}'s profile"
 
-# 🔹 Auto-create or update Profile whenever a User is created
+# 🔹 Auto-create Profile whenever a User is created. Later User saves (e.g. the
+# last_login update on every login) leave the profile alone.
 @receiver(post_save, sender=User)
-def create_or_update_user_profile(sender, instance, created, **kwargs):
-    if created:
-        Profile.objects.create(user=instance)
-    else:
-        instance.profile.save()
\ No newline at end of file
+def create_or_update_user_profile(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        Profile.objects.create(user=instance)
\ No newline at end of file
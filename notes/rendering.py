@@ -0,0 +1,41 @@
+import hashlib
+
+import bleach
+import markdown
+from django.conf import settings
+
+# Bump this when the rendering pipeline changes in a way the settings below
+# don't capture (e.g. a bleach/markdown upgrade that alters the output).
+RENDERER_REVISION = 1
+
+DEFAULT_MARKDOWN_EXTENSIONS = ['fenced_code', 'tables']
+DEFAULT_ALLOWED_TAGS = ['p', 'pre', 'code', 'strong', 'em', 'ul', 'ol', 'li', 'a', 'h1', 'h2', 'h3', 'blockquote']
+
+
+def markdown_extensions():
+    return list(getattr(settings, 'NOTES_MARKDOWN_EXTENSIONS', DEFAULT_MARKDOWN_EXTENSIONS))
+
+
+def allowed_tags():
+    return list(getattr(settings, 'NOTES_ALLOWED_TAGS', DEFAULT_ALLOWED_TAGS))
+
+
+def renderer_version():
+    """Fingerprint of everything that affects rendered output.
+
+    Changing the allowed tags or Markdown extensions changes the version, which
+    makes every stored rendering stale.
+    """
+    config = f"{RENDERER_REVISION}|{','.join(markdown_extensions())}|{','.join(allowed_tags())}"
+    return hashlib.sha256(config.encode()).hexdigest()[:12]
+
+
+def description_hash(text):
+    """Cache key for a rendered description: content hash plus renderer version."""
+    return hashlib.sha256(f"{renderer_version()}:{text}".encode()).hexdigest()
+
+
+def render_markdown(text):
+    """Render Markdown to sanitized HTML."""
+    html = markdown.markdown(text, extensions=markdown_extensions())
+    return bleach.clean(html, tags=allowed_tags())
@@ -0,0 +1,178 @@
+"""Full-text search over notes.
+
+The backend is picked from the database vendor (SQLite FTS5 or a Postgres
+tsvector index) unless ``NOTES_SEARCH_BACKEND`` names one explicitly. When no
+full-text index is available the plain ``icontains`` scan is used.
+"""
+import functools
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import note
+
+_TOKEN_RE = re.compile(r'"([^"]*)"|(\S+)')
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def parse_query(query):
+    """Split a search string into (terms, phrases). Quoted text becomes a phrase."""
+    terms, phrases = [], []
+    for phrase, word in _TOKEN_RE.findall(query or ""):
+        if phrase:
+            words = _WORD_RE.findall(phrase)
+            if len(words) > 1:
+                phrases.append(words)
+            else:
+                terms.extend(words)
+        else:
+            terms.extend(_WORD_RE.findall(word))
+    return terms, phrases
+
+
+class SearchBackend:
+    """Interface for note search backends."""
+
+    def filter(self, queryset, user, query):
+        """Restrict `queryset` to the user's notes matching `query` (none if it has no searchable words)."""
+        raise NotImplementedError
+
+    def rank(self, user, query):
+        """Expression scoring each matching note, lower is better; None if the backend cannot rank."""
+        return None
+
+    def index_notes(self, notes):
+        """Add or refresh index entries for the given notes."""
+
+    def remove_notes(self, note_ids):
+        """Drop index entries for the given note ids."""
+
+    def rebuild(self):
+        """Rebuild the whole index from the notes table."""
+
+
+class IContainsSearchBackend(SearchBackend):
+    """Substring scan over title, description and tag. Needs no index."""
+
+    def _q(self, query):
+        return Q(title__icontains=query) | Q(description__icontains=query) | Q(tag__icontains=query)
+
+    def filter(self, queryset, user, query):
+        query = query.strip()
+        return queryset.filter(self._q(query)) if query else queryset.none()
+
+
+class SQLiteFTSSearchBackend(SearchBackend):
+    """SQLite FTS5 index kept in the ``notes_note_fts`` virtual table (rowid = note_id)."""
+
+    table = "notes_note_fts"
+    # bm25 column weights: title, description, tag. Better matches score lower.
+    rank_expression = f"bm25({table}, 10.0, 1.0, 5.0)"
+
+    def match_expression(self, query):
+        terms, phrases = parse_query(query)
+        parts = [f'"{term}"*' for term in terms]
+        parts += ['"{}"'.format(" ".join(words)) for words in phrases]
+        return " ".join(parts)
+
+    def filter(self, queryset, user, query):
+        match = self.match_expression(query)
+        if not match:
+            return queryset.none()
+        return queryset.filter(
+            note_id__in=RawSQL(
+                f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s AND user_id = %s",
+                (match, user.pk),
+            )
+        )
+
+    def rank(self, user, query):
+        match = self.match_expression(query)
+        if not match:
+            return None
+        # bm25() is only defined inside a MATCH query, so look each row up by rowid.
+        return RawSQL(
+            f"SELECT {self.rank_expression} FROM {self.table} "
+            f"WHERE {self.table} MATCH %s AND rowid = {note._meta.db_table}.note_id",
+            (match,),
+            output_field=FloatField(),
+        )
+
+    def index_notes(self, notes):
+        rows = [(n.note_id, n.title or "", n.description, n.tag, n.user_id) for n in notes]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {self.table} WHERE rowid = %s", [(row[0],) for row in rows])
+            cursor.executemany(
+                f"INSERT INTO {self.table} (rowid, title, description, tag, user_id) VALUES (%s, %s, %s, %s, %s)",
+                rows,
+            )
+
+    def remove_notes(self, note_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {self.table} WHERE rowid = %s", [(pk,) for pk in note_ids])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+            cursor.execute(
+                f"INSERT INTO {self.table} (rowid, title, description, tag, user_id) "
+                f"SELECT note_id, COALESCE(title, ''), description, tag, user_id FROM {note._meta.db_table}"
+            )
+
+
+class PostgresSearchBackend(SearchBackend):
+    """Postgres full-text search backed by a GIN expression index on the notes table.
+
+    The index is maintained by Postgres itself, so there is nothing to update
+    on save; the expression below must match the one in the migration.
+    """
+
+    vector = "to_tsvector('simple', COALESCE(title, '') || ' ' || COALESCE(tag, '') || ' ' || description)"
+
+    def tsquery(self, query):
+        terms, phrases = parse_query(query)
+        parts = [f"{term}:*" for term in terms]
+        parts += ["(" + " <-> ".join(words) + ")" for words in phrases]
+        return " & ".join(parts)
+
+    def filter(self, queryset, user, query):
+        tsquery = self.tsquery(query)
+        if not tsquery:
+            return queryset.none()
+        return queryset.filter(
+            note_id__in=RawSQL(
+                f"SELECT note_id FROM {note._meta.db_table} "
+                f"WHERE user_id = %s AND {self.vector} @@ to_tsquery('simple', %s)",
+                (user.pk, tsquery),
+            )
+        )
+
+    def rank(self, user, query):
+        tsquery = self.tsquery(query)
+        if not tsquery:
+            return None
+        # ts_rank is higher for better matches; negate it so lower is better, as with bm25.
+        return RawSQL(f"-ts_rank({self.vector}, to_tsquery('simple', %s))", (tsquery,), output_field=FloatField())
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute("REINDEX INDEX notes_note_search_idx")
+
+
+@functools.lru_cache(maxsize=None)
+def get_search_backend():
+    """Return the configured search backend, detecting one from the database if unset."""
+    path = getattr(settings, "NOTES_SEARCH_BACKEND", None)
+    if path:
+        return import_string(path)()
+    if connection.vendor == "postgresql":
+        return PostgresSearchBackend()
+    if connection.vendor == "sqlite" and SQLiteFTSSearchBackend.table in connection.introspection.table_names():
+        return SQLiteFTSSearchBackend()
+    return IContainsSearchBackend()
@@ -0,0 +1,82 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from .facets import rebuild_user_facets, record_note_change
+from .images import delete_files, image_files
+from .listing_cache import bump_version
+from .models import note, note_image
+from .search import get_search_backend
+
+# Sent after notes are changed with queryset.update()/bulk_create(), which skip
+# post_save. Arguments: user_id, note_ids, fields (the model fields written).
+notes_bulk_updated = Signal()
+
+
+# 🔹 Keep the full-text index in step with note edits
+@receiver(post_save, sender=note)
+def index_saved_note(sender, instance, raw=False, **kwargs):
+    if not raw:
+        get_search_backend().index_notes([instance])
+
+
+@receiver(post_delete, sender=note)
+def unindex_deleted_note(sender, instance, **kwargs):
+    get_search_backend().remove_notes([instance.pk])
+
+
+# 🔹 Keep the tag/color facet counts in step with note saves, hides and deletes
+@receiver(post_save, sender=note)
+def update_facets_on_save(sender, instance, created, raw=False, **kwargs):
+    if not raw and not record_note_change(instance, created=created):
+        rebuild_user_facets(instance.user_id)
+
+
+@receiver(post_delete, sender=note)
+def update_facets_on_delete(sender, instance, **kwargs):
+    if not record_note_change(instance, deleted=True):
+        rebuild_user_facets(instance.user_id)
+
+
+# 🔹 Bulk writes bypass post_save, so refresh the derived data in one go
+@receiver(notes_bulk_updated)
+def refresh_after_bulk_update(sender, user_id, note_ids, fields, **kwargs):
+    if {"tag", "color", "is_hidden", "is_deleted"} & set(fields):
+        rebuild_user_facets(user_id)
+    if {"title", "description", "tag"} & set(fields):
+        get_search_backend().index_notes(note.objects.filter(user_id=user_id, note_id__in=note_ids))
+
+
+# 🔹 Retire the user's cached note listings once a change commits
+def _bump_after_commit(user_id):
+    transaction.on_commit(lambda: bump_version(user_id))
+
+
+@receiver(post_save, sender=note)
+@receiver(post_delete, sender=note)
+def invalidate_lists_on_note_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _bump_after_commit(instance.user_id)
+
+
+@receiver(post_save, sender=note_image)
+@receiver(post_delete, sender=note_image)
+def invalidate_lists_on_image_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    user_id = note.objects.filter(pk=instance.note_id).values_list("user_id", flat=True).first()
+    if user_id:  # None while the note itself is being deleted, which bumps on its own
+        _bump_after_commit(user_id)
+
+
+@receiver(notes_bulk_updated)
+def invalidate_lists_after_bulk_update(sender, user_id, **kwargs):
+    _bump_after_commit(user_id)
+
+
+# 🔹 Remove an image's files (original and variants) once its row is really gone
+@receiver(post_delete, sender=note_image)
+def delete_image_files(sender, instance, **kwargs):
+    names = image_files(instance)
+    if names:
+        transaction.on_commit(lambda: delete_files(names))
@@ -0,0 +1,47 @@
+"""collectstatic storage that content-hashes assets and writes precompressed copies.
+
+Next to every hashed file with a compressible type, a ``.gz`` (and a ``.br``
+when the optional ``brotli`` package is installed) is written. Copies that
+would not be smaller are skipped. PrecompressedStaticMiddleware serves them.
+"""
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # optional; gzip alone still works
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".map", ".svg", ".json", ".txt", ".html", ".xml", ".ico", ".ttf", ".otf"}
+
+
+def compressors():
+    """(file suffix, compress function) for each available encoding."""
+    available = [(".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        available.append((".br", lambda data: brotli.compress(data, quality=11)))
+    return available
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if not dry_run:
+            self.compress_files(self.hashed_files.values())
+
+    def compress_files(self, names):
+        for name in names:
+            if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+                continue
+            with self.open(name) as f:
+                data = f.read()
+            for suffix, compress in compressors():
+                # Hashed names change with the content, so an existing copy is current.
+                if self.exists(name + suffix):
+                    continue
+                compressed = compress(data)
+                if len(compressed) < len(data):
+                    self._save(name + suffix, ContentFile(compressed))
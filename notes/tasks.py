@@ -0,0 +1,247 @@
+"""A small database-backed task queue.
+
+Tasks are rows in ``background_task``. ``enqueue()`` stores one and, depending
+on ``NOTES_TASKS_MODE``, either leaves it for ``manage.py run_tasks``
+("worker"), hands it to an in-process thread pool once the surrounding
+transaction commits ("thread"), or runs it inline ("eager", for tests).
+``schedule()`` does the same for a task that is not due until later.
+
+In thread mode a failed task is handed to the pool again once its retry delay
+has passed, and each process sweeps the table for due tasks at most every
+SWEEP_INTERVAL seconds (on the next request), so tasks left behind by a
+restart are picked up too.
+"""
+import json
+import logging
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.signals import request_finished
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .images import generate_variants
+from .models import background_task, note_image
+
+logger = logging.getLogger(__name__)
+
+_handlers = {}
+_executor = None
+_last_sweep = None
+_sweep_lock = threading.Lock()
+
+RETRY_BASE_DELAY = 30  # seconds; doubles with every failed attempt
+STALE_AFTER = timedelta(minutes=15)  # running tasks older than this are assumed dead
+SWEEP_INTERVAL = 60  # seconds between thread-mode sweeps for due tasks
+
+
+def register(name):
+    """Register a function as the handler for tasks called `name`.
+
+    The handler is called with the task payload as keyword arguments; its
+    (JSON-serialisable) return value is stored on the task as `result`.
+    """
+    def decorator(func):
+        _handlers[name] = func
+        return func
+    return decorator
+
+
+def _mode():
+    return getattr(settings, "NOTES_TASKS_MODE", "thread")
+
+
+def enqueue(name, **payload):
+    """Queue a task and return its row."""
+    task = background_task.objects.create(name=name, payload=payload)
+    mode = _mode()
+    if mode == "eager":
+        run_task(task.pk)
+    elif mode == "thread":
+        transaction.on_commit(lambda: _submit(task.pk))
+    return task
+
+
+def enqueue_many(name, payloads):
+    """Queue one task per payload with a single INSERT."""
+    tasks = background_task.objects.bulk_create(background_task(name=name, payload=p) for p in payloads)
+    mode = _mode()
+    for task in tasks:
+        if mode == "eager":
+            run_task(task.pk)
+        elif mode == "thread":
+            transaction.on_commit(lambda pk=task.pk: _submit(pk))
+    return tasks
+
+
+def schedule(name, run_after, **payload):
+    """Queue a task that must not run before `run_after` and return its row."""
+    task = background_task.objects.create(name=name, payload=payload, run_after=run_after)
+    mode = _mode()
+    if mode == "eager" and run_after <= timezone.now():
+        run_task(task.pk)
+    elif mode == "thread":
+        transaction.on_commit(lambda: _submit_when_due(task))
+    return task
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, "NOTES_TASKS_THREADS", 2), thread_name_prefix="notes-task"
+        )
+    return _executor
+
+
+def _submit(task_id):
+    _pool().submit(_run_in_thread, task_id)
+
+
+def _run_in_thread(task_id):
+    try:
+        run_task(task_id)
+    finally:
+        close_old_connections()
+
+
+def _submit_when_due(task):
+    """Thread mode: submit a task once its run_after has passed."""
+    delay = max(0.0, (task.run_after - timezone.now()).total_seconds())
+    timer = threading.Timer(delay, _submit, args=(task.pk,))
+    timer.daemon = True  # a pending task must not hold up shutdown; the next sweep finds it
+    timer.start()
+
+
+def _sweep():
+    try:
+        run_pending()
+    finally:
+        close_old_connections()
+
+
+@receiver(request_finished)
+def sweep_due_tasks(sender, **kwargs):
+    """Thread mode: run due tasks this process has no timer for, e.g. ones left behind by a restart."""
+    global _last_sweep
+    if _mode() != "thread":
+        return
+    with _sweep_lock:
+        now = time.monotonic()
+        if _last_sweep is not None and now - _last_sweep < SWEEP_INTERVAL:
+            return
+        _last_sweep = now
+    _pool().submit(_sweep)
+
+
+def _claim(task_id):
+    """Atomically move a due task from pending to running. Returns True if this caller got it."""
+    return bool(
+        background_task.objects.filter(pk=task_id, status=background_task.PENDING, run_after__lte=timezone.now())
+        .update(status=background_task.RUNNING, locked_at=timezone.now(), attempts=F("attempts") + 1)
+    )
+
+
+def run_task(task_id):
+    """Claim and execute one task. Returns False if it was not due or taken by another worker."""
+    if not _claim(task_id):
+        return False
+    task = background_task.objects.get(pk=task_id)
+    try:
+        handler = _handlers[task.name]
+        result = handler(**task.payload)
+    except Exception:
+        task.last_error = traceback.format_exc()
+        if task.attempts >= task.max_attempts:
+            task.status = background_task.FAILED
+            logger.exception("Task %s failed permanently", task)
+        else:
+            task.status = background_task.PENDING
+            task.run_after = timezone.now() + timedelta(seconds=RETRY_BASE_DELAY * 2 ** (task.attempts - 1))
+        task.locked_at = None
+        task.save(update_fields=["status", "run_after", "last_error", "locked_at", "updated_at"])
+        if task.status == background_task.PENDING and _mode() == "thread":
+            _submit_when_due(task)
+        return True
+
+    task.status = background_task.DONE
+    task.result = result
+    task.locked_at = None
+    task.save(update_fields=["status", "result", "locked_at", "updated_at"])
+    return True
+
+
+def run_pending(limit=50):
+    """Run up to `limit` due tasks, oldest first. Returns how many were executed."""
+    # Requeue tasks whose worker died mid-run.
+    background_task.objects.filter(
+        status=background_task.RUNNING, locked_at__lt=timezone.now() - STALE_AFTER
+    ).update(status=background_task.PENDING, locked_at=None)
+
+    due = (
+        background_task.objects.filter(status=background_task.PENDING, run_after__lte=timezone.now())
+        .order_by("run_after", "pk")
+        .values_list("pk", flat=True)[:limit]
+    )
+    return sum(run_task(task_id) for task_id in list(due))
+
+
+# ======================================================
+# Task handlers
+# ======================================================
+
+@register("process_note_image")
+def process_note_image(image_id):
+    """Generate the display variants for a freshly uploaded note image."""
+    img = note_image.objects.filter(image_id=image_id).first()
+    if img is not None:
+        generate_variants(img)
+
+
+@register("import_notes")
+def import_notes_upload(user_id, path, source_format):
+    """Import an uploaded file from media storage, resuming from the last committed batch on retry."""
+    from .importers import import_source  # importers enqueues tasks itself
+
+    state_path = f"{path}.import-state.json"
+    start = 0
+    if default_storage.exists(state_path):
+        with default_storage.open(state_path) as f:
+            start = json.load(f)["next_row"]
+
+    def save_progress(next_row, stats):
+        if default_storage.exists(state_path):
+            default_storage.delete(state_path)
+        default_storage.save(state_path, ContentFile(json.dumps({"next_row": next_row})))
+
+    stats = import_source(
+        User.objects.get(pk=user_id), default_storage.path(path), source_format, start=start, on_progress=save_progress
+    )
+    for leftover in (path, state_path):
+        if default_storage.exists(leftover):
+            default_storage.delete(leftover)
+    return stats
+
+
+@register("send_outbox")
+def send_outbox():
+    """Deliver queued emails, then schedule another run for when the next retry or batch is due."""
+    from .mail import next_attempt_at, purge_finished, send_pending  # mail enqueues this task itself
+
+    sent, failed = send_pending()
+    purged = purge_finished()
+    when = next_attempt_at()
+    if when is not None and not background_task.objects.filter(
+        name="send_outbox", status=background_task.PENDING, run_after__lte=when
+    ).exists():
+        schedule("send_outbox", when)
+    return {"sent": sent, "failed": failed, "purged": purged}
@@ -1,3 +1,1065 @@
-from django.test import TestCase
+import io
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from datetime import timedelta
+from smtplib import SMTPException
+from unittest import mock
 
-# Create your tests here.
+from PIL import Image
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import caches
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path, reverse
+from django.utils import timezone
+
+from notesApp import urls as site_urls
+
+from . import listing_cache, metrics, tasks, views
+from .backends import ProfileModelBackend
+from .facets import facet_choices
+from .images import generate_variants
+from .importers import import_notes, import_source, read_jsonl
+from .mail import purge_finished, queue_mail, send_pending
+from .management.commands.explain_note_queries import Command as ExplainNoteQueries
+from .middleware import IMMUTABLE, REVALIDATE, PrecompressedStaticMiddleware
+from .models import Profile, background_task, note, note_facet, note_image, outbound_email
+from .search import get_search_backend, parse_query
+from .staticfiles import compressors
+from .views.utils import HIDDEN_UNLOCK_SESSION_KEY, encode_cursor, listing_queryset, process_note_images
+
+PIN = "123456"
+
+
+def png(name="photo.png", size=(80, 60)):
+    data = io.BytesIO()
+    Image.new("RGB", size, (200, 10, 10)).save(data, "PNG")
+    return SimpleUploadedFile(name, data.getvalue(), content_type="image/png")
+
+
+class FailingBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise SMTPException("mail server down")
+
+
+TEST_SETTINGS = {
+    "PASSWORD_HASHERS": ["django.contrib.auth.hashers.MD5PasswordHasher"],
+    # Pages render without depending on the collected manifest.
+    "STORAGES": {**settings.STORAGES, "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    }},
+}
+
+
+class NotesTestCase(TestCase):
+    """Two users with notes; tasks run inline and uploads go to a temporary MEDIA_ROOT."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        overrides = override_settings(MEDIA_ROOT=media_root, NOTES_TASKS_MODE="eager", **TEST_SETTINGS)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        for alias in ("default", "note_cards", "note_lists"):
+            caches[alias].clear()
+
+        self.user = User.objects.create_user("alice", "alice@example.com", "pw")
+        self.other = User.objects.create_user("bob", "bob@example.com", "pw")
+        self.user.profile.pin = make_password(PIN)
+        self.user.profile.save()
+        self.client.force_login(self.user)
+
+    def unlock(self):
+        return self.client.post(reverse("index"), {"verify_pin": "1", "pin": PIN})
+
+
+class MarkdownRenderingTests(NotesTestCase):
+    def test_save_stores_sanitized_html(self):
+        n = note.objects.create(user=self.user, description="**hi** <script>alert(1)</script>")
+        n.refresh_from_db()
+        self.assertEqual(n.description_html, "<p><strong>hi</strong> &lt;script&gt;alert(1)&lt;/script&gt;</p>")
+        self.assertEqual(n.formatted_description(), n.description_html)
+
+        n.description = "*changed*"
+        n.save(update_fields=["description"])
+        n.refresh_from_db()
+        self.assertEqual(n.description_html, "<p><em>changed</em></p>")
+
+    def test_renderer_changes_make_stored_html_stale(self):
+        n = note.objects.create(user=self.user, description="# Heading")
+        updated_at = n.updated_at
+        with override_settings(NOTES_ALLOWED_TAGS=["p"]):
+            n.refresh_from_db()
+            escaped = "&lt;h1&gt;Heading&lt;/h1&gt;"
+            self.assertEqual(n.formatted_description(), escaped)  # rendered on the fly
+            self.assertEqual(n.description_html, "<h1>Heading</h1>")
+
+            out = io.StringIO()
+            call_command("render_descriptions", stdout=out)
+            self.assertIn("Rendered 1 of 1 notes", out.getvalue())
+            n.refresh_from_db()
+            self.assertEqual(n.description_html, escaped)
+            self.assertEqual(n.updated_at, updated_at)
+
+            call_command("render_descriptions", stdout=out)
+            self.assertIn("Rendered 0 of 1 notes", out.getvalue())
+
+
+class HiddenUnlockTests(NotesTestCase):
+    def test_pin_unlocks_hidden_notes_for_the_ttl(self):
+        self.assertRedirects(self.client.get(reverse("hidden_notes")), reverse("index"))
+        with override_settings(NOTES_HIDDEN_UNLOCK_TTL=60):
+            self.assertRedirects(self.unlock(), reverse("hidden_notes"))
+        until = self.client.session[HIDDEN_UNLOCK_SESSION_KEY]["until"]
+        self.assertAlmostEqual(until, time.time() + 60, delta=5)
+        self.assertEqual(self.client.get(reverse("hidden_notes")).status_code, 200)
+
+    def test_unlock_expires(self):
+        self.unlock()
+        session = self.client.session
+        session[HIDDEN_UNLOCK_SESSION_KEY]["until"] = time.time() - 1
+        session.save()
+        self.assertRedirects(self.client.get(reverse("hidden_notes")), reverse("index"))
+
+    def test_changing_the_pin_ends_the_unlock(self):
+        self.unlock()
+        self.client.post(reverse("profile"), {"reset_pin": "1", "current_pin": PIN, "new_pin": "654321"})
+        self.user.profile.refresh_from_db()
+        self.assertTrue(check_password("654321", self.user.profile.pin))
+        self.assertRedirects(self.client.get(reverse("hidden_notes")), reverse("index"))
+
+    def test_lock_hidden_ends_the_unlock(self):
+        self.unlock()
+        self.assertEqual(self.client.get(reverse("lock_hidden")).status_code, 405)
+        self.assertRedirects(self.client.post(reverse("lock_hidden")), reverse("index"))
+        self.assertRedirects(self.client.get(reverse("hidden_notes")), reverse("index"))
+
+
+class ImageDimensionTests(NotesTestCase):
+    def test_dimensions_are_stored_on_upload(self):
+        img = note_image.objects.create(note=note.objects.create(user=self.user, description="x"), image=png(size=(80, 60)))
+        img.refresh_from_db()
+        self.assertEqual((img.width, img.height, img.aspect_ratio), (80, 60, 0.75))
+
+    def test_grid_heights_need_no_file_access(self):
+        n = note.objects.create(user=self.user, description="x")
+        wide = note_image.objects.create(note=n, image=png(size=(80, 40)))
+        tall = note_image.objects.create(note=n, image=png(size=(40, 80)))
+        for img in (wide, tall):
+            os.remove(img.image.path)
+
+        notes = list(listing_queryset(self.user))
+        with self.assertNumQueries(0), mock.patch("PIL.Image.open", side_effect=AssertionError("file opened")):
+            process_note_images(notes)
+        self.assertEqual(notes[0].max_height, 806)
+        self.assertEqual(
+            [(img.scaled_height, img.half_diff) for img in notes[0].processed_images], [(201, 302), (806, 0)]
+        )
+
+
+class ImageVariantTests(NotesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.note = note.objects.create(user=self.user, description="x")
+
+    def test_upload_generates_variants(self):
+        response = self.client.post(
+            reverse("create_note"), {"description": "photo", "color": "#ffffff", "images": [png(size=(1000, 500))]}
+        )
+        self.assertRedirects(response, reverse("index"))
+        img = note_image.objects.get(note__description="photo")
+        self.assertEqual(img.status, note_image.READY)
+        small, large = [v["name"] for v in img.variants if v["format"] == "jpeg"]
+        self.assertEqual(img.jpeg_srcset, f"{default_storage.url(small)} 403w, {default_storage.url(large)} 806w")
+        with default_storage.open(large) as f, Image.open(f) as variant:
+            self.assertEqual(variant.size, (806, 403))
+
+    def test_small_images_are_not_upscaled(self):
+        img = note_image.objects.create(note=self.note, image=png(size=(80, 60)))
+        variants = generate_variants(img)
+        self.assertEqual({v["width"] for v in variants}, {80})
+
+    def test_exif_rotation_is_applied(self):
+        data = io.BytesIO()
+        exif = Image.Exif()
+        exif[0x0112] = 6  # rotate 90 degrees clockwise
+        Image.new("RGB", (80, 60)).save(data, "JPEG", exif=exif)
+        img = note_image.objects.create(note=self.note, image=SimpleUploadedFile("rotated.jpg", data.getvalue()))
+        self.assertEqual((img.width, img.height), (60, 80))
+        generate_variants(img)
+        with default_storage.open(img.variants[0]["name"]) as f, Image.open(f) as variant:
+            self.assertEqual(variant.size, (60, 80))
+
+    def test_regenerate_image_variants(self):
+        done = note_image.objects.create(note=self.note, image=png())
+        generate_variants(done)
+        missing = note_image.objects.create(note=self.note, image=png())
+        broken = note_image.objects.create(note=self.note, image=png())
+        with open(broken.image.path, "wb") as f:
+            f.write(b"not an image")
+
+        out, err = io.StringIO(), io.StringIO()
+        call_command("regenerate_image_variants", missing_only=True, stdout=out, stderr=err)
+        self.assertIn("Generated variants for 1 images (1 unreadable)", out.getvalue())
+        self.assertIn(f"Could not read image {broken.pk}", err.getvalue())
+        missing.refresh_from_db()
+        broken.refresh_from_db()
+        self.assertEqual((missing.status, broken.status), (note_image.READY, note_image.FAILED))
+
+
+class CardCacheTests(NotesTestCase):
+    def test_cards_are_cached_until_the_note_changes(self):
+        n = note.objects.create(user=self.user, title="Original", description="x")
+        self.assertContains(self.client.get(reverse("index")), "Original")
+        note.objects.filter(pk=n.pk).update(title="Unseen")  # update() leaves updated_at alone
+        self.assertContains(self.client.get(reverse("index")), "Original")
+
+        n.refresh_from_db()
+        n.title = "Edited"
+        n.save()
+        response = self.client.get(reverse("index"))
+        self.assertContains(response, "Edited")
+        self.assertNotContains(response, "Original")
+
+    def test_image_processing_refreshes_the_card(self):
+        n = note.objects.create(user=self.user, description="x")
+        img = note_image.objects.create(note=n, image=png())
+        self.assertContains(self.client.get(reverse("index")), "Processing image")
+        generate_variants(img)
+        response = self.client.get(reverse("index"))
+        self.assertNotContains(response, "Processing image")
+        self.assertContains(response, img.jpeg_srcset)
+
+
+class MediaTests(NotesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.note = note.objects.create(user=self.user, description="with image")
+        self.image = note_image.objects.create(note=self.note, image=png())
+        self.url = self.image.image.url
+
+    def test_owner_gets_the_file(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertIn("ETag", response)
+
+    def test_other_users_and_anonymous_get_404(self):
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_hidden_note_image_needs_unlock(self):
+        self.note.is_hidden = True
+        self.note.save()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.unlock()
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_range_request(self):
+        size = self.image.image.size
+        response = self.client.get(self.url, headers={"Range": "bytes=0-9"})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 0-9/{size}")
+        self.assertEqual(len(b"".join(response.streaming_content)), 10)
+        response = self.client.get(self.url, headers={"Range": f"bytes={size}-"})
+        self.assertEqual(response.status_code, 416)
+
+    def test_stale_if_range_sends_the_whole_file(self):
+        response = self.client.get(self.url, headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.assertEqual(self.client.get(self.url, headers={"If-None-Match": etag}).status_code, 304)
+        self.assertEqual(self.client.get(self.url, headers={"If-None-Match": f'"other", W/{etag}'}).status_code, 304)
+        self.assertEqual(self.client.get(self.url, headers={"If-None-Match": '"other"'}).status_code, 200)
+
+    def test_nginx_redirect_is_quoted(self):
+        # Uploads get sanitised names; imported or older files may not.
+        name = "notes/images/my photo%.png"
+        os.rename(self.image.image.path, os.path.join(os.path.dirname(self.image.image.path), "my photo%.png"))
+        note_image.objects.filter(pk=self.image.pk).update(image=name)
+        with override_settings(NOTES_MEDIA_ACCEL="nginx", NOTES_MEDIA_ACCEL_PREFIX="/protected/"):
+            response = self.client.get("/media/notes/images/my%20photo%25.png")
+        self.assertEqual(response["X-Accel-Redirect"], "/protected/notes/images/my%20photo%25.png")
+
+    def test_delete_image_is_scoped_to_the_owner(self):
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.post(reverse("delete_note_image", args=[self.image.pk])).status_code, 404)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.post(reverse("delete_note_image", args=[self.image.pk])).status_code, 200)
+        self.assertFalse(note_image.objects.filter(pk=self.image.pk).exists())
+
+
+class TaskTests(NotesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.calls = []
+        handlers = mock.patch.dict(tasks._handlers, {"succeed": self.succeed, "fail": self.fail})
+        handlers.start()
+        self.addCleanup(handlers.stop)
+
+    def succeed(self, value):
+        self.calls.append(value)
+        return value * 2
+
+    def fail(self):
+        self.calls.append(None)
+        raise RuntimeError("boom")
+
+    def test_eager_mode_runs_inline(self):
+        task = tasks.enqueue("succeed", value=21)
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.result, task.attempts), (background_task.DONE, 42, 1))
+
+    def test_failed_task_is_retried_with_backoff(self):
+        task = tasks.enqueue("fail")
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (background_task.PENDING, 1))
+        self.assertIn("RuntimeError: boom", task.last_error)
+        self.assertGreater(task.run_after, timezone.now())
+
+        self.assertEqual(tasks.run_pending(), 0)  # not due yet
+        with self.assertLogs("notes.tasks", "ERROR"):  # giving up is logged
+            for _ in range(task.max_attempts - 1):
+                background_task.objects.filter(pk=task.pk).update(run_after=timezone.now())
+                self.assertEqual(tasks.run_pending(), 1)
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (background_task.FAILED, task.max_attempts))
+        self.assertEqual(len(self.calls), task.max_attempts)
+
+    def test_thread_mode_schedules_the_retry(self):
+        task = background_task.objects.create(name="fail", payload={})
+        with override_settings(NOTES_TASKS_MODE="thread"), mock.patch.object(tasks, "_submit_when_due") as retry:
+            tasks.run_task(task.pk)
+        retry.assert_called_once()
+        self.assertEqual(retry.call_args.args[0].pk, task.pk)
+
+    def test_stale_running_task_is_requeued(self):
+        task = background_task.objects.create(
+            name="succeed", payload={"value": 1}, status=background_task.RUNNING,
+            locked_at=timezone.now() - tasks.STALE_AFTER - timedelta(minutes=1),
+        )
+        self.assertEqual(tasks.run_pending(), 1)
+        task.refresh_from_db()
+        self.assertEqual(task.status, background_task.DONE)
+
+
+@override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+class OutboxTests(NotesTestCase):
+    def test_queued_mail_is_sent_and_its_body_cleared(self):
+        email = queue_mail("Reset", "secret link", "noreply@example.com", ["alice@example.com"], "<p>secret</p>")
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].body, "secret link")
+        email.refresh_from_db()
+        self.assertEqual(email.status, outbound_email.SENT)
+        self.assertEqual((email.body, email.html_body), ("", ""))
+
+    def test_failed_send_is_retried(self):
+        with override_settings(EMAIL_BACKEND="notes.tests.FailingBackend"):
+            email = queue_mail("Reset", "secret link", "noreply@example.com", ["alice@example.com"])
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (outbound_email.PENDING, 1))
+        self.assertIn("mail server down", email.last_error)
+        self.assertEqual(send_pending(), (0, 0))  # backing off
+
+        outbound_email.objects.filter(pk=email.pk).update(run_after=timezone.now())
+        self.assertEqual(send_pending(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_failed_send_schedules_the_task_again(self):
+        with override_settings(EMAIL_BACKEND="notes.tests.FailingBackend"):
+            email = queue_mail("Reset", "secret link", "noreply@example.com", ["alice@example.com"])
+            queue_mail("Other", "body", "noreply@example.com", ["bob@example.com"])  # no second retry task
+        email.refresh_from_db()
+        retry = background_task.objects.get(name="send_outbox", status=background_task.PENDING)
+        self.assertEqual(retry.run_after, email.run_after)
+
+        with override_settings(NOTES_TASKS_MODE="thread"), mock.patch.object(tasks, "_submit_when_due") as submit:
+            with self.captureOnCommitCallbacks(execute=True):
+                tasks.schedule("send_outbox", email.run_after)
+        self.assertEqual(submit.call_args.args[0].run_after, email.run_after)
+
+        background_task.objects.update(run_after=timezone.now())
+        outbound_email.objects.update(run_after=timezone.now())
+        tasks.run_pending()
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertFalse(background_task.objects.filter(status=background_task.PENDING).exists())
+
+    def test_giving_up_clears_the_body(self):
+        email = outbound_email.objects.create(subject="Reset", body="secret", to=["a@example.com"], max_attempts=1)
+        with override_settings(EMAIL_BACKEND="notes.tests.FailingBackend"), self.assertLogs("notes.mail", "ERROR"):
+            self.assertEqual(send_pending(), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.body), (outbound_email.FAILED, ""))
+
+    def test_purge_finished(self):
+        old = outbound_email.objects.create(subject="old", body="", to=[], status=outbound_email.SENT)
+        pending = outbound_email.objects.create(subject="pending", body="x", to=[])
+        outbound_email.objects.filter(pk__in=[old.pk, pending.pk]).update(created_at=timezone.now() - timedelta(days=90))
+        self.assertEqual(purge_finished(days=30), 1)
+        self.assertQuerySetEqual(outbound_email.objects.all(), [pending])
+
+
+class BulkNotesTests(NotesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.visible = note.objects.create(user=self.user, description="visible")
+        self.hidden = note.objects.create(user=self.user, description="hidden", is_hidden=True)
+        self.foreign = note.objects.create(user=self.other, description="bob's")
+
+    def bulk(self, action, notes, value=None):
+        payload = {"action": action, "note_ids": [n.pk for n in notes], "value": value}
+        return self.client.post(reverse("bulk_notes"), json.dumps(payload), content_type="application/json")
+
+    def test_only_own_notes_change(self):
+        response = self.bulk("set_tag", [self.visible, self.foreign], "work")
+        self.assertEqual(response.json()["updated"], 1)
+        self.visible.refresh_from_db()
+        self.foreign.refresh_from_db()
+        self.assertEqual((self.visible.tag, self.foreign.tag), ("work", ""))
+
+    def test_hidden_notes_need_unlock(self):
+        self.assertEqual(self.bulk("delete", [self.visible, self.hidden]).json()["updated"], 1)
+        self.hidden.refresh_from_db()
+        self.assertFalse(self.hidden.is_deleted)
+        self.unlock()
+        self.assertEqual(self.bulk("delete", [self.hidden]).json()["updated"], 1)
+        self.hidden.refresh_from_db()
+        self.assertTrue(self.hidden.is_deleted)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.bulk("explode", [self.visible]).status_code, 400)
+        self.assertEqual(self.bulk("delete", []).status_code, 400)
+        self.assertEqual(self.bulk("set_color", [self.visible], "not a color").status_code, 400)
+
+
+class FacetTests(NotesTestCase):
+    def facets(self):
+        return set(note_facet.objects.filter(user=self.user).values_list("is_hidden", "tag", "color", "count"))
+
+    def test_counts_follow_note_changes(self):
+        first = note.objects.create(user=self.user, description="a", tag="work", color="#ff0000")
+        second = note.objects.create(user=self.user, description="b", tag="work", color="#ff0000")
+        self.assertEqual(self.facets(), {(False, "work", "#ff0000", 2)})
+
+        second.tag, second.is_hidden = "home", True
+        second.save()
+        self.assertEqual(self.facets(), {(False, "work", "#ff0000", 1), (True, "home", "#ff0000", 1)})
+
+        first.is_deleted = True
+        first.save()
+        second.delete()
+        self.assertEqual(self.facets(), set())
+
+    def test_dropdowns_narrow_each_other(self):
+        note.objects.create(user=self.user, description="a", tag="work", color="#ff0000")
+        note.objects.create(user=self.user, description="b", tag="home", color="#00ff00")
+        note.objects.create(user=self.other, description="c", tag="bob", color="#0000ff")
+        tags, colors = facet_choices(self.user, False)
+        self.assertEqual((list(tags), list(colors)), (["home", "work"], ["#00ff00", "#ff0000"]))
+        tags, colors = facet_choices(self.user, False, tag="WORK", color="#00FF00")
+        self.assertEqual((list(tags), list(colors)), (["home"], ["#ff0000"]))
+
+    def test_repair_note_facets(self):
+        note.objects.create(user=self.user, description="a", tag="work")
+        note.objects.create(user=self.other, description="b", tag="work")
+        note_facet.objects.filter(user=self.user).update(count=5)
+        note_facet.objects.create(user=self.user, tag="gone", color="#ffffff", count=1)
+
+        out = io.StringIO()
+        call_command("repair_note_facets", dry_run=True, stdout=out)
+        self.assertIn("Found 2 facet rows across 1 users.", out.getvalue())
+        self.assertEqual(len(self.facets()), 2)
+
+        call_command("repair_note_facets", username="alice", stdout=out)
+        self.assertIn("Repaired 2 facet rows across 1 users.", out.getvalue())
+        self.assertEqual(self.facets(), {(False, "work", "#ffffff", 1)})
+
+
+class SearchTests(NotesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.agenda = note.objects.create(user=self.user, title="Plans", description="quarterly meeting agenda")
+        self.team = note.objects.create(user=self.user, title="Meet the team", description="intro")
+        note.objects.create(user=self.other, title="meeting", description="bob's meeting")
+
+    def search(self, query):
+        response = self.client.get(reverse("api_notes"), {"fields": "note_id", "search": query})
+        return [row["note_id"] for row in response.json()["results"]]
+
+    def test_parse_query(self):
+        self.assertEqual(parse_query('meet "team intro" x-ray "solo"'), (["meet", "x", "ray", "solo"], [["team", "intro"]]))
+
+    def test_prefix_and_phrase_matches(self):
+        self.assertCountEqual(self.search("meet"), [self.agenda.pk, self.team.pk])
+        self.assertEqual(self.search('"meeting agenda"'), [self.agenda.pk])
+        self.assertEqual(self.search('"agenda meeting"'), [])
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.search("meet"), [self.team.pk, self.agenda.pk])
+
+    def test_queries_without_words_match_nothing(self):
+        self.assertEqual(self.search("!!!"), [])
+        self.assertEqual(len(self.search("")), 2)  # no search at all
+
+    def test_index_follows_edits_and_deletes(self):
+        self.team.description = "retrospective"
+        self.team.save()
+        self.assertEqual(self.search("retro"), [self.team.pk])
+        self.team.delete()
+        self.assertEqual(self.search("retro"), [])
+
+    def test_rebuild_search_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {get_search_backend().table}")
+        self.assertEqual(self.search("agenda"), [])
+        call_command("rebuild_search_index", stdout=io.StringIO())
+        self.assertEqual(self.search("agenda"), [self.agenda.pk])
+
+
+@override_settings(NOTES_PAGE_SIZE=5, NOTES_LIST_CACHE=True)
+class PaginationTests(NotesTestCase):
+    def setUp(self):
+        super().setUp()
+        start = timezone.now() - timedelta(days=1)
+        self.notes = []
+        for i in range(12):
+            n = note.objects.create(user=self.user, title=f"note {i}", description="body", tag="work" if i % 2 else "")
+            self.notes.append(n)
+        # Distinct times, plus a tie that the note_id tiebreak has to order.
+        for i, n in enumerate(self.notes):
+            note.objects.filter(pk=n.pk).update(updated_at=start + timedelta(minutes=i // 2 * 2 + (i == 11)))
+        self.expected = list(note.objects.filter(user=self.user).order_by("-updated_at", "-note_id")
+                             .values_list("note_id", flat=True))
+
+    def walk(self, **params):
+        ids, cursor = [], None
+        while True:
+            data = self.client.get(reverse("api_notes"), {"fields": "note_id", **params, "cursor": cursor or ""}).json()
+            ids += [row["note_id"] for row in data["results"]]
+            cursor = data["next_cursor"]
+            if not cursor:
+                return ids
+
+    def test_cursor_walks_every_note_once(self):
+        self.assertEqual(self.walk(), self.expected)
+
+    def test_keyset_paging_without_the_cache(self):
+        with override_settings(NOTES_LIST_CACHE_MAX_IDS=3):
+            self.assertEqual(self.walk(), self.expected)
+
+    def test_list_cache_off(self):
+        with override_settings(NOTES_LIST_CACHE=False):
+            self.assertEqual(self.walk(), self.expected)
+            self.assertIsNone(listing_cache.cached_entries(
+                listing_cache.list_key(self.user.pk, False), note.objects.filter(user=self.user)
+            ))
+
+    def test_filtered_listing(self):
+        expected = [pk for pk in self.expected if note.objects.get(pk=pk).tag == "work"]
+        self.assertEqual(self.walk(tag="work"), expected)
+
+    def test_cached_listing_sees_changes(self):
+        self.walk()
+        with self.captureOnCommitCallbacks(execute=True):
+            fresh = note.objects.create(user=self.user, description="fresh")
+        first = self.client.get(reverse("api_notes"), {"fields": "note_id"}).json()["results"][0]
+        self.assertEqual(first["note_id"], fresh.pk)
+
+    def test_bad_cursors_start_at_page_one(self):
+        naive = encode_cursor({"note_id": 1, "updated_at": timezone.now().replace(tzinfo=None)})
+        for cursor in ("garbage", "!!", naive, encode_cursor({"note_id": 1, "search_rank": 1.0})):
+            response = self.client.get(reverse("api_notes"), {"fields": "note_id", "cursor": cursor})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([row["note_id"] for row in response.json()["results"]], self.expected[:5])
+
+    def test_feed_pages(self):
+        data = self.client.get(reverse("notes_feed")).json()
+        self.assertEqual(data["count"], 5)
+        data = self.client.get(reverse("notes_feed"), {"cursor": data["next_cursor"]}).json()
+        self.assertEqual(data["count"], 5)
+
+
+class ExplainQueriesTests(NotesTestCase):
+    def test_grid_queries_use_indexes(self):
+        note.objects.create(user=self.user, description="meeting notes", tag="work")
+        out = io.StringIO()
+        call_command("explain_note_queries", username="alice", stdout=out)
+        for label in ("visible / search / next page", "hidden / tag / notes", "conditional GET / images state"):
+            self.assertRegex(out.getvalue(), rf"{label} +.*ok")
+
+    def test_full_scans_are_reported(self):
+        plan = "2 0 0 SCAN notes_note\n4 0 0 SCAN notes_note_image USING INDEX x\n6 0 0 SCAN notes_note_fts VIRTUAL TABLE"
+        self.assertEqual(ExplainNoteQueries().full_scans(plan), ["notes_note"])
+
+
+class ExportTests(NotesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.visible = note.objects.create(user=self.user, title="Visible", description="v")
+        self.hidden = note.objects.create(user=self.user, title="Hidden", description="h", is_hidden=True)
+        note.objects.create(user=self.other, title="Bob's", description="b")
+        self.image = note_image.objects.create(note=self.visible, image=png())
+
+    def export(self, **params):
+        response = self.client.get(reverse("export_notes"), params)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content)
+
+    def test_jsonl_export(self):
+        response, body = self.export()
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        records = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual([r["title"] for r in records], ["Visible"])
+        self.assertEqual(records[0]["images"][0]["width"], 80)
+
+    def test_hidden_notes_need_unlock(self):
+        self.assertEqual(self.client.get(reverse("export_notes"), {"include_hidden": "1"}).status_code, 403)
+        self.unlock()
+        _, body = self.export(include_hidden="1")
+        self.assertEqual(len(body.splitlines()), 2)
+
+    def test_zip_export_holds_the_images(self):
+        response, body = self.export(format="zip")
+        self.assertEqual(response["Content-Type"], "application/zip")
+        with zipfile.ZipFile(io.BytesIO(body)) as archive:
+            record = json.loads(archive.read("notes.jsonl"))
+            with self.image.image.open("rb") as f:
+                self.assertEqual(archive.read(record["images"][0]["file"]), f.read())
+
+    def test_missing_image_files_are_skipped(self):
+        os.remove(self.image.image.path)
+        _, body = self.export(format="zip")
+        with zipfile.ZipFile(io.BytesIO(body)) as archive:
+            self.assertEqual(archive.namelist(), ["notes.jsonl"])
+
+    def test_export_notes_command(self):
+        self.visible.is_deleted = True
+        self.visible.save()
+        output = os.path.join(settings.MEDIA_ROOT, "export.jsonl")
+        call_command("export_notes", "alice", output=output, include_deleted=True, stderr=io.StringIO())
+        with open(output) as f:
+            self.assertEqual([json.loads(line)["title"] for line in f], ["Visible", "Hidden"])
+
+
+class ImportTests(NotesTestCase):
+    def lines(self, *rows):
+        return [row if isinstance(row, str) else json.dumps(row) for row in rows]
+
+    def test_rows_are_validated_and_written_in_batches(self):
+        progress = []
+        stats = import_notes(self.other, read_jsonl(self.lines(
+            {"title": "one", "description": "**first**", "tag": "work"},
+            {"description": "bad colour", "color": "#not-a-colour"},
+            "{broken",
+            {"title": "gone", "description": "x", "is_deleted": True},
+            {"title": "two", "description": "second"},
+        )), batch_size=1, on_progress=lambda next_row, stats: progress.append(next_row))
+        self.assertEqual((stats["imported"], stats["skipped"]), (2, 3))
+        self.assertEqual([e["row"] for e in stats["errors"]], [1, 2])
+        self.assertEqual(progress, [1, 5, 5])
+
+        first = note.objects.get(user=self.other, title="one")
+        self.assertEqual(first.description_html, "<p><strong>first</strong></p>")
+        self.assertEqual(note_facet.objects.get(user=self.other, tag="work").count, 1)
+        self.assertEqual(get_search_backend().filter(note.objects.all(), self.other, "second").get().title, "two")
+
+    def test_resume_skips_committed_rows(self):
+        rows = self.lines({"title": "one", "description": "a"}, {"title": "two", "description": "b"})
+        stats = import_notes(self.other, read_jsonl(rows), start=1)
+        self.assertEqual((stats["imported"], stats["next_row"]), (1, 2))
+        self.assertQuerySetEqual(note.objects.filter(user=self.other).values_list("title", flat=True), ["two"])
+
+    def test_export_zip_round_trip(self):
+        original = note.objects.create(user=self.user, title="Trip", description="x")
+        # The JSON export keeps millisecond precision.
+        note.objects.filter(pk=original.pk).update(updated_at=timezone.now().replace(microsecond=0) - timedelta(days=3))
+        original.refresh_from_db()
+        note_image.objects.create(note=original, image=png(size=(40, 20)))
+        path = os.path.join(settings.MEDIA_ROOT, "export.zip")
+        call_command("export_notes", "alice", format="zip", output=path, stderr=io.StringIO())
+
+        stats = import_source(self.other, path)
+        self.assertEqual((stats["imported"], stats["images"]), (1, 1))
+        copy = note.objects.get(user=self.other)
+        self.assertEqual((copy.title, copy.updated_at), ("Trip", original.updated_at))
+        img = copy.note_image_set.get()
+        self.assertEqual((img.width, img.height, img.status), (40, 20, note_image.READY))
+
+    def test_upload_runs_in_the_background(self):
+        upload = SimpleUploadedFile("notes.jsonl", b'{"title": "uploaded", "description": "x"}\n')
+        response = self.client.post(reverse("upload_import"), {"file": upload})
+        self.assertEqual(response.status_code, 202)
+        status = self.client.get(response.json()["status_url"]).json()
+        self.assertEqual((status["status"], status["result"]["imported"]), (background_task.DONE, 1))
+        self.assertTrue(note.objects.filter(user=self.user, title="uploaded").exists())
+        self.assertEqual(os.listdir(os.path.join(settings.MEDIA_ROOT, "imports", str(self.user.pk))), [])
+
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(response.json()["status_url"]).status_code, 404)
+
+    def test_import_notes_command_reads_markdown(self):
+        source = os.path.join(settings.MEDIA_ROOT, "vault")
+        os.makedirs(os.path.join(source, "sub"))
+        with open(os.path.join(source, "plain.md"), "w") as f:
+            f.write("# Heading title\n\nbody")
+        with open(os.path.join(source, "sub", "meta.md"), "w") as f:
+            f.write("---\ntitle: From front matter\ntag: work\nhidden: yes\n---\nsecret body")
+
+        out = io.StringIO()
+        call_command("import_notes", "bob", source, stdout=out)
+        self.assertIn("Imported 2 notes and 0 images; skipped 0 rows.", out.getvalue())
+        self.assertEqual(
+            set(note.objects.filter(user=self.other).values_list("title", "description", "tag", "is_hidden")),
+            {("Heading title", "body", "", False), ("From front matter", "secret body", "work", True)},
+        )
+        self.assertFalse(os.path.exists(f"{source}.import-state.json"))
+
+
+class ApiTests(NotesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.note = note.objects.create(user=self.user, title="Plan", description="**bold**", tag="work")
+        self.url = reverse("api_note", args=[self.note.pk])
+
+    def test_fields_selects_the_returned_keys(self):
+        data = self.client.get(reverse("api_notes"), {"fields": "note_id,title"}).json()
+        self.assertEqual(data["results"], [{"note_id": self.note.pk, "title": "Plan"}])
+        data = self.client.get(self.url, {"fields": "description_html,images"}).json()
+        self.assertEqual(data, {"description_html": "<p><strong>bold</strong></p>", "images": []})
+        self.assertEqual(self.client.get(self.url, {"fields": "user"}).status_code, 400)
+
+    def test_anonymous_requests_get_401(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse("api_notes")).status_code, 401)
+
+    def test_create_from_json(self):
+        response = self.client.post(reverse("api_notes"), {"description": "new"}, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        created = note.objects.get(pk=response.json()["note_id"])
+        self.assertEqual((created.user, created.description, created.color), (self.user, "new", "#ffffff"))
+
+    def test_patch_keeps_fields_it_did_not_send(self):
+        response = self.client.patch(self.url, {"title": "Renamed"}, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.note.refresh_from_db()
+        self.assertEqual((self.note.title, self.note.description, self.note.tag), ("Renamed", "**bold**", "work"))
+
+    def test_patch_form_encoded(self):
+        response = self.client.patch(self.url, "title=From+a+form", content_type="application/x-www-form-urlencoded")
+        self.assertEqual(response.status_code, 200)
+        self.note.refresh_from_db()
+        self.assertEqual((self.note.title, self.note.description), ("From a form", "**bold**"))
+
+    def test_unreadable_bodies(self):
+        self.assertEqual(self.client.patch(self.url, "title=x", content_type="text/plain").status_code, 415)
+        self.assertEqual(self.client.patch(self.url, "[]", content_type="application/json").status_code, 400)
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.title, "Plan")
+
+    def test_locked_hidden_notes_look_missing(self):
+        self.note.is_hidden = True
+        self.note.save()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.unlock()
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+
+class ConditionalListingTests(NotesTestCase):
+    def etag(self):
+        self.client.get(reverse("index"))  # sets the CSRF cookie the page embeds
+        response = self.client.get(reverse("index"))
+        self.assertEqual(response.status_code, 200)
+        return response["ETag"]
+
+    def test_unchanged_listing_returns_304(self):
+        note.objects.create(user=self.user, description="one")
+        etag = self.etag()
+        self.assertEqual(self.client.get(reverse("index"), headers={"If-None-Match": etag}).status_code, 304)
+        self.assertEqual(
+            self.client.get(reverse("index"), {"tag": "work"}, headers={"If-None-Match": etag}).status_code, 200
+        )
+
+    def test_edits_change_the_etag(self):
+        n = note.objects.create(user=self.user, description="one")
+        etag = self.etag()
+        n.title = "changed"
+        n.save()
+        self.assertEqual(self.client.get(reverse("index"), headers={"If-None-Match": etag}).status_code, 200)
+
+    def test_unlocking_changes_the_etag(self):
+        etag = self.etag()
+        self.unlock()
+        self.client.get(reverse("hidden_notes"))  # consumes the success message
+        self.assertEqual(self.client.get(reverse("index"), headers={"If-None-Match": etag}).status_code, 200)
+
+
+@override_settings(
+    STATICFILES_FINDERS=["django.contrib.staticfiles.finders.FileSystemFinder"],
+    STORAGES={**settings.STORAGES, "staticfiles": {"BACKEND": "notes.staticfiles.CompressedManifestStaticFilesStorage"}},
+)
+class StaticFilesTests(TestCase):
+    """collectstatic into a temporary STATIC_ROOT, served by PrecompressedStaticMiddleware."""
+
+    def setUp(self):
+        self.static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.static_root, ignore_errors=True)
+        overrides = override_settings(STATIC_ROOT=self.static_root)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        call_command("collectstatic", interactive=False, verbosity=0)
+        with open(os.path.join(self.static_root, "staticfiles.json")) as f:
+            self.manifest = json.load(f)["paths"]
+        self.middleware = PrecompressedStaticMiddleware(lambda request: HttpResponse("app"))
+
+    def get(self, name, **headers):
+        return self.middleware(RequestFactory().get(settings.STATIC_URL + name, headers=headers))
+
+    def test_collectstatic_writes_hashed_and_compressed_copies(self):
+        css = self.manifest["style.css"]
+        self.assertNotEqual(css, "style.css")
+        for suffix, _ in compressors():
+            self.assertTrue(os.path.isfile(os.path.join(self.static_root, css + suffix)))
+        # Images are already compressed.
+        self.assertFalse(os.path.exists(os.path.join(self.static_root, self.manifest["Logo.png"] + ".gz")))
+
+    def test_serves_the_best_accepted_encoding(self):
+        css = self.manifest["style.css"]
+        best = "br" if ".br" in {suffix for suffix, _ in compressors()} else "gzip"
+        response = self.get(css, accept_encoding="gzip, br")
+        self.assertEqual(response["Content-Encoding"], best)
+        self.assertEqual(response["Content-Type"], "text/css")
+        self.assertEqual(response["Cache-Control"], IMMUTABLE)
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(self.get(css, accept_encoding="br;q=0, gzip")["Content-Encoding"], "gzip")
+        response = self.get(css)
+        self.assertNotIn("Content-Encoding", response)
+        with open(os.path.join(self.static_root, css), "rb") as f:
+            self.assertEqual(b"".join(response.streaming_content), f.read())
+
+    def test_unhashed_names_must_revalidate(self):
+        response = self.get("style.css")
+        self.assertEqual(response["Cache-Control"], REVALIDATE)
+        self.assertEqual(self.get("style.css", if_modified_since=response["Last-Modified"]).status_code, 304)
+
+    def test_other_paths_reach_the_app(self):
+        self.assertEqual(self.get("missing.css").content, b"app")
+        self.assertEqual(self.get("../manage.py").content, b"app")
+        self.assertEqual(self.middleware(RequestFactory().get("/notes/")).content, b"app")
+
+    def test_committed_productionfiles_are_current(self):
+        # The deploy serves the collected files from git, so they must be re-collected with static/.
+        with open(os.path.join(settings.BASE_DIR, "productionfiles", "staticfiles.json")) as f:
+            committed = json.load(f)["paths"]
+        self.assertEqual({name: committed.get(name) for name in self.manifest}, self.manifest)
+
+
+class MetricsTests(NotesTestCase):
+    def test_requests_are_counted(self):
+        labels = (("view", "index"), ("method", "GET"), ("status", "2xx"))
+        before = metrics.registry.counters.get(("notes_requests_total", labels), 0)
+        self.client.get(reverse("index"))
+        self.assertEqual(metrics.registry.counters[("notes_requests_total", labels)], before + 1)
+        self.assertIn(("notes_db_queries_total", (("view", "index"),)), metrics.registry.counters)
+
+    def test_endpoint_is_staff_only(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        self.client.get(reverse("index"))
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('notes_requests_total{view="index",method="GET",status="2xx"}', response.content.decode())
+        self.assertIn('notes_request_duration_seconds_bucket{view="index",le="+Inf"}', response.content.decode())
+
+    def test_timed_sections(self):
+        with metrics.timed("render"):
+            pass  # outside a request: not recorded anywhere
+        state, token, _ = metrics.MetricsMiddleware(None)._start()
+        try:
+            with metrics.timed("render"):
+                pass
+        finally:
+            metrics._current.reset(token)
+        self.assertEqual(state["sections"]["render"][0], 1)
+
+    @mock.patch.object(metrics, "_store", metrics._FileStore())
+    def test_exited_processes_are_archived_so_totals_never_drop(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        labels = [["view", "index"], ["method", "GET"], ["status", "2xx"]]
+        key = ("notes_requests_total", tuple(map(tuple, labels)))
+
+        def snapshot(name, value):
+            with open(os.path.join(directory, name), "w") as f:
+                json.dump({"counters": [["notes_requests_total", labels, value]], "histograms": []}, f)
+
+        exited = subprocess.Popen([sys.executable, "-c", ""])
+        exited.wait()
+        snapshot(f"{socket.gethostname()}-{exited.pid}-1.json", 100)
+        snapshot("otherhost-1-1.json", 7)  # liveness is unknown on other hosts; kept as is
+
+        with override_settings(NOTES_METRICS_DIR=directory), mock.patch.object(metrics, "registry", metrics.Registry()):
+            self.assertEqual(metrics.collect().counters[key], 107)
+            self.assertNotIn(f"{socket.gethostname()}-{exited.pid}-1.json", os.listdir(directory))
+            self.assertIn(metrics.ARCHIVE_FILE, os.listdir(directory))
+            self.assertEqual(metrics.collect().counters[key], 107)  # archived once, not again
+
+
+class ProfileLoadingTests(NotesTestCase):
+    def test_signup_logs_the_new_user_in(self):
+        self.client.logout()
+        response = self.client.post(reverse("signup"), {
+            "username": "carol", "email": "carol@example.com", "password1": "x9!kQ2#pLm", "password2": "x9!kQ2#pLm",
+        })
+        self.assertRedirects(response, reverse("index"))
+        carol = User.objects.get(username="carol")
+        self.assertEqual(int(self.client.session["_auth_user_id"]), carol.pk)
+        self.assertEqual(self.client.session["_auth_user_backend"], "notes.backends.ProfileModelBackend")
+        self.assertTrue(Profile.objects.filter(user=carol).exists())
+
+    def test_login_does_not_write_the_profile(self):
+        self.client.logout()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("login"), {"username": "alice", "password": "pw"})
+        self.assertRedirects(response, reverse("index"), fetch_redirect_response=False)
+        self.assertFalse([q for q in queries if "notes_profile" in q["sql"] and not q["sql"].startswith("SELECT")])
+
+    def test_session_user_comes_with_its_profile(self):
+        with self.assertNumQueries(1):
+            user = ProfileModelBackend().get_user(self.user.pk)
+            self.assertTrue(user.profile.pin)
+
+    def test_sessions_from_model_backend_still_work(self):
+        self.client.force_login(self.user, backend="django.contrib.auth.backends.ModelBackend")
+        self.assertEqual(self.client.get(reverse("index")).status_code, 200)
+
+
+# The async views are only routed with NOTES_ASYNC_VIEWS on (chosen at import),
+# so AsyncViewTests serve them from this URLconf next to the site's URLs.
+urlpatterns = [
+    path("async/notes/", views.async_index),
+    path("async/notes/hidden/", views.async_show_hidden_notes),
+    path("async/notes/feed/", views.async_notes_feed),
+    path("async/notes/api/notes/", views.async_api_notes),
+    path("async/notes/api/notes/<int:note_id>/", views.async_api_note),
+    *site_urls.urlpatterns,
+]
+
+
+@override_settings(ROOT_URLCONF="notes.tests")
+class AsyncViewTests(NotesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.note = note.objects.create(user=self.user, title="first", description="hello")
+        note.objects.create(user=self.user, title="secret", description="hidden", is_hidden=True)
+
+    async def test_index_with_a_model_backend_session(self):
+        # Sessions from before ProfileModelBackend load the user without its profile.
+        await self.async_client.aforce_login(self.user, backend="django.contrib.auth.backends.ModelBackend")
+        response = await self.async_client.get("/async/notes/")
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "first")
+
+    async def test_index_with_a_profile_backend_session(self):
+        await self.async_client.aforce_login(self.user)
+        self.assertEqual((await self.async_client.get("/async/notes/")).status_code, 200)
+
+    async def test_hidden_notes_need_unlock(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get("/async/notes/hidden/")
+        self.assertRedirects(response, reverse("index"), fetch_redirect_response=False)
+
+    async def test_feed_and_api(self):
+        await self.async_client.aforce_login(self.user)
+        feed = (await self.async_client.get("/async/notes/feed/")).json()
+        self.assertEqual(feed["count"], 1)
+        listing = (await self.async_client.get("/async/notes/api/notes/", {"fields": "note_id,title"})).json()
+        self.assertEqual(listing["results"], [{"note_id": self.note.pk, "title": "first"}])
+        response = await self.async_client.get(f"/async/notes/api/notes/{self.note.pk}/", {"fields": "title"})
+        self.assertEqual(response.json(), {"title": "first"})
+
+
+# The test runner allows the "testserver" host; a deployment's settings do not.
+@override_settings(ALLOWED_HOSTS=["notes.example.com"], **TEST_SETTINGS)
+class BenchmarkCommandTests(TransactionTestCase):
+    """The benchmarks drive the views from worker threads, which only see committed data."""
+
+    def test_bench_views(self):
+        out = io.StringIO()
+        call_command("bench_views", "--generate", "3", "--requests", "2", "--concurrency", "1", stdout=out)
+        self.assertEqual(out.getvalue().count("req/s"), 9)  # three modes, three paths
+        self.assertFalse(User.objects.filter(username="__bench_views__").exists())
+
+    def test_generate_dataset_and_bench_notes(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        output = os.path.join(media_root, "results.json")
+        with override_settings(MEDIA_ROOT=media_root, NOTES_TASKS_MODE="eager"):
+            call_command("generate_notes_dataset", "--users", "1", "--notes", "20", "--images", "1", stdout=io.StringIO())
+            call_command(
+                "bench_notes", "--concurrency", "1", "--requests", "3", "--output", output, stdout=io.StringIO()
+            )
+        with open(output) as f:
+            report = json.load(f)
+        self.assertEqual(report["meta"]["dataset"]["notes"], 20)
+        self.assertEqual(
+            {result["scenario"] for result in report["results"]},
+            {"index", "tag", "search", "hidden", "api", "create"},
+        )
+        self.assertEqual(sum(result["errors"] for result in report["results"]), 0)
+        self.assertFalse(note.objects.filter(title__startswith="bench run").exists())
+
+
+class DatabaseSettingsTests(TransactionTestCase):
+    def database_settings(self, **env):
+        """DATABASES['default'] as notesApp.settings builds it from `env`."""
+        env = {**os.environ, **env}
+        env.pop("DJANGO_SETTINGS_MODULE", None)
+        code = "import json, notesApp.settings as s; print(json.dumps(s.DATABASES['default'], default=str))"
+        result = subprocess.run(
+            [sys.executable, "-c", code], cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True
+        )
+        return json.loads(result.stdout)
+
+    def test_postgres_uses_the_pool_instead_of_persistent_connections(self):
+        db = self.database_settings(DB_ENGINE="postgres", DB_POOL_MAX_SIZE="4", DB_CONN_MAX_AGE="30")
+        self.assertEqual((db["ENGINE"], db["CONN_MAX_AGE"]), ("django.db.backends.postgresql", 0))
+        self.assertEqual(db["OPTIONS"]["pool"]["max_size"], 4)
+        db = self.database_settings(DB_ENGINE="postgres", DB_POOL="False", DB_CONN_MAX_AGE="30")
+        self.assertEqual((db["CONN_MAX_AGE"], db.get("OPTIONS")), (30, None))
+
+    def test_sqlite_connections_get_the_pragmas(self):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+        self.assertEqual(connection.settings_dict["OPTIONS"]["transaction_mode"], "IMMEDIATE")
+
+    def test_stress_db_writes(self):
+        out = io.StringIO()
+        call_command("stress_db_writes", "--threads", "2", "--operations", "20", stdout=out)
+        self.assertIn("busy_timeout=5000", out.getvalue())
+        self.assertIn("20 operations on 2 threads", out.getvalue())
+        self.assertFalse(User.objects.filter(username="__stress_db__").exists())
@@ -1,17 +1,36 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# NOTES_ASYNC_VIEWS swaps the read-heavy views for their async versions (best under ASGI).
+if settings.NOTES_ASYNC_VIEWS:
+    index, hidden_notes, notes_feed = views.async_index, views.async_show_hidden_notes, views.async_notes_feed
+    api_notes, api_note = views.async_api_notes, views.async_api_note
+else:
+    index, hidden_notes, notes_feed = views.index, views.show_hidden_notes, views.notes_feed
+    api_notes, api_note = views.api_notes, views.api_note
+
 # app_name='notes'
 urlpatterns = [
-    path('', views.index, name='index'),
+    path('', index, name='index'),
     path('create/', views.create_or_edit_note, name='create_note'),
     path('edit/<int:note_id>/', views.create_or_edit_note, name='edit_note'),
     path('hidden/edit/<int:note_id>/', views.create_or_edit_note, name='hidden_edit_note'),
     path('delete_image/<int:image_id>/', views.delete_note_image, name='delete_note_image'),
     path('<int:note_id>/delete/', views.delete_note, name='delete_note'),
+    path('bulk/', views.bulk_notes, name='bulk_notes'),
+    path('export/', views.export_notes, name='export_notes'),
+    path('import/', views.upload_import, name='upload_import'),
+    path('import/<int:task_id>/', views.import_status, name='import_status'),
+    path('api/notes/', api_notes, name='api_notes'),
+    path('api/notes/<int:note_id>/', api_note, name='api_note'),
     path('signup/', views.signup, name='signup'),
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
-    path('hidden/', views.show_hidden_notes, name='hidden_notes'),
+    path('hidden/', hidden_notes, name='hidden_notes'),
+    path('hidden/lock/', views.lock_hidden, name='lock_hidden'),
+    path('feed/', notes_feed, name='notes_feed'),
+    path('hidden/feed/', notes_feed, {'hidden': True}, name='hidden_notes_feed'),
     path('set_pin/', views.index, name='set_pin'),
+    path('metrics/', views.metrics, name='metrics'),
 ]
@@ -1,6 +1,10 @@
 from .notes_views import *
 from .auth_views import *
 from .profile_views import *
+from .api_views import *
+from .async_views import *
+from .media_views import *
+from .metrics_views import *
 
 from django.db.models import Q
 from django.shortcuts import get_object_or_404
@@ -0,0 +1,202 @@
+import json
+from collections import defaultdict
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.forms.models import model_to_dict
+from django.http import JsonResponse, QueryDict
+from django.views.decorators.http import require_http_methods
+
+from ..listing_cache import list_key
+from ..metrics import timed
+from ..models import note, note_image
+from ..rendering import description_hash, render_markdown
+from ..forms.note_forms import NoteForm
+from .utils import filter_notes, hidden_locked_json, hidden_notes_unlocked, paginate_notes
+
+# Plain columns a client may ask for with ?fields=. description_html and
+# images are opt-in extras; the default set never touches Markdown or images.
+API_FIELDS = ("note_id", "title", "description", "tag", "color", "is_hidden", "created_at", "updated_at")
+API_EXTRA_FIELDS = ("description_html", "images")
+API_MAX_PAGE_SIZE = 100
+
+
+def api_login_required(view):
+    """Like login_required, but answers anonymous requests with a 401 JSON error instead of a redirect."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if not (await request.auser()).is_authenticated:
+                return JsonResponse({"success": False, "error": "Authentication required."}, status=401)
+            return await view(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({"success": False, "error": "Authentication required."}, status=401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def _requested_fields(request):
+    """Fields named in ?fields= (all plain fields by default). Raises ValueError on unknown names."""
+    raw = request.GET.get("fields")
+    if not raw:
+        return list(API_FIELDS)
+    fields = list(dict.fromkeys(name.strip() for name in raw.split(",") if name.strip()))
+    unknown = [name for name in fields if name not in API_FIELDS + API_EXTRA_FIELDS]
+    if unknown or not fields:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Choose from {', '.join(API_FIELDS + API_EXTRA_FIELDS)}.")
+    return fields
+
+
+def _stored_html(row):
+    """Stored Markdown HTML, rendered on the fly only if the row is stale (as formatted_description does)."""
+    with timed("formatted_description"):
+        if row["description_hash"] != description_hash(row["description"]):
+            return render_markdown(row["description"])
+        return row["description_html"]
+
+
+def _values(notes, fields):
+    """`.values()` over just the columns `fields` need, plus the cursor keys."""
+    columns = {name for name in fields if name in API_FIELDS} | {"note_id", "updated_at"}
+    if "description_html" in fields:
+        columns |= {"description", "description_html", "description_hash"}
+    if "search_rank" in notes.query.annotations:
+        columns.add("search_rank")  # ranked searches page by it
+    return notes.values(*columns)
+
+
+def _render_rows(raw_rows, fields):
+    """Shape `.values()` rows into API objects holding exactly the requested fields."""
+    images = defaultdict(list)
+    if "images" in fields and raw_rows:
+        note_images = note_image.objects.filter(note_id__in=[row["note_id"] for row in raw_rows]).order_by("image_id")
+        for img in note_images.values("note_id", "image_id", "image", "width", "height", "status"):
+            images[img.pop("note_id")].append({**img, "image": default_storage.url(img["image"])})
+
+    results = []
+    for row in raw_rows:
+        item = {}
+        for name in fields:
+            if name == "description_html":
+                item[name] = _stored_html(row)
+            elif name == "images":
+                item[name] = images[row["note_id"]]
+            else:
+                item[name] = row[name]
+        results.append(item)
+    return results
+
+
+def _note_payload(request):
+    """Submitted note data from a JSON or form body, or None for content types it cannot read.
+
+    Raises ValueError on bad JSON.
+    """
+    if request.content_type == "application/json":
+        data = json.loads(request.body or b"{}")
+        if not isinstance(data, dict):
+            raise ValueError("Expected a JSON object.")
+        return data
+    if request.method == "POST" and request.content_type in ("application/x-www-form-urlencoded", "multipart/form-data"):
+        return request.POST.dict()
+    if request.content_type == "application/x-www-form-urlencoded":
+        # Django only parses POST bodies into request.POST.
+        return QueryDict(request.body, encoding=request.encoding).dict()
+    return None
+
+
+def _page_size(request):
+    try:
+        size = int(request.GET.get("limit") or settings.NOTES_PAGE_SIZE)
+    except ValueError:
+        size = settings.NOTES_PAGE_SIZE
+    return max(1, min(size, API_MAX_PAGE_SIZE))
+
+
+@api_login_required
+@require_http_methods(["GET", "POST"])
+def api_notes(request):
+    """List the user's notes (GET) or create one (POST).
+
+    GET accepts fields, cursor, limit, hidden, tag, color and search; the
+    response is {"results": [...], "next_cursor": ...}.
+    """
+    if request.method == "POST":
+        return _save_note(request, None)
+
+    try:
+        fields = _requested_fields(request)
+    except ValueError as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=400)
+
+    hidden = request.GET.get("hidden") == "1"
+    if hidden and not hidden_notes_unlocked(request):
+        return hidden_locked_json()
+    tag, color, search = request.GET.get("tag"), request.GET.get("color"), request.GET.get("search")
+    notes = note.objects.filter(user=request.user, is_deleted=False, is_hidden=hidden)
+    notes, _, _ = filter_notes(tag, color, request.user, notes, hidden, search)
+    page, next_cursor = paginate_notes(
+        _values(notes, fields), request.GET.get("cursor"), _page_size(request),
+        list_key=list_key(request.user.pk, hidden, tag, color, search),
+    )
+    return JsonResponse({"results": _render_rows(page, fields), "next_cursor": next_cursor})
+
+
+@api_login_required
+@require_http_methods(["GET", "POST", "PATCH"])
+def api_note(request, note_id):
+    """Fetch (GET) or update (PATCH/POST, partial) one of the user's notes."""
+    notes = note.objects.filter(user=request.user, is_deleted=False, pk=note_id)
+    if not hidden_notes_unlocked(request):
+        notes = notes.filter(is_hidden=False)  # locked hidden notes look like missing ones
+
+    if request.method in ("PATCH", "POST"):
+        instance = notes.first()
+        if instance is None:
+            return JsonResponse({"success": False, "error": "Note not found."}, status=404)
+        return _save_note(request, instance)
+
+    try:
+        fields = _requested_fields(request)
+    except ValueError as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=400)
+    row = _values(notes, fields).first()
+    if row is None:
+        return JsonResponse({"success": False, "error": "Note not found."}, status=404)
+    return JsonResponse(_render_rows([row], fields)[0])
+
+
+def _save_note(request, instance):
+    """Validate submitted data with NoteForm and save it; fields left out keep their current (or default) values."""
+    try:
+        payload = _note_payload(request)
+    except ValueError as e:
+        return JsonResponse({"success": False, "error": f"Invalid JSON: {e}"}, status=400)
+    if payload is None:
+        return JsonResponse(
+            {"success": False, "error": "Send application/json or application/x-www-form-urlencoded data."}, status=415
+        )
+
+    if instance:
+        data = model_to_dict(instance, fields=NoteForm._meta.fields)
+    else:
+        data = {name: note._meta.get_field(name).get_default() for name in NoteForm._meta.fields}
+    data.update({name: value for name, value in payload.items() if name in NoteForm._meta.fields})
+    form = NoteForm(data, instance=instance)
+    if not form.is_valid():
+        return JsonResponse(
+            {"success": False, "error": "Invalid note.", "errors": form.errors.get_json_data()}, status=400
+        )
+
+    saved = form.save(commit=False)
+    saved.user = request.user
+    saved.save()
+    row = {field: getattr(saved, field) for field in API_FIELDS}
+    return JsonResponse(row, status=200 if instance else 201)
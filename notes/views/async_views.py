@@ -0,0 +1,149 @@
+"""Async versions of the read-heavy notes views, used when NOTES_ASYNC_VIEWS is on.
+
+Queries run on the async ORM. Anything that does file, cache or template work
+(image URLs, the card fragment cache, Markdown) is offloaded explicitly with
+sync_to_async, so it never blocks the event loop. POSTs (PIN forms, creating
+notes) are handed to the sync views unchanged.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import render
+from django.template.loader import render_to_string
+
+from ..listing_cache import list_key
+from ..models import Profile, note
+from ..forms.profile_forms import PinSetForm, PinCheckForm
+from .api_views import (
+    API_EXTRA_FIELDS, api_login_required, api_note, api_notes, _page_size, _render_rows, _requested_fields, _values,
+)
+from .notes_views import index, show_hidden_notes
+from .utils import (
+    apaginate_notes, conditional_listing, filter_notes, hidden_locked_json, hidden_notes_unlocked,
+    hidden_unlock_required, listing_queryset, process_note_images,
+)
+
+
+async def _listing_page(request, user, hidden):
+    """Filtered page of notes (images prefetched) plus dropdown choices, for the grid views."""
+    tag, color, search = (
+        request.GET.get("tag"),
+        request.GET.get("color"),
+        request.GET.get("search"),
+    )
+    # filter_notes may need to detect the search backend, which inspects the database.
+    notes, all_tags, all_colors = await sync_to_async(filter_notes)(
+        tag, color, user, listing_queryset(user, hidden), hidden, search
+    )
+    notes, next_cursor = await apaginate_notes(
+        notes, request.GET.get("cursor"), list_key=list_key(user.pk, hidden, tag, color, search)
+    )
+    process_note_images(notes)
+    return {
+        "notes": notes,
+        "next_cursor": next_cursor,
+        "all_tags": [t async for t in all_tags],
+        "all_colors": [c async for c in all_colors],
+        "selected_tag": tag or "all",
+        "selected_color": color or "all",
+        "hidden": hidden,
+    }
+
+
+async def _arender_rows(rows, fields):
+    """_render_rows, offloaded when opt-in fields need a query, storage URLs or Markdown."""
+    if set(API_EXTRA_FIELDS).intersection(fields):
+        return await sync_to_async(_render_rows)(rows, fields)
+    return _render_rows(rows, fields)
+
+
+@login_required
+@conditional_listing(hidden=False)
+async def async_index(request):
+    """Async `index`: visible notes. PIN form posts go to the sync view."""
+    if request.method == "POST":
+        return await sync_to_async(index)(request)
+
+    user = await request.auser()
+    context = await _listing_page(request, user, hidden=False)
+    if not type(user).profile.is_cached(user):
+        # Joined by ProfileModelBackend; sessions from plain ModelBackend load it here.
+        user.profile = await Profile.objects.aget(user=user)
+    profile = user.profile
+    context.update({
+        "verify_pin_form": PinCheckForm(),
+        "pin_set_form": PinSetForm(),
+        "hidden_unlocked": await sync_to_async(hidden_notes_unlocked)(request, profile),
+        "profile": profile,
+    })
+    # Template rendering reads the card cache and storage URLs; keep it off the loop.
+    return await sync_to_async(render)(request, "notes/index.html", context)
+
+
+@login_required
+@hidden_unlock_required
+@conditional_listing(hidden=True)
+async def async_show_hidden_notes(request):
+    """Async `show_hidden_notes`."""
+    if request.method == "POST":
+        return await sync_to_async(show_hidden_notes)(request)
+
+    user = await request.auser()
+    context = await _listing_page(request, user, hidden=True)
+    return await sync_to_async(render)(request, "notes/index.html", context)
+
+
+@login_required
+async def async_notes_feed(request, hidden=False):
+    """Async `notes_feed`."""
+    if hidden and not await sync_to_async(hidden_notes_unlocked)(request):
+        return hidden_locked_json()
+    user = await request.auser()
+    context = await _listing_page(request, user, hidden)
+    html = await sync_to_async(render_to_string)("notes/note_list.html", {"notes": context["notes"]}, request=request)
+    return JsonResponse({"html": html, "next_cursor": context["next_cursor"], "count": len(context["notes"])})
+
+
+@api_login_required
+async def async_api_notes(request):
+    """Async `api_notes` listing; creates (POST) go to the sync view."""
+    if request.method != "GET":
+        return await sync_to_async(api_notes)(request)
+    try:
+        fields = _requested_fields(request)
+    except ValueError as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=400)
+
+    user = await request.auser()
+    hidden = request.GET.get("hidden") == "1"
+    if hidden and not await sync_to_async(hidden_notes_unlocked)(request):
+        return hidden_locked_json()
+    tag, color, search = request.GET.get("tag"), request.GET.get("color"), request.GET.get("search")
+    notes = note.objects.filter(user=user, is_deleted=False, is_hidden=hidden)
+    notes, _, _ = await sync_to_async(filter_notes)(tag, color, user, notes, hidden, search)
+    page, next_cursor = await apaginate_notes(
+        _values(notes, fields), request.GET.get("cursor"), _page_size(request),
+        list_key=list_key(user.pk, hidden, tag, color, search),
+    )
+    results = await _arender_rows(page, fields)
+    return JsonResponse({"results": results, "next_cursor": next_cursor})
+
+
+@api_login_required
+async def async_api_note(request, note_id):
+    """Async `api_note` fetch; updates go to the sync view."""
+    if request.method != "GET":
+        return await sync_to_async(api_note)(request, note_id)
+    try:
+        fields = _requested_fields(request)
+    except ValueError as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=400)
+
+    user = await request.auser()
+    notes = note.objects.filter(user=user, is_deleted=False, pk=note_id)
+    if not await sync_to_async(hidden_notes_unlocked)(request):
+        notes = notes.filter(is_hidden=False)
+    row = await _values(notes, fields).afirst()
+    if row is None:
+        return JsonResponse({"success": False, "error": "Note not found."}, status=404)
+    return JsonResponse((await _arender_rows([row], fields))[0])
@@ -15,7 +15,7 @@ def signup(request):
         user = form.save(commit=False)
         user.set_password(form.cleaned_data["password1"])
         user.save()
-        login(request, user)
+        login(request, user, backend="notes.backends.ProfileModelBackend")
         messages.success(request, "Signup successful.")
         return redirect("index")
     return render(request, "registration/signup.html", {"form": form})
@@ -0,0 +1,144 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from django.views.decorators.http import require_safe
+
+from ..models import note_image, Profile
+from .utils import hidden_notes_unlocked
+
+MEDIA_CACHE_CONTROL = "private, max-age=604800"
+RANGE_CHUNK_SIZE = 64 * 1024
+_VARIANT_RE = re.compile(r"^notes/images/variants/(\d+)/[^/]+$")
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _owned_image(user, path):
+    """The user's note_image that `path` belongs to (original or variant), or None."""
+    images = note_image.objects.filter(note__user=user).select_related("note").only("image_id", "note__is_hidden")
+    match = _VARIANT_RE.match(path)
+    if match:
+        return images.filter(image_id=int(match.group(1))).first()
+    return images.filter(image=path).first()
+
+
+def can_access_media(request, path):
+    """True if the logged-in user owns the media file at `path` (and may see it right now)."""
+    user = request.user
+    if not user.is_authenticated:
+        return False
+    if path.startswith("notes/images/"):
+        img = _owned_image(user, path)
+        return img is not None and (not img.note.is_hidden or hidden_notes_unlocked(request))
+    if path.startswith("profiles/"):
+        return Profile.objects.filter(user=user, profile_picture=path).exists()
+    return False
+
+
+def _parse_range(header, size):
+    """(start, end) inclusive for a single "bytes=" range, None to send everything, or False if unsatisfiable."""
+    match = _RANGE_RE.match(header.replace(" ", ""))
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    else:  # suffix range: the last N bytes
+        start, end = max(0, size - int(last)), size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _read_range(path, start, length):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(RANGE_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _file_response(request, path, full_path):
+    """Serve the file from Python, honouring Range, If-Range and the conditional GET headers."""
+    stat = os.stat(full_path)
+    etag = quote_etag(f"{stat.st_mtime_ns:x}-{stat.st_size:x}")
+    last_modified = int(stat.st_mtime)
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+    # 304 for a matching If-None-Match (any listed or weak ETag) or If-Modified-Since.
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        byte_range = None
+        if "Range" in request.headers and _range_applies(request.headers.get("If-Range"), etag, last_modified):
+            byte_range = _parse_range(request.headers["Range"], stat.st_size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response.headers["Content-Range"] = f"bytes */{stat.st_size}"
+        elif byte_range:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                _read_range(full_path, start, end - start + 1), status=206, content_type=content_type
+            )
+            response.headers["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+            response.headers["Content-Length"] = str(end - start + 1)
+        else:
+            # FileResponse lets the server use wsgi.file_wrapper (sendfile) for the body.
+            response = FileResponse(open(full_path, "rb"), content_type=content_type)
+        response.headers["Accept-Ranges"] = "bytes"
+    response.headers["Last-Modified"] = http_date(stat.st_mtime)
+    response.headers["ETag"] = etag
+    return response
+
+
+def _range_applies(if_range, etag, last_modified):
+    """If-Range holds when absent, or when it names this exact (strong) ETag or modification date."""
+    if if_range is None:
+        return True
+    if if_range.startswith(("W/", '"')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+@require_safe
+def serve_media(request, path):
+    """Serve an uploaded file to its owner.
+
+    With NOTES_MEDIA_ACCEL set, the web server sends the bytes: "nginx" answers
+    with X-Accel-Redirect to NOTES_MEDIA_ACCEL_PREFIX + path (an internal
+    location), and "sendfile" with X-Sendfile pointing at the file (Apache
+    mod_xsendfile, lighttpd). Otherwise the file is served with Range support.
+    Files the user may not see are reported as missing.
+    """
+    if not can_access_media(request, path):
+        raise Http404("No such file.")
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("No such file.")
+
+    accel = getattr(settings, "NOTES_MEDIA_ACCEL", None)
+    if accel == "nginx":
+        response = HttpResponse(content_type=mimetypes.guess_type(path)[0] or "application/octet-stream")
+        # nginx URL-decodes the redirect target, so names with spaces, "%" or "?" must be quoted.
+        response.headers["X-Accel-Redirect"] = quote(settings.NOTES_MEDIA_ACCEL_PREFIX + path)
+    elif accel == "sendfile":
+        response = HttpResponse(content_type=mimetypes.guess_type(path)[0] or "application/octet-stream")
+        response.headers["X-Sendfile"] = full_path
+    elif default_storage.exists(path):
+        response = _file_response(request, path, full_path)
+    else:
+        raise Http404("No such file.")
+
+    response.headers["Cache-Control"] = MEDIA_CACHE_CONTROL
+    return response
@@ -0,0 +1,15 @@
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_safe
+
+from ..metrics import collect, render
+
+
+@require_safe
+@never_cache
+def metrics(request):
+    """Request metrics of all app processes in Prometheus text format (staff only)."""
+    if not (request.user.is_authenticated and request.user.is_staff):
+        raise PermissionDenied
+    return HttpResponse(render(collect()), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,18 +1,36 @@
+import json
+
+from django import forms
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.core.files.storage import default_storage
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
+from django.template.loader import render_to_string
+from django.utils import timezone
 from django.views.decorators.http import require_POST
 
 from notes.views.profile_views import profile
-from ..models import note, note_image
+from ..models import note, note_image, background_task
+from ..export import export_queryset, iter_jsonl, iter_zip
+from ..importers import detect_format
+from ..listing_cache import list_key
+from ..signals import notes_bulk_updated
+from ..tasks import enqueue
 # from ..forms import NoteForm, NoteImageForm, PinSetForm, PinCheckForm
 # Import forms (organized by module)
 from ..forms.note_forms import NoteForm, NoteImageForm
 from ..forms.profile_forms import PinSetForm, PinCheckForm
-from .utils import filter_notes, process_note_images, delete_image, handle_verify_pin, handle_pin_set
+from .utils import (
+    conditional_listing, filter_notes, listing_queryset, paginate_notes, process_note_images, delete_image,
+    handle_verify_pin, handle_pin_set, hidden_locked_json, hidden_notes_unlocked, hidden_unlock_required,
+    lock_hidden_notes,
+)
 
 
 @login_required
+@conditional_listing(hidden=False)
 def index(request):
     """Display visible notes and handle PIN verification."""
 
@@ -37,12 +55,11 @@ def index(request):
             return redirect("hidden_notes")
     
     # Notes
-    notes = (
-        note.objects.filter(user=user, is_deleted=False, is_hidden=hidden)
-        .prefetch_related("note_image_set")
-        .order_by("-updated_at")
-    )
+    notes = listing_queryset(user, hidden)
     notes, all_tags, all_colors = filter_notes(tag, color, user, notes, hidden, search)
+    notes, next_cursor = paginate_notes(
+        notes, request.GET.get("cursor"), list_key=list_key(user.pk, hidden, tag, color, search)
+    )
     process_note_images(notes)
 
     return render(
@@ -50,6 +67,7 @@ def index(request):
         "notes/index.html",
         {
             "notes": notes,
+            "next_cursor": next_cursor,
             "all_tags": all_tags,
             "all_colors": all_colors,
             "selected_tag": tag or "all",
@@ -57,14 +75,17 @@ def index(request):
             "verify_pin_form": form,
             "pin_set_form": pin_set_form,
             "hidden": hidden,
+            "hidden_unlocked": hidden_notes_unlocked(request, profile),
             "profile": profile,
         },
     )
 
 
 @login_required
+@hidden_unlock_required
+@conditional_listing(hidden=True)
 def show_hidden_notes(request):
-    """Display user's hidden notes (after correct PIN verification)."""
+    """Display user's hidden notes (while the session's PIN unlock is live)."""
     user = request.user
     hidden = True
     tag, color, search = (
@@ -73,12 +94,11 @@ def show_hidden_notes(request):
         request.GET.get("search"),
     )
 
-    notes = (
-        note.objects.filter(user=user, is_deleted=False, is_hidden=hidden)
-        .prefetch_related("note_image_set")
-        .order_by("-updated_at")
-    )
+    notes = listing_queryset(user, hidden)
     notes, all_tags, all_colors = filter_notes(tag, color, user, notes, hidden, search)
+    notes, next_cursor = paginate_notes(
+        notes, request.GET.get("cursor"), list_key=list_key(user.pk, hidden, tag, color, search)
+    )
     process_note_images(notes)
 
     return render(
@@ -86,6 +106,7 @@ def show_hidden_notes(request):
         "notes/index.html",
         {
             "notes": notes,
+            "next_cursor": next_cursor,
             "all_tags": all_tags,
             "all_colors": all_colors,
             "selected_tag": tag or "all",
@@ -95,6 +116,36 @@ def show_hidden_notes(request):
     )
 
 
+@login_required
+@require_POST
+def lock_hidden(request):
+    """End the session's hidden-notes unlock before it expires."""
+    lock_hidden_notes(request)
+    messages.success(request, "Hidden notes locked.")
+    return redirect("index")
+
+
+@login_required
+def notes_feed(request, hidden=False):
+    """Return the next page of note cards as an HTML fragment plus the following cursor."""
+    if hidden and not hidden_notes_unlocked(request):
+        return hidden_locked_json()
+    tag, color, search = (
+        request.GET.get("tag"),
+        request.GET.get("color"),
+        request.GET.get("search"),
+    )
+    notes = listing_queryset(request.user, hidden)
+    notes, _, _ = filter_notes(tag, color, request.user, notes, hidden, search)
+    notes, next_cursor = paginate_notes(
+        notes, request.GET.get("cursor"), list_key=list_key(request.user.pk, hidden, tag, color, search)
+    )
+    process_note_images(notes)
+
+    html = render_to_string("notes/note_list.html", {"notes": notes}, request=request)
+    return JsonResponse({"html": html, "next_cursor": next_cursor, "count": len(notes)})
+
+
 @login_required
 def create_or_edit_note(request, note_id=None):
     """Create or edit a note with optional image uploads."""
@@ -103,6 +154,12 @@ def create_or_edit_note(request, note_id=None):
     )
     profile = request.user.profile
     verify_pin_form = PinCheckForm(request.POST or None)
+    hidden_unlocked = hidden_notes_unlocked(request, profile)
+
+    is_hidden_edit = request.resolver_match.url_name == "hidden_edit_note"
+    if (is_hidden_edit or (note_instance and note_instance.is_hidden)) and not hidden_unlocked:
+        messages.error(request, "Please verify your PIN to edit hidden notes.")
+        return redirect("index")
 
     if request.method == "POST":
         if request.method == "POST" and "verify_pin" in request.POST:
@@ -115,12 +172,12 @@ def create_or_edit_note(request, note_id=None):
             saved_note.user = request.user
             saved_note.save()
 
+            # Variants are generated in the background; cards show a placeholder meanwhile.
             for img in request.FILES.getlist("images"):
-                note_image.objects.create(note=saved_note, image=img)
+                uploaded = note_image.objects.create(note=saved_note, image=img)
+                enqueue("process_note_image", image_id=uploaded.image_id)
 
             return redirect("index")
-        else:
-            print(form.errors)
     else:
         form = NoteForm(instance=note_instance)
 
@@ -133,6 +190,7 @@ def create_or_edit_note(request, note_id=None):
             "note": note_instance,
             "pin_form": PinSetForm(request),
             "verify_pin_form": verify_pin_form,
+            "hidden_unlocked": hidden_unlocked,
         },
     )
 
@@ -149,5 +207,103 @@ def delete_note(request, note_id):
     """Soft delete a note."""
     note_instance = get_object_or_404(note, pk=note_id, user=request.user)
     note_instance.is_deleted = True
+    note_instance.deleted_at = timezone.now()
     note_instance.save()
     return redirect("index")
+
+
+BULK_ACTIONS = {
+    "delete": lambda value: {"is_deleted": True, "deleted_at": timezone.now()},
+    "hide": lambda value: {"is_hidden": True},
+    "unhide": lambda value: {"is_hidden": False},
+    "set_tag": lambda value: {"tag": NoteForm.base_fields["tag"].clean(value)},
+    "set_color": lambda value: {"color": NoteForm.base_fields["color"].clean(value)},
+}
+BULK_MAX_NOTES = 1000
+
+
+@login_required
+@require_POST
+def bulk_notes(request):
+    """Apply one action to many of the user's notes with a single UPDATE.
+
+    Accepts JSON or form data: note_ids (list), action (delete, hide, unhide,
+    set_tag, set_color) and value (for set_tag/set_color).
+    """
+    if request.content_type == "application/json":
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({"success": False, "error": "Invalid JSON."}, status=400)
+        note_ids, action, value = data.get("note_ids"), data.get("action"), data.get("value")
+    else:
+        note_ids, action, value = request.POST.getlist("note_ids"), request.POST.get("action"), request.POST.get("value")
+
+    if action not in BULK_ACTIONS:
+        return JsonResponse({"success": False, "error": f"Unknown action: {action}."}, status=400)
+    try:
+        if not isinstance(note_ids, list):
+            raise TypeError
+        note_ids = sorted({int(pk) for pk in note_ids})
+        changes = BULK_ACTIONS[action](value)
+    except (TypeError, ValueError):
+        return JsonResponse({"success": False, "error": "note_ids must be a list of integers."}, status=400)
+    except forms.ValidationError as e:
+        return JsonResponse({"success": False, "error": " ".join(e.messages)}, status=400)
+    if not note_ids or len(note_ids) > BULK_MAX_NOTES:
+        return JsonResponse({"success": False, "error": f"Send between 1 and {BULK_MAX_NOTES} note_ids."}, status=400)
+
+    notes = note.objects.filter(user=request.user, is_deleted=False, note_id__in=note_ids)
+    if not hidden_notes_unlocked(request):
+        notes = notes.filter(is_hidden=False)
+    updated = notes.update(**changes, updated_at=timezone.now())
+    notes_bulk_updated.send(sender=note, user_id=request.user.pk, note_ids=note_ids, fields=[*changes, "updated_at"])
+    return JsonResponse({"success": True, "action": action, "updated": updated})
+
+
+@login_required
+def export_notes(request):
+    """Stream the user's notes as JSONL (?format=jsonl) or a ZIP with their images (?format=zip)."""
+    export_format = request.GET.get("format", "jsonl")
+    if export_format not in ("jsonl", "zip"):
+        return JsonResponse({"success": False, "error": "format must be jsonl or zip."}, status=400)
+
+    include_hidden = request.GET.get("include_hidden") == "1"
+    if include_hidden and not hidden_notes_unlocked(request):
+        return hidden_locked_json()
+    notes = export_queryset(request.user, include_hidden=include_hidden)
+    if export_format == "zip":
+        response = StreamingHttpResponse(iter_zip(notes), content_type="application/zip")
+    else:
+        response = StreamingHttpResponse(iter_jsonl(notes), content_type="application/x-ndjson")
+    filename = f"notes-{request.user.username}-{timezone.now():%Y%m%d}.{export_format}"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+@login_required
+@require_POST
+def upload_import(request):
+    """Queue a bulk import of an uploaded Markdown file, JSONL file or export ZIP."""
+    upload = request.FILES.get("file")
+    if not upload:
+        return JsonResponse({"success": False, "error": "Upload a file in the 'file' field."}, status=400)
+    source_format = request.POST.get("format") or detect_format(upload.name)
+    if source_format not in ("markdown", "jsonl", "zip"):
+        return JsonResponse({"success": False, "error": "format must be markdown, jsonl or zip."}, status=400)
+
+    path = default_storage.save(f"imports/{request.user.pk}/{upload.name}", upload)
+    task = enqueue("import_notes", user_id=request.user.pk, path=path, source_format=source_format)
+    return JsonResponse(
+        {"success": True, "task_id": task.pk, "status_url": reverse("import_status", args=[task.pk])},
+        status=202,
+    )
+
+
+@login_required
+def import_status(request, task_id):
+    """Report the state of one of the user's import tasks."""
+    task = get_object_or_404(
+        background_task, pk=task_id, name="import_notes", payload__user_id=request.user.pk
+    )
+    return JsonResponse({"task_id": task.pk, "status": task.status, "attempts": task.attempts, "result": task.result})
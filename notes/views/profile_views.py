@@ -19,19 +19,29 @@ def handle_profile_update(request, user, profile):
     """Handle updating basic profile info (name, picture, pin)."""
     form = ProfileForm(request.POST, request.FILES, instance=profile)
     if form.is_valid():
-        user.first_name = form.cleaned_data.get('first_name', user.first_name)
-        user.last_name = form.cleaned_data.get('last_name', user.last_name)
-
+        # Only write the rows (and columns) that actually changed.
+        user_changes = []
+        for field in ('first_name', 'last_name'):
+            value = form.cleaned_data.get(field, getattr(user, field))
+            if value != getattr(user, field):
+                setattr(user, field, value)
+                user_changes.append(field)
+
+        profile_changes = []
         pin = form.cleaned_data.get('pin')
         if pin:
             profile.pin = make_password(pin)
+            profile_changes.append('pin')
 
         profile_picture = form.cleaned_data.get('profile_picture')
-        if profile_picture:
+        if profile_picture and 'profile_picture' in form.changed_data:
             profile.profile_picture = profile_picture
+            profile_changes.append('profile_picture')
 
-        user.save()
-        profile.save()
+        if user_changes:
+            user.save(update_fields=user_changes)
+        if profile_changes:
+            profile.save(update_fields=profile_changes)
         messages.success(request, "Profile updated successfully.")
         return redirect("profile")
 
@@ -75,7 +85,7 @@ def handle_pin_reset(request, profile):
             return None
         else:
             profile.pin = make_password(new_pin)
-            profile.save()
+            profile.save(update_fields=['pin'])
             messages.success(request, "PIN reset successfully.")
             return redirect("profile")
 
@@ -1,89 +1,356 @@
-from django.db.models import Q
+import base64
+import binascii
+import hashlib
+import math
+import time
+from datetime import datetime
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+
+from django.conf import settings
+from django.db.models import Count, Max, Q
+from django.db.models.functions import Lower
 from django.contrib import messages
 from django.shortcuts import get_object_or_404, redirect
 from django.contrib.auth.hashers import check_password, make_password
+from django.utils.crypto import constant_time_compare, salted_hmac
 from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
 
+from ..facets import facet_choices
+from ..listing_cache import cached_entries, listing_order, page_after
+from ..metrics import timed
 from ..models import note, note_image
+from ..rendering import renderer_version
+from ..search import get_search_backend
 from ..forms.profile_forms import PinCheckForm, PinSetForm
 
 
 
+def listing_queryset(user, hidden=False):
+    """Base queryset for the notes grid: the user's live notes in one visibility."""
+    return note.objects.filter(user=user, is_deleted=False, is_hidden=hidden).prefetch_related("note_image_set")
+
+
 def filter_notes(tag, color, user, notes=None, hidden=False, search=None):
-    """Filter notes by tag, color, and search query. Return filtered notes + tag/color lists."""
+    """Filter notes by tag, color, and search query. Return filtered notes + tag/color lists.
+
+    With a search, notes are annotated with `search_rank` when the backend can
+    rank matches, and listings then put the best match first.
+    """
+    # Lower(...) = value instead of __iexact so the (user, lower(tag|color)) indexes apply.
     if tag and tag != "all":
-        notes = notes.filter(tag__iexact=tag)
+        notes = notes.alias(tag_lower=Lower("tag")).filter(tag_lower=tag.lower())
     if color and color != "all":
-        notes = notes.filter(color__iexact=color)
+        notes = notes.alias(color_lower=Lower("color")).filter(color_lower=color.lower())
     if search and search.strip():
-        notes = notes.filter(
-            Q(title__icontains=search)
-            | Q(description__icontains=search)
-            | Q(tag__icontains=search)
-        )
+        backend = get_search_backend()
+        notes = backend.filter(notes, user, search)
+        rank = backend.rank(user, search)
+        if rank is not None:
+            notes = notes.annotate(search_rank=rank)
 
     # Dynamic dropdowns
-    all_colors = (
-        note.objects.filter(
-            user=user,
-            is_hidden=hidden,
-            **({"tag__iexact": tag} if tag and tag != "all" else {}),
-        )
-        .exclude(color__isnull=True)
-        .exclude(color__exact="")
-        .values_list("color", flat=True)
-        .distinct()
-    )
-    all_tags = (
-        note.objects.filter(
-            user=user,
-            is_hidden=hidden,
-            **({"color__iexact": color} if color and color != "all" else {}),
-        )
-        .exclude(tag__isnull=True)
-        .exclude(tag__exact="")
-        .values_list("tag", flat=True)
-        .distinct()
-    )
+    all_tags, all_colors = facet_choices(user, hidden, tag, color)
     return notes, all_tags, all_colors
 
 
+def encode_cursor(n):
+    """Opaque keyset cursor pointing just after note `n` in listing order.
+
+    `n` is a note or a `.values()` row containing note_id and either
+    search_rank (ranked search listings) or updated_at.
+    """
+    get = n.get if isinstance(n, dict) else lambda name: getattr(n, name, None)
+    if get("search_rank") is not None:
+        raw = f"r{get('search_rank')!r}|{get('note_id')}"
+    else:
+        raw = f"{get('updated_at').isoformat()}|{get('note_id')}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return (updated_at or search_rank, note_id) for a cursor, or None if it is missing or malformed."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        value, note_id = raw.rsplit("|", 1)
+        note_id = int(note_id)
+        if value.startswith("r"):
+            rank = float(value[1:])
+            return (rank, note_id) if math.isfinite(rank) else None
+        updated_at = datetime.fromisoformat(value)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    # Cursors we issue are timezone-aware; a naive one cannot be compared with stored times.
+    if settings.USE_TZ and timezone.is_naive(updated_at):
+        return None
+    return updated_at, note_id
+
+
+def _position(notes, cursor):
+    """The decoded cursor if it belongs to this listing's order (else None: start at page 1)."""
+    position = decode_cursor(cursor)
+    ranked = listing_order(notes)[0] == "search_rank"
+    if position and isinstance(position[0], float) == ranked:
+        return position
+    return None
+
+
+def _page_queryset(notes, cursor, page_size):
+    """Rows for one page plus one extra, which tells whether another page follows."""
+    position = _position(notes, cursor)
+    order = listing_order(notes)
+    notes = notes.order_by(*order)
+    if position:
+        value, note_id = position
+        if order[0] == "search_rank":
+            notes = notes.filter(Q(search_rank__gt=value) | Q(search_rank=value, note_id__lt=note_id))
+        else:
+            notes = notes.filter(Q(updated_at__lt=value) | Q(updated_at=value, note_id__lt=note_id))
+    return notes[: page_size + 1]
+
+
+def _split_page(page, page_size):
+    next_cursor = encode_cursor(page[page_size - 1]) if len(page) > page_size else None
+    return page[:page_size], next_cursor
+
+
+def _cached_page_ids(notes, list_key, cursor, page_size):
+    """Note IDs of one page (plus one extra) from the cached listing, or None to page with queries."""
+    entries = cached_entries(list_key, notes)
+    if entries is None:
+        return None
+    return [note_id for _, note_id in page_after(entries, _position(notes, cursor), page_size)]
+
+
+def _in_order(rows, ids):
+    position = {note_id: i for i, note_id in enumerate(ids)}
+    return sorted(rows, key=lambda n: position[n["note_id"] if isinstance(n, dict) else n.note_id])
+
+
+def paginate_notes(notes, cursor=None, page_size=None, list_key=None):
+    """Return one page of notes and the cursor for the next page, or None on the last page.
+
+    Notes come newest first, or best match first for ranked searches. With a
+    `list_key` (see listing_cache.list_key), the page's IDs come from the
+    cached listing and only that page is loaded.
+    """
+    page_size = page_size or settings.NOTES_PAGE_SIZE
+    ids = _cached_page_ids(notes, list_key, cursor, page_size) if list_key else None
+    if ids is None:
+        return _split_page(list(_page_queryset(notes, cursor, page_size)), page_size)
+    return _split_page(_in_order(notes.filter(note_id__in=ids), ids), page_size)
+
+
+async def apaginate_notes(notes, cursor=None, page_size=None, list_key=None):
+    """Async paginate_notes, for the async views."""
+    page_size = page_size or settings.NOTES_PAGE_SIZE
+    ids = await sync_to_async(_cached_page_ids)(notes, list_key, cursor, page_size) if list_key else None
+    if ids is None:
+        return _split_page([n async for n in _page_queryset(notes, cursor, page_size)], page_size)
+    return _split_page(_in_order([n async for n in notes.filter(note_id__in=ids)], ids), page_size)
+
+
 def process_note_images(notes):
-    """Precompute scaled image heights for uniform display."""
+    """Precompute scaled image heights for uniform display (from stored dimensions, no file access)."""
+    with timed("process_note_images"):
+        _process_note_images(notes)
+
+
+def _process_note_images(notes):
     FIXED_WIDTH = 403
     for n in notes:
         images = list(n.note_image_set.all())
-        scaled_heights = [
-            (img.image.height / img.image.width) * FIXED_WIDTH
-            for img in images
-            if img.image and img.image.width and img.image.height
-        ]
+        scaled_heights = [img.aspect_ratio * FIXED_WIDTH for img in images if img.aspect_ratio]
         n.max_height = max(scaled_heights, default=0)
         for img in images:
-            if img.image and img.image.width and img.image.height:
-                h = (img.image.height / img.image.width) * FIXED_WIDTH
+            if img.aspect_ratio:
+                h = img.aspect_ratio * FIXED_WIDTH
                 img.scaled_height = int(h)
                 img.half_diff = int((n.max_height - h) / 2)
             else:
                 img.scaled_height = img.half_diff = 0
         n.processed_images = images
+        # Cache version for the card fragment: changes when the note, its
+        # rendered description or any of its images change.
+        n.card_version = "{}:{}:{}".format(
+            n.updated_at.timestamp(),
+            n.description_hash,
+            ",".join(f"{img.image_id}.{img.status}.{len(img.variants)}" for img in images),
+        )
+
+
+def listing_state_queries(user):
+    """(queryset, aggregates) pairs summarising a user's notes and images, for _listing_state."""
+    return [
+        (note.objects.filter(user=user), {"latest": Max("updated_at"), "total": Count("note_id")}),
+        (note_image.objects.filter(note__user=user), {
+            "total": Count("image_id"),
+            "latest": Max("image_id"),
+            "processed": Count("image_id", filter=~Q(variants=[])),
+            "settled": Count("image_id", filter=~Q(status=note_image.PENDING)),
+        }),
+    ]
+
+
+def _listing_state(request, hidden):
+    """Cheap summary of everything the notes grid depends on, computed once per request.
+
+    Returns None when the response must not be answered from the client's
+    cache (pending flash messages, non-GET requests).
+    """
+    if not hasattr(request, "_notes_listing_state"):
+        request._notes_listing_state = None
+        if request.method in ("GET", "HEAD") and not len(messages.get_messages(request)):
+            user = request.user
+            notes_state, images_state = (
+                queryset.aggregate(**aggregates) for queryset, aggregates in listing_state_queries(user)
+            )
+            profile = user.profile
+            validator = "|".join(str(part) for part in (
+                user.pk,
+                hidden,
+                sorted(request.GET.lists()),
+                notes_state["latest"] and notes_state["latest"].isoformat(),
+                notes_state["total"],
+                images_state["total"],
+                images_state["latest"],
+                images_state["processed"],
+                images_state["settled"],
+                bool(profile.pin),
+                hidden_notes_unlocked(request, profile),
+                profile.profile_picture.name if profile.profile_picture else "",
+                renderer_version(),
+                # Cached pages embed the CSRF token; a new secret must refetch.
+                request.META.get("CSRF_COOKIE", ""),
+            ))
+            request._notes_listing_state = {
+                "etag": hashlib.sha256(validator.encode()).hexdigest()[:32],
+                "last_modified": notes_state["latest"],
+            }
+    return request._notes_listing_state
+
+
+def conditional_listing(hidden=False):
+    """Answer repeat GETs of a notes grid with 304 Not Modified when nothing it shows has changed."""
+    def etag(request, *args, **kwargs):
+        state = _listing_state(request, hidden)
+        return state and state["etag"]
+
+    def last_modified(request, *args, **kwargs):
+        state = _listing_state(request, hidden)
+        return state and state["last_modified"]
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag, last_modified_func=last_modified)(view)
+
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                # condition() calls the validator functions synchronously, so
+                # compute (and memoize on the request) the state off the event loop.
+                await sync_to_async(_listing_state)(request, hidden)
+                response = await conditional_view(request, *args, **kwargs)
+                patch_cache_control(response, private=True, no_cache=True)
+                return response
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            # Let the browser keep the page but revalidate it on every visit.
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
 
 
 def delete_image(request, image_id):
-    """Generic note image delete handler (used by AJAX)."""
-    try:
-        image = get_object_or_404(note_image, image_id=image_id)
-        image.delete()
-        return JsonResponse({"success": True})
-    except Exception as e:
-        return JsonResponse({"success": False, "error": str(e)}, status=500)
-    
+    """Delete one of the user's note images (used by AJAX). Other users' images, and
+    images of hidden notes while they are locked, are reported as missing."""
+    images = note_image.objects.filter(note__user=request.user)
+    if not hidden_notes_unlocked(request):
+        images = images.filter(note__is_hidden=False)
+    image = get_object_or_404(images, image_id=image_id)
+    image.delete()
+    return JsonResponse({"success": True})
+
+
+HIDDEN_UNLOCK_SESSION_KEY = "notes_hidden_unlock"
+
+
+def _pin_fingerprint(profile):
+    """Keyed digest of the stored PIN hash, so changing the PIN voids existing unlocks."""
+    return salted_hmac("notes.hidden-unlock", profile.pin or "").hexdigest()[:16]
+
+
+def unlock_hidden_notes(request, profile):
+    """Record in the session that the PIN was verified, valid for NOTES_HIDDEN_UNLOCK_TTL seconds."""
+    request.session[HIDDEN_UNLOCK_SESSION_KEY] = {
+        "until": time.time() + settings.NOTES_HIDDEN_UNLOCK_TTL,
+        "pin": _pin_fingerprint(profile),
+    }
+
+
+def lock_hidden_notes(request):
+    request.session.pop(HIDDEN_UNLOCK_SESSION_KEY, None)
+
+
+def hidden_notes_unlocked(request, profile=None):
+    """True while the session holds an unexpired unlock for the current PIN. No password hashing."""
+    token = request.session.get(HIDDEN_UNLOCK_SESSION_KEY)
+    if not token or token["until"] <= time.time():
+        return False
+    profile = profile or request.user.profile
+    return bool(profile.pin) and constant_time_compare(token["pin"], _pin_fingerprint(profile))
+
+
+HIDDEN_LOCKED_ERROR = "Hidden notes are locked. Verify your PIN first."
+
+
+def hidden_locked_json():
+    return JsonResponse({"success": False, "error": HIDDEN_LOCKED_ERROR}, status=403)
+
+
+def hidden_unlock_required(view):
+    """Send sessions without a live hidden-notes unlock back to the notes grid.
+
+    Put it outside conditional_listing so a locked session never gets a 304.
+    """
+    def locked(request):
+        messages.error(request, "Please verify your PIN to view hidden notes.")
+        return redirect("index")
+
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if not await sync_to_async(hidden_notes_unlocked)(request):
+                return await sync_to_async(locked)(request)
+            return await view(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not hidden_notes_unlocked(request):
+            return locked(request)
+        return view(request, *args, **kwargs)
+    return wrapper
+
 
 def handle_verify_pin(request, profile):
     """Handle verifying PIN to access hidden notes."""
+    if hidden_notes_unlocked(request, profile):
+        # Already unlocked: skip the PIN hash check.
+        return redirect('hidden_notes')
     form = PinCheckForm(request.POST)
     if form.is_valid():
-        if check_password(form.cleaned_data['pin'], profile.pin):
+        if profile.pin and check_password(form.cleaned_data['pin'], profile.pin):
+            unlock_hidden_notes(request, profile)
             messages.success(request, "PIN verified successfully.")
             return redirect('hidden_notes')
         messages.error(request, "Please enter the correct PIN to view hidden notes.")
@@ -97,7 +364,7 @@ def handle_pin_set(request, profile):
     form = PinSetForm(request.POST)
     if form.is_valid():
         profile.pin = make_password(form.cleaned_data['pin'])
-        profile.save()
+        profile.save(update_fields=['pin'])
         messages.success(request, "PIN set successfully.")
         return redirect("profile")
 
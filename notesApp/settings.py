@@ -46,6 +46,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Before the session middleware, so static requests skip session work.
+    'notes.middleware.PrecompressedStaticMiddleware',
+    # Per-view latency and query metrics, served at /notes/metrics/ to staff.
+    'notes.metrics.MetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -77,11 +81,93 @@ WSGI_APPLICATION = 'notesApp.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Configured from the environment. DB_ENGINE is "sqlite" (default) or "postgres".
+# Connections are kept for DB_CONN_MAX_AGE seconds and checked before reuse.
+# Under ASGI, or with the Postgres pool, set DB_CONN_MAX_AGE=0.
+
+DB_ENGINE = os.getenv("DB_ENGINE", "sqlite")
+DB_CONN_MAX_AGE = int(os.getenv("DB_CONN_MAX_AGE", 60))
+
+if DB_ENGINE == "postgres":
+    # Needs psycopg 3 with the pool extra: pip install "psycopg[binary,pool]".
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv("DB_NAME", "notes"),
+            'USER': os.getenv("DB_USER", ""),
+            'PASSWORD': os.getenv("DB_PASSWORD", ""),
+            'HOST': os.getenv("DB_HOST", ""),
+            'PORT': os.getenv("DB_PORT", ""),
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+    if os.getenv("DB_POOL", "True") == "True":
+        # The pool replaces persistent connections; Django refuses both at once.
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS'] = {
+            'pool': {
+                'min_size': int(os.getenv("DB_POOL_MIN_SIZE", 2)),
+                'max_size': int(os.getenv("DB_POOL_MAX_SIZE", 10)),
+                'timeout': int(os.getenv("DB_POOL_TIMEOUT", 10)),
+            },
+        }
+    else:
+        DATABASES['default']['CONN_MAX_AGE'] = DB_CONN_MAX_AGE
+else:
+    # WAL lets readers work alongside the single writer, busy_timeout makes a
+    # writer wait for the lock instead of failing with "database is locked",
+    # and IMMEDIATE transactions take the write lock up front so that waiting
+    # applies (a deferred transaction that upgrades to a write fails at once).
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv("DB_NAME", BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'init_command': (
+                    "PRAGMA journal_mode=WAL;"
+                    f"PRAGMA busy_timeout={int(os.getenv('DB_SQLITE_BUSY_TIMEOUT', 5000))};"
+                    "PRAGMA synchronous=NORMAL;"
+                ),
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
     }
+
+
+# Caches
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# "note_cards" holds rendered note card fragments. Point it at a shared backend
+# (e.g. django.core.cache.backends.redis.RedisCache) in multi-process deployments.
+
+NOTES_CARD_CACHE_BACKEND = os.getenv("NOTES_CARD_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache")
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'note_cards': {
+        'BACKEND': NOTES_CARD_CACHE_BACKEND,
+        'LOCATION': os.getenv("NOTES_CARD_CACHE_LOCATION", "note-cards"),
+        'TIMEOUT': 7 * 24 * 3600,
+    },
+}
+if NOTES_CARD_CACHE_BACKEND.endswith("LocMemCache"):
+    CACHES['note_cards']['OPTIONS'] = {'MAX_ENTRIES': 10000}
+
+# "note_lists" holds the ordered note IDs of filtered listings (see
+# notes/listing_cache.py). Edits invalidate them through a version number kept
+# in the same cache, so every process must share it: a process-local cache
+# would keep serving lists another worker has changed. The list cache is
+# therefore off unless NOTES_LIST_CACHE_BACKEND names a backend (Redis,
+# Memcached, a database cache; LocMemCache only for a single process).
+NOTES_LIST_CACHE_BACKEND = os.getenv("NOTES_LIST_CACHE_BACKEND")
+NOTES_LIST_CACHE = NOTES_LIST_CACHE_BACKEND is not None
+CACHES['note_lists'] = {
+    'BACKEND': NOTES_LIST_CACHE_BACKEND or 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': os.getenv("NOTES_LIST_CACHE_LOCATION", "note-lists"),
+    'TIMEOUT': 600,
 }
 
 
@@ -143,11 +229,87 @@ STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'productionfiles'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
+# collectstatic writes content-hashed names plus .gz/.br copies; see notes/staticfiles.py.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "notes.staticfiles.CompressedManifestStaticFilesStorage"},
+}
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# ProfileModelBackend loads request.user with its profile in a single query.
+# ModelBackend stays listed so sessions created before it was added (which
+# name ModelBackend) keep working instead of being logged out.
+AUTHENTICATION_BACKENDS = [
+    'notes.backends.ProfileModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 LOGIN_URL = '/notes/login/'
 LOGOUT_URL = '/notes/logout/'
 
 LOGIN_REDIRECT_URL = '/notes/'
 LOGOUT_REDIRECT_URL = '/'
+
+# Markdown rendering for notes. Notes store their rendered HTML; changing either
+# list makes stored renderings stale — run `python manage.py render_descriptions`
+# afterwards to refresh them.
+NOTES_MARKDOWN_EXTENSIONS = ['fenced_code', 'tables']
+NOTES_ALLOWED_TAGS = ['p', 'pre', 'code', 'strong', 'em', 'ul', 'ol', 'li', 'a', 'h1', 'h2', 'h3', 'blockquote']
+
+# Resized copies generated for every uploaded note image and served via srcset.
+# The note card is 403px wide, so 806px covers 2x displays.
+NOTES_IMAGE_VARIANT_WIDTHS = [403, 806]
+NOTES_IMAGE_VARIANT_FORMATS = ['webp', 'jpeg']
+
+# Notes per page on the notes grid; further pages load through the keyset feed.
+NOTES_PAGE_SIZE = 24
+
+# Listings with more notes than this are paged with queries instead of a
+# cached ID list.
+NOTES_LIST_CACHE_MAX_IDS = 5000
+
+# Full-text search backend for the notes search box. None picks one from the
+# database (SQLite FTS5 / Postgres tsvector); set a dotted path such as
+# 'notes.search.IContainsSearchBackend' to force one.
+NOTES_SEARCH_BACKEND = None
+
+# Background tasks (image processing, imports, ...). "thread" runs them in an
+# in-process pool after the request commits, retries failed ones after their
+# backoff delay and sweeps for leftovers (e.g. after a restart) at most once a
+# minute; "worker" leaves them for `manage.py run_tasks`; "eager" runs them
+# inline (tests). Thread mode runs uploaded imports inside the web process, so
+# sites with large imports or many processes should use "worker" with
+# `manage.py run_tasks` running next to the web server.
+NOTES_TASKS_MODE = os.getenv("NOTES_TASKS_MODE", "thread")
+NOTES_TASKS_THREADS = int(os.getenv("NOTES_TASKS_THREADS", 2))
+
+# Serve the notes grid, feed and JSON API reads with async views. Only worth it
+# under ASGI (notesApp.asgi); under WSGI each async view runs in its own event loop.
+NOTES_ASYNC_VIEWS = os.getenv("NOTES_ASYNC_VIEWS") == "True"
+
+# Seconds a verified PIN keeps hidden notes unlocked for the session. Changing
+# the PIN ends every unlock early.
+NOTES_HIDDEN_UNLOCK_TTL = int(os.getenv("NOTES_HIDDEN_UNLOCK_TTL", 900))
+
+# Days a soft-deleted note is kept before `manage.py purge_deleted_notes` removes
+# it (and its image files) for good.
+NOTES_PURGE_AFTER_DAYS = int(os.getenv("NOTES_PURGE_AFTER_DAYS", 30))
+
+# Days sent and failed emails stay in the outbox (bodies are blanked right away)
+# before the send_outbox task or command deletes them.
+NOTES_OUTBOX_RETENTION_DAYS = int(os.getenv("NOTES_OUTBOX_RETENTION_DAYS", 30))
+
+# How uploaded media is handed to the client after the ownership check:
+# None streams it from Django (with Range support), "nginx" sends
+# X-Accel-Redirect to NOTES_MEDIA_ACCEL_PREFIX (an `internal` location aliased
+# to MEDIA_ROOT), "sendfile" sends X-Sendfile (Apache mod_xsendfile, lighttpd).
+NOTES_MEDIA_ACCEL = os.getenv("NOTES_MEDIA_ACCEL") or None
+NOTES_MEDIA_ACCEL_PREFIX = os.getenv("NOTES_MEDIA_ACCEL_PREFIX", "/protected-media/")
+
+# Directory where each app process writes its request metrics (at most every
+# NOTES_METRICS_FLUSH_INTERVAL seconds) so /notes/metrics/ reports the total of
+# all workers. Unset, the endpoint shows only the process that answers it.
+NOTES_METRICS_DIR = os.getenv("NOTES_METRICS_DIR") or None
+NOTES_METRICS_FLUSH_INTERVAL = int(os.getenv("NOTES_METRICS_FLUSH_INTERVAL", 10))
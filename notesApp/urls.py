@@ -1,5 +1,4 @@
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 from django.contrib.auth import views as auth_views  # ✅ fixed
@@ -15,6 +14,8 @@ urlpatterns = [
     path('features/', views.features, name='features'),
     path('notes/', include('notes.urls')),
     path('profile/', notes_views.profile, name='profile'),
+    # Uploaded files go through an ownership check (see notes/views/media_views.py).
+    path(settings.MEDIA_URL.lstrip('/') + '<path:path>', notes_views.serve_media, name='media'),
 
     # Password reset URLs
     path(
@@ -50,4 +51,4 @@ urlpatterns = [
         ),
         name="password_reset_complete"
     ),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+]
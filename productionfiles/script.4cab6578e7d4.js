@@ -0,0 +1,198 @@
+function getCookie(name) {
+  let cookieValue = null;
+  if (document.cookie && document.cookie !== "") {
+    const cookies = document.cookie.split(";");
+    for (let i = 0; i < cookies.length; i++) {
+      const cookie = cookies[i].trim();
+      if (cookie.substring(0, name.length + 1) === name + "=") {
+        cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
+        break;
+      }
+    }
+  }
+  return cookieValue;
+}
+
+document.addEventListener("DOMContentLoaded", function () {
+  let theme = localStorage.getItem("theme");
+  if (theme) {
+    document.documentElement.setAttribute("data-bs-theme", theme);
+  } else{
+    localStorage.setItem("theme", "light");
+    document.documentElement.setAttribute("data-bs-theme", "light");
+  }
+  /* ---------------------------
+     DELETE MODAL LOGIC
+  ---------------------------- */
+  const deleteModal = document.getElementById("deleteModal");
+  const confirmBtn = document.getElementById("confirmDeleteBtn");
+
+  let deleteType = null;
+  let deleteId = null;
+  let triggerBtn = null;
+
+  deleteModal.addEventListener("show.bs.modal", function (event) {
+    const button = event.relatedTarget;
+    deleteType = button.getAttribute("data-type");
+    deleteId =
+      deleteType === "note"
+        ? button.getAttribute("data-note-id")
+        : button.getAttribute("data-image-id");
+    triggerBtn = button;
+  });
+
+  confirmBtn.addEventListener("click", async function () {
+    if (!deleteId || !deleteType) return;
+
+    let url = "";
+    if (deleteType === "note") {
+      url = `/notes/${deleteId}/delete/`;
+    } else if (deleteType === "image") {
+      url = `/notes/delete_image/${deleteId}/`;
+    }
+
+    const response = await fetch(url, {
+      method: "POST",
+      headers: { "X-CSRFToken": getCookie("csrftoken") },
+    });
+
+    const modal = bootstrap.Modal.getInstance(deleteModal);
+    if (modal) modal.hide();
+
+    triggerBtn.closest(".position-relative").remove();
+
+    if (response.ok) {
+      if (deleteType === "note") {
+        window.location.href = "/notes/";
+      } else if (deleteType === "image") {
+        const imageContainer = triggerBtn.closest(".position-relative");
+        imageContainer.style.transition = "opacity 0.3s";
+        imageContainer.style.opacity = "0";
+        setTimeout(() => imageContainer.remove(), 300);
+      }
+    } else {
+      alert("Error deleting item.");
+    }
+  });
+
+  /* ---------------------------
+     HIDE NOTE + SET PIN LOGIC
+  ---------------------------- */
+  const checkbox = document.getElementById("id_is_hidden");
+  const modalEl = document.getElementById("hideNotesModal");
+  const modal = new bootstrap.Modal(modalEl);
+
+  if (!checkbox) return;
+
+  checkbox.addEventListener("change", function () {
+    modal.show();
+  });
+});
+// function setPin() {
+//   const closeHideModalBtn = document.getElementById("closeHideModalBtn");
+//   const setPin = document.getElementById("setNotePin");
+//   if (!setPin) return;
+
+//   const pinValue = setPin.value.trim();
+
+//   if (!pinValue) {
+//     alert("Please enter a PIN.");
+//     return;
+//   }
+
+//   if (pinValue.length !== 6 || isNaN(pinValue)) {
+//     alert("Please enter a valid 6-digit numeric PIN.");
+//     return;
+//   }
+
+//   const formData = new FormData();
+//   formData.append("pin", pinValue);
+//   console.log("Setting PIN...", pinValue);
+
+//   fetch(`/notes/set_pin/`, {
+//     method: "POST",
+//     headers: { "X-CSRFToken": getCookie("csrftoken") },
+//     body: formData,
+//   })
+//     .then((response) => {
+//       if (!response.ok) throw new Error("Failed to set PIN");
+//       return response.json();
+//     })
+//     .then((data) => {
+//       console.log("✅ PIN set successfully:", data);
+//       // continue hide note logic...
+//     })
+//     .catch((error) => console.error(error));
+//   window.location.reload();
+// }
+
+
+document.querySelectorAll('.toggle-password').forEach(button => {
+
+    button.addEventListener('click', function () {
+        const targetId = this.getAttribute('data-target');
+        const input = document.getElementById(targetId);
+        const icon = this.querySelector('i');
+
+        if (input.type === 'password') {
+            input.type = 'text';
+            icon.classList.remove('bi-eye');
+            icon.classList.add('bi-eye-slash');
+        } else {
+            input.type = 'password';
+            icon.classList.remove('bi-eye-slash');
+            icon.classList.add('bi-eye');
+        }
+    });
+});
+
+// Script to make the custom toggle switch work with the theme
+const themeSwitcher = document.getElementById('themeSwitcher');
+
+// Set initial state based on current theme
+const currentTheme = localStorage.getItem('theme')? localStorage.getItem('theme') : 'light';
+if (currentTheme === 'dark') {
+    themeSwitcher.checked = true;
+}
+
+// Listen for changes
+themeSwitcher.addEventListener('change', function() {
+    if (this.checked) {
+      localStorage.setItem('theme', 'dark');
+      document.documentElement.setAttribute('data-bs-theme', 'dark');
+    } else {
+      localStorage.setItem('theme', 'light');
+      document.documentElement.setAttribute('data-bs-theme', 'light');
+    }
+});
+
+/* ---------------------------
+   LOAD MORE NOTES (keyset feed)
+---------------------------- */
+const loadMoreBtn = document.getElementById('loadMoreNotes');
+
+if (loadMoreBtn) {
+  loadMoreBtn.addEventListener('click', async function () {
+    const params = new URLSearchParams(window.location.search);
+    params.set('cursor', this.dataset.nextCursor);
+    this.disabled = true;
+
+    const response = await fetch(`${this.dataset.feedUrl}?${params}`, {
+      headers: { 'X-Requested-With': 'XMLHttpRequest' },
+    });
+    if (!response.ok) {
+      this.disabled = false;
+      alert('Error loading notes.');
+      return;
+    }
+
+    const data = await response.json();
+    document.getElementById('notesGrid').insertAdjacentHTML('beforeend', data.html);
+    if (data.next_cursor) {
+      this.dataset.nextCursor = data.next_cursor;
+      this.disabled = false;
+    } else {
+      this.parentElement.remove();
+    }
+  });
+}
@@ -164,4 +164,35 @@ themeSwitcher.addEventListener('change', function() {
       localStorage.setItem('theme', 'light');
       document.documentElement.setAttribute('data-bs-theme', 'light');
     }
-});
\ No newline at end of file
+});
+
+/* ---------------------------
+   LOAD MORE NOTES (keyset feed)
+---------------------------- */
+const loadMoreBtn = document.getElementById('loadMoreNotes');
+
+if (loadMoreBtn) {
+  loadMoreBtn.addEventListener('click', async function () {
+    const params = new URLSearchParams(window.location.search);
+    params.set('cursor', this.dataset.nextCursor);
+    this.disabled = true;
+
+    const response = await fetch(`${this.dataset.feedUrl}?${params}`, {
+      headers: { 'X-Requested-With': 'XMLHttpRequest' },
+    });
+    if (!response.ok) {
+      this.disabled = false;
+      alert('Error loading notes.');
+      return;
+    }
+
+    const data = await response.json();
+    document.getElementById('notesGrid').insertAdjacentHTML('beforeend', data.html);
+    if (data.next_cursor) {
+      this.dataset.nextCursor = data.next_cursor;
+      this.disabled = false;
+    } else {
+      this.parentElement.remove();
+    }
+  });
+}